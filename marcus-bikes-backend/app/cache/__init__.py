@@ -0,0 +1,246 @@
+"""
+Caches for catalog reads.
+
+``catalog_cache`` holds product payloads and category counts. Its backend is
+chosen with ``CACHE_BACKEND``: ``memory`` (default) keeps an LRU per process,
+``redis`` shares entries between workers and nodes through a Redis-protocol
+server at ``CACHE_URL``. ``response_cache`` holds encoded response bodies
+with their compressed variants on the same backend, under its own
+namespace, so that a write made through one node drops them everywhere.
+``local_cache`` always stays in the process, for structures that are only
+worth keeping as live objects (the search index).
+
+Entries expire after a TTL so that writes made elsewhere become visible
+eventually; catalog writes drop the affected entries by tag directly.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.cache.backends import CacheBackend, MemoryBackend, RedisBackend
+from app.cache.singleflight import SingleFlight, FlightTimeout
+from app.metrics import register_cache
+
+# Seconds a catalog entry may be served before it is reloaded
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+
+# Most entries kept by the in-process backend
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "10000"))
+
+# Most response bodies kept by the in-process backend
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+
+# Seconds another process's loader is waited for before loading anyway
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", "2"))
+
+# Cache keys
+CATEGORY_SUMMARIES_KEY = "category_summaries"
+PRODUCT_KEY_PREFIX = "product"
+SEARCH_INDEX_KEY = "search_index"
+
+# Tags of the entries built from a product or an option
+PRODUCT_TAG_PREFIX = "product"
+OPTION_TAG_PREFIX = "option"
+
+_MISSING = object()
+
+
+class JsonCodec:
+    """Encodes JSON-compatible values for backends storing bytes"""
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        return json.loads(data)
+
+
+class ModelCodec:
+    """Encodes a pydantic model, decoding it with a single ``model_validate_json``"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+
+    def dumps(self, value: BaseModel) -> bytes:
+        return value.model_dump_json().encode("utf-8")
+
+    def loads(self, data: bytes) -> BaseModel:
+        return self.model.model_validate_json(data)
+
+
+JSON_CODEC = JsonCodec()
+
+
+class Cache:
+    """Key/value cache over a backend, with tags, hit/miss counters and stampede protection
+
+    Values are stored as they are by in-process backends, and encoded with
+    the ``codec`` given to each call (JSON by default) by the others.
+    """
+
+    def __init__(self, name: str, backend: CacheBackend, ttl: float, lock_timeout: float = CACHE_LOCK_TIMEOUT):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+        # Coalesces concurrent loads in this process, also usable for loads bypassing get_or_set
+        self.flights = SingleFlight()
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._counter_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get_many(self, keys: Sequence[Hashable], codec: Any = JSON_CODEC) -> List[Any]:
+        """Values of ``keys`` in order, None for misses; one round trip for remote backends"""
+        values = self.backend.get_many(list(keys))
+        if self.backend.serializes:
+            values = [None if value is None else codec.loads(value) for value in values]
+        misses = sum(value is None for value in values)
+        self._count(len(values) - misses, misses)
+        return values
+
+    def get(self, key: Hashable, default: Any = None, codec: Any = JSON_CODEC) -> Any:
+        value = self.get_many([key], codec)[0]
+        return default if value is None else value
+
+    def set_many(
+        self,
+        entries: Dict[Hashable, Any],
+        ttl: Optional[float] = None,
+        tags: Optional[Dict[Hashable, Sequence[str]]] = None,
+        codec: Any = JSON_CODEC
+    ) -> None:
+        if self.backend.serializes:
+            entries = {key: codec.dumps(value) for key, value in entries.items()}
+        self.backend.set_many(entries, self.ttl if ttl is None else ttl, tags or {})
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Sequence[str] = (), codec: Any = JSON_CODEC) -> None:
+        self.set_many({key: value}, ttl, {key: tags}, codec)
+
+    def delete(self, *keys: Hashable) -> None:
+        self.backend.delete(list(keys))
+
+    def invalidate_tags(self, *tags: str) -> None:
+        self.backend.invalidate_tags(list(tags))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+    def get_or_set(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        tags: Sequence[str] = (),
+        codec: Any = JSON_CODEC
+    ) -> Any:
+        """Get a value, loading and caching it on a miss
+
+        Concurrent misses on the same key run the loader once: callers in
+        this process wait for it through ``flights`` (raising
+        ``FlightTimeout`` if it takes too long, or the loader's exception),
+        and with a shared backend other processes wait (up to
+        ``lock_timeout``) for the one holding the backend lock to store the
+        value.
+        """
+        value = self.get(key, _MISSING, codec)
+        if value is not _MISSING:
+            return value
+        return self.flights.do(key, lambda: self._load(key, loader, ttl, tags, codec))
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float], tags: Sequence[str], codec: Any) -> Any:
+        # The previous load may have finished since the miss
+        value = self.backend.get_many([key])[0]
+        if value is not None:
+            return codec.loads(value) if self.backend.serializes else value
+
+        locked = self.backend.shared and self.backend.acquire_lock(str(key), self.lock_timeout)
+        if self.backend.shared and not locked:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.01)
+                value = self.backend.get_many([key])[0]
+                if value is not None:
+                    return codec.loads(value)
+        try:
+            value = loader()
+            self.set(key, value, ttl, tags, codec)
+        finally:
+            if locked:
+                self.backend.release_lock(str(key))
+        return value
+
+
+def backend_from_environment(suffix: str = "", max_entries: int = CATALOG_CACHE_MAX_ENTRIES) -> CacheBackend:
+    """The configured backend; ``suffix`` keeps the keys of another cache apart on shared ones"""
+    if os.getenv("CACHE_BACKEND", "memory") == "redis":
+        namespace = os.getenv("CACHE_NAMESPACE", "marcus") + (f":{suffix}" if suffix else "")
+        return RedisBackend(os.getenv("CACHE_URL", "redis://localhost:6379/0"), namespace=namespace)
+    return MemoryBackend(max_entries=max_entries)
+
+
+catalog_cache = Cache("catalog", backend_from_environment(), ttl=CATALOG_CACHE_TTL)
+register_cache(catalog_cache.name, catalog_cache.stats)
+
+local_cache = Cache("local", MemoryBackend(max_entries=16), ttl=CATALOG_CACHE_TTL)
+register_cache(local_cache.name, local_cache.stats)
+
+response_cache = Cache("responses", backend_from_environment("responses", RESPONSE_CACHE_MAX_ENTRIES), ttl=CATALOG_CACHE_TTL)
+register_cache(response_cache.name, response_cache.stats)
+
+
+def product_key(product_id: int) -> str:
+    return f"{PRODUCT_KEY_PREFIX}:{product_id}"
+
+
+def product_tag(product_id: int) -> str:
+    return f"{PRODUCT_TAG_PREFIX}:{product_id}"
+
+
+def option_tag(option_id: int) -> str:
+    return f"{OPTION_TAG_PREFIX}:{option_id}"
+
+
+def product_tags(product: Any) -> List[str]:
+    """Tags of a cached frontend product: the product and each of its options"""
+    return [product_tag(product.id)] + [
+        option_tag(option.id) for component in product.components for option in component.options
+    ]
+
+
+def invalidate_category_summaries() -> None:
+    """Drop the cached per-category counts and prices after a catalog or stock write"""
+    catalog_cache.delete(CATEGORY_SUMMARIES_KEY)
+    response_cache.delete(CATEGORY_SUMMARIES_KEY)
+
+
+def invalidate_products(*product_ids: int) -> None:
+    """Drop cached products (and the category counts and search index) after a write to their tree"""
+    tags = [product_tag(product_id) for product_id in product_ids]
+    catalog_cache.invalidate_tags(*tags)
+    response_cache.invalidate_tags(*tags)
+    local_cache.delete(SEARCH_INDEX_KEY)
+    invalidate_category_summaries()
+
+
+def invalidate_option_products(option_ids: Iterable[int]) -> None:
+    """Drop the cached products owning some options after a stock write"""
+    tags = [option_tag(option_id) for option_id in option_ids]
+    catalog_cache.invalidate_tags(*tags)
+    response_cache.invalidate_tags(*tags)
+    local_cache.delete(SEARCH_INDEX_KEY)
+    invalidate_category_summaries()
@@ -0,0 +1,244 @@
+"""
+Storage backends of ``app.cache.Cache``.
+
+``MemoryBackend`` keeps live objects in this process, least recently used
+first out. ``RedisBackend`` keeps encoded values in a server speaking the
+Redis protocol, shared by every worker and node. Both support a TTL per
+entry, tags (sets of keys dropped together) and short-lived locks used for
+stampede protection.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from app.cache.resp import RespConnection
+
+logger = logging.getLogger(__name__)
+
+# Keys deleted per DEL command when clearing a namespace
+CLEAR_BATCH_SIZE = 500
+
+
+class CacheBackend:
+    # Whether values must be encoded to bytes before being stored
+    serializes = False
+    # Whether locks are visible to other processes
+    shared = False
+
+    def get_many(self, keys: Sequence[str]) -> List[Any]:
+        """Values of ``keys`` in order, None for missing or expired ones"""
+        raise NotImplementedError
+
+    def set_many(self, entries: Dict[str, Any], ttl: float, tags: Dict[str, Sequence[str]]) -> None:
+        """Store entries for ``ttl`` seconds, ``tags`` giving the tags of each key"""
+        raise NotImplementedError
+
+    def delete(self, keys: Sequence[str]) -> None:
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Sequence[str]) -> None:
+        """Delete every entry stored with one of ``tags``"""
+        raise NotImplementedError
+
+    def acquire_lock(self, key: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def release_lock(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe LRU of live objects with per-entry expiry and a tag index"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._locks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get_many(self, keys: Sequence[Hashable]) -> List[Any]:
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    values.append(None)
+                elif entry[0] <= now:
+                    self._remove(key)
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[1])
+        return values
+
+    def set_many(self, entries: Dict[Hashable, Any], ttl: float, tags: Dict[Hashable, Sequence[str]]) -> None:
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key, value in entries.items():
+                self._remove(key)
+                key_tags = tuple(tags.get(key, ()))
+                self._entries[key] = (expires_at, value, key_tags)
+                for tag in key_tags:
+                    self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, keys: Sequence[Hashable]) -> None:
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def invalidate_tags(self, tags: Sequence[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def acquire_lock(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._locks.get(key, 0) > now:
+                return False
+            self._locks[key] = now + ttl
+            return True
+
+    def release_lock(self, key: str) -> None:
+        with self._lock:
+            self._locks.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._locks.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """Entries in a Redis-protocol server under ``<namespace>:``
+
+    Values are ``<namespace>:v:<key>`` strings with a PX expiry, tags are
+    ``<namespace>:t:<tag>`` sets of value keys and locks are
+    ``<namespace>:l:<key>`` strings set with NX. Tag sets expire with the
+    last entry added to them, so entries sharing a tag should share a TTL.
+    Every thread has its own connection. Server errors are logged and
+    handled as misses, so that the cache never fails a request.
+    """
+
+    serializes = True
+    shared = True
+
+    def __init__(self, url: str, namespace: str = "marcus", timeout: float = 0.5):
+        self.url = url
+        self.namespace = namespace
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _value_key(self, key: str) -> str:
+        return f"{self.namespace}:v:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.namespace}:t:{tag}"
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.namespace}:l:{key}"
+
+    def _connection(self) -> RespConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = RespConnection.from_url(self.url, timeout=self.timeout)
+        return connection
+
+    def _pipeline(self, commands: Sequence[Sequence[Any]]) -> Optional[List[Any]]:
+        """Run commands, reconnecting once; None when the server is unavailable"""
+        for attempt in range(2):
+            try:
+                return self._connection().pipeline(commands)
+            except OSError:
+                connection = getattr(self._local, "connection", None)
+                self._local.connection = None
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except OSError:
+                        pass
+                if attempt:
+                    logger.warning("Cache server %s unavailable", self.url, exc_info=True)
+        return None
+
+    def get_many(self, keys: Sequence[str]) -> List[Any]:
+        if not keys:
+            return []
+        replies = self._pipeline([["MGET", *[self._value_key(key) for key in keys]]])
+        if not replies or not isinstance(replies[0], list):
+            return [None] * len(keys)
+        return replies[0]
+
+    def set_many(self, entries: Dict[str, Any], ttl: float, tags: Dict[str, Sequence[str]]) -> None:
+        milliseconds = max(1, int(ttl * 1000))
+        commands: List[List[Any]] = []
+        tag_members: Dict[str, List[str]] = {}
+        for key, value in entries.items():
+            value_key = self._value_key(key)
+            commands.append(["SET", value_key, value, "PX", milliseconds])
+            for tag in tags.get(key, ()):
+                tag_members.setdefault(tag, []).append(value_key)
+        for tag, members in tag_members.items():
+            commands.append(["SADD", self._tag_key(tag), *members])
+            commands.append(["PEXPIRE", self._tag_key(tag), milliseconds])
+        self._pipeline(commands)
+
+    def delete(self, keys: Sequence[str]) -> None:
+        if keys:
+            self._pipeline([["DEL", *[self._value_key(key) for key in keys]]])
+
+    def invalidate_tags(self, tags: Sequence[str]) -> None:
+        if not tags:
+            return
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        replies = self._pipeline([["SMEMBERS", tag_key] for tag_key in tag_keys])
+        if replies is None:
+            return
+        members = [member for reply in replies if isinstance(reply, list) for member in reply]
+        self._pipeline([["DEL", *members, *tag_keys]])
+
+    def acquire_lock(self, key: str, ttl: float) -> bool:
+        replies = self._pipeline([["SET", self._lock_key(key), "1", "NX", "PX", max(1, int(ttl * 1000))]])
+        # Without a server there is nothing to protect: let the caller load
+        return replies is None or replies[0] == "OK"
+
+    def release_lock(self, key: str) -> None:
+        self._pipeline([["DEL", self._lock_key(key)]])
+
+    def clear(self) -> None:
+        cursor = b"0"
+        while True:
+            replies = self._pipeline([["SCAN", cursor, "MATCH", f"{self.namespace}:*", "COUNT", CLEAR_BATCH_SIZE]])
+            if not replies or not isinstance(replies[0], list):
+                return
+            cursor, keys = replies[0]
+            if keys:
+                self._pipeline([["DEL", *keys]])
+            if cursor in (b"0", 0):
+                return
@@ -0,0 +1,112 @@
+"""
+Minimal client for the Redis serialization protocol (RESP2).
+
+Only what the cache backend needs: sending commands, optionally pipelined,
+and parsing the replies. Works with Redis and protocol-compatible servers
+(Valkey, KeyDB, Dragonfly) without an extra dependency.
+"""
+
+import socket
+from typing import Any, List, Optional, Sequence, Union
+from urllib.parse import urlparse
+
+Argument = Union[str, bytes, int, float]
+
+
+class RespError(Exception):
+    """Error reply from the server"""
+
+
+def encode_command(*arguments: Argument) -> bytes:
+    parts = [b"*%d\r\n" % len(arguments)]
+    for argument in arguments:
+        if isinstance(argument, bytes):
+            value = argument
+        elif isinstance(argument, str):
+            value = argument.encode("utf-8")
+        else:
+            value = str(argument).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+    return b"".join(parts)
+
+
+class RespConnection:
+    """One connection to the server; not thread-safe"""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        timeout: float = 1.0
+    ):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.execute("AUTH", password)
+        if db:
+            self.execute("SELECT", db)
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 1.0) -> "RespConnection":
+        """Connect to ``redis://[:password@]host[:port][/db]``"""
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password, timeout)
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+    def execute(self, *arguments: Argument) -> Any:
+        self.sock.sendall(encode_command(*arguments))
+        return self._read_reply()
+
+    def pipeline(self, commands: Sequence[Sequence[Argument]]) -> List[Any]:
+        """Send several commands in one write and read their replies in order
+
+        Error replies are returned in place instead of raised, so that every
+        reply is consumed.
+        """
+        if not commands:
+            return []
+        self.sock.sendall(b"".join(encode_command(*command) for command in commands))
+        replies = []
+        for _ in commands:
+            try:
+                replies.append(self._read_reply())
+            except RespError as error:
+                replies.append(error)
+        return replies
+
+    def _read_line(self) -> bytes:
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the server")
+        return line[:-2]
+
+    def _read_reply(self) -> Any:
+        line = self._read_line()
+        kind, payload = line[:1], line[1:]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RespError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by the server")
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply: {line[:20]!r}")
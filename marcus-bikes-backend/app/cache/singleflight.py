@@ -0,0 +1,95 @@
+"""
+Request coalescing: concurrent calls for the same key share one execution.
+
+The first caller of a key (the leader) runs the loader; callers arriving
+while it runs wait for its result, or get its exception, instead of running
+the loader again. Sync callers (threadpool routes) and async callers (event
+loop) can wait on the same call, since the result is held in a
+``concurrent.futures.Future``. Once the leader is done the key is forgotten,
+so the next miss loads again: results are not cached here.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Seconds a caller waits for another caller's loader before giving up
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "10"))
+
+
+class FlightTimeout(TimeoutError):
+    """Raised to a caller that waited too long for the loader of a key"""
+
+
+class SingleFlight:
+    def __init__(self, timeout: float = SINGLE_FLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self.coalesced = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """The call running for ``key``, and whether this caller must run it"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            del self._calls[key]
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            # The leader was cancelled or interrupted: waiters must not be
+            future.set_exception(FlightTimeout(f"The loader of {key!r} was interrupted"))
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def do(self, key: Hashable, loader: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run ``loader`` once for concurrent sync callers of ``key``
+
+        Waiting callers raise ``FlightTimeout`` after ``timeout`` seconds
+        (the leader itself is never interrupted) and re-raise the leader's
+        exception if the loader fails.
+        """
+        future, leader = self._join(key)
+        if leader:
+            try:
+                result = loader()
+            except BaseException as error:
+                self._finish(key, future, error=error)
+                raise
+            self._finish(key, future, result)
+            return result
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            raise FlightTimeout(f"Timed out waiting for the loader of {key!r}") from None
+
+    async def do_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Await ``loader()`` once for concurrent callers of ``key``, like ``do``
+
+        Cancelling a waiting caller does not cancel the leader's load.
+        """
+        future, leader = self._join(key)
+        if leader:
+            try:
+                result = await loader()
+            except BaseException as error:
+                self._finish(key, future, error=error)
+                raise
+            self._finish(key, future, result)
+            return result
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            raise FlightTimeout(f"Timed out waiting for the loader of {key!r}") from None
@@ -0,0 +1,128 @@
+"""
+Checking and pricing product configurations.
+
+A configuration is the options chosen for a product, one per component.
+Dependencies are compiled into bitmasks over the product's option positions
+(the options of its components, in order), so checking a configuration is a
+few integer operations per selected option. The shared catalog snapshot
+stores these masks and an index of price rules by option; products read
+from the database have them compiled on the fly.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from app.models.enums import DependencyTypeEnum
+
+# (component id, [(option id, price, in stock)]) of a product, in order
+Components = Sequence[Tuple[int, Sequence[Tuple[int, float, bool]]]]
+# (requires, excludes) bitmasks of each option position
+Masks = Sequence[Tuple[int, int]]
+
+
+def dependency_masks(product: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """Per option of a product in the frontend format, in position order, the
+    bitmasks over option positions of the options it requires and excludes
+
+    Requiring a whole component is left out: a complete configuration always
+    has one of its options. Excluding one excludes all of its options.
+    """
+    positions: Dict[int, int] = {}
+    component_positions: Dict[int, List[int]] = {}
+    for component in product["components"]:
+        for option in component["options"]:
+            component_positions.setdefault(component["id"], []).append(len(positions))
+            positions[option["id"]] = len(positions)
+
+    masks = [[0, 0] for _ in positions]
+    for dependency in product["dependencies"]:
+        source = positions.get(dependency["sourceOptionId"])
+        if source is None:
+            continue
+        excludes = dependency["type"] == DependencyTypeEnum.EXCLUDES.value
+        target_option = dependency["targetOptionId"]
+        if target_option is None:
+            targets = component_positions.get(dependency["targetComponentId"], []) if excludes else []
+        else:
+            targets = [positions[target_option]] if target_option in positions else []
+        for target in targets:
+            masks[source][excludes] |= 1 << target
+    return [(requires, excludes) for requires, excludes in masks]
+
+
+def _positions(mask: int) -> Iterable[int]:
+    position = 0
+    while mask:
+        if mask & 1:
+            yield position
+        mask >>= 1
+        position += 1
+
+
+def check_configuration(
+    base_price: float,
+    components: Components,
+    masks: Masks,
+    price_overrides: Callable[[int], Sequence[Tuple[int, float]]],
+    option_ids: Sequence[int]
+) -> Tuple[float, List[str]]:
+    """Price a configuration and list what prevents ordering it (nothing when it is valid)
+
+    ``price_overrides`` gives the ``(dependent option, price)`` rules of an
+    option: like in ``PriceRangeService.compute_price_range``, an option costs
+    the price of its first rule whose dependent option is also selected.
+    """
+    positions: Dict[int, int] = {}
+    options: List[Tuple[int, float, bool]] = []
+    for _, component_options in components:
+        for option in component_options:
+            positions[option[0]] = len(options)
+            options.append(option)
+
+    option_ids = list(dict.fromkeys(option_ids))
+    problems = [f"Option {option_id} is not an option of this product" for option_id in option_ids if option_id not in positions]
+    chosen = {option_id for option_id in option_ids if option_id in positions}
+    selected = 0
+    for option_id in chosen:
+        selected |= 1 << positions[option_id]
+
+    for component_id, component_options in components:
+        count = sum(option[0] in chosen for option in component_options)
+        if count == 0:
+            problems.append(f"No option selected for component {component_id}")
+        elif count > 1:
+            problems.append(f"Several options selected for component {component_id}")
+
+    total = base_price or 0.0
+    for position in _positions(selected):
+        option_id, price, in_stock = options[position]
+        if not in_stock:
+            problems.append(f"Option {option_id} is out of stock")
+        requires, excludes = masks[position]
+        for target in _positions(requires & ~selected):
+            problems.append(f"Option {option_id} requires option {options[target][0]}")
+        for target in _positions(excludes & selected):
+            problems.append(f"Option {option_id} excludes option {options[target][0]}")
+        for dependent_option_id, override in price_overrides(option_id):
+            if dependent_option_id in chosen:
+                price = override
+                break
+        total += price
+    return round(total, 2), problems
+
+
+def check_product_configuration(product: Dict[str, Any], option_ids: Sequence[int]) -> Tuple[float, List[str]]:
+    """``check_configuration`` for a product in the frontend format, compiling its masks"""
+    components = [
+        (component["id"], [(option["id"], option["price"], option["inStock"]) for option in component["options"]])
+        for component in product["components"]
+    ]
+    overrides: Dict[int, List[Tuple[int, float]]] = {}
+    for rule in product["priceRules"]:
+        overrides.setdefault(rule["optionId"], []).append((rule["dependentOptionId"], rule["price"]))
+    return check_configuration(
+        product["basePrice"],
+        components,
+        dependency_masks(product),
+        lambda option_id: overrides.get(option_id, ()),
+        option_ids
+    )
@@ -0,0 +1,80 @@
+from typing import Dict, List, Tuple
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.services.catalog_change_service import CatalogChangeService
+from app.services.product_service import ProductService
+from app.schemas import CatalogChangeEntry, CatalogChanges, CatalogSnapshot, FrontendProduct
+
+# Largest page of changes
+MAX_CHANGES_LIMIT = 5000
+
+# Products loaded per batch when building a snapshot
+SNAPSHOT_BATCH_SIZE = 1000
+
+class CatalogController:
+    @staticmethod
+    def get_changes(db: Session, since: int = 0, limit: int = 1000) -> CatalogChanges:
+        """Get the changes after version ``since`` and the current state of their products
+
+        Only the latest change of every entity in the page is returned. The
+        products are read from the database, never from the caches: a body
+        cached by a worker that missed the change would be sent under a
+        version past it, and the client would never ask for it again.
+        """
+        if since < 0:
+            raise HTTPException(status_code=400, detail="since must not be negative")
+        if limit < 1 or limit > MAX_CHANGES_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_CHANGES_LIMIT}")
+
+        rows = CatalogChangeService.get_changes(db, since, limit=limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            version = rows[-1].version
+        else:
+            version = CatalogChangeService.get_version(db)
+            if since > version:
+                raise HTTPException(status_code=409, detail="since is ahead of the catalog version, fetch a new snapshot")
+            version = since
+
+        latest: Dict[Tuple[str, int], CatalogChangeEntry] = {}
+        for row in rows:
+            key = (row.entity_type, row.entity_id)
+            latest.pop(key, None)
+            latest[key] = CatalogChangeEntry.model_validate(row)
+        changes = list(latest.values())
+
+        product_ids = list(dict.fromkeys(change.product_id for change in changes))
+        products = CatalogController._load_products(db, product_ids)
+        found = {product.id for product in products}
+        return CatalogChanges(
+            version=version,
+            has_more=has_more,
+            changes=changes,
+            products=products,
+            deleted_product_ids=[product_id for product_id in product_ids if product_id not in found]
+        )
+
+    @staticmethod
+    def get_snapshot(db: Session) -> CatalogSnapshot:
+        """Get every product with the change version it is current as of
+
+        The version is read before the products, so the snapshot holds at
+        least every change up to it; replaying changes after it from
+        ``get_changes`` is safe even if some were already included. Products
+        are read from the database, as in ``get_changes``.
+        """
+        version = CatalogChangeService.get_version(db)
+        product_ids = ProductService.get_product_ids(db)
+        products = []
+        for start in range(0, len(product_ids), SNAPSHOT_BATCH_SIZE):
+            products.extend(CatalogController._load_products(db, product_ids[start:start + SNAPSHOT_BATCH_SIZE]))
+            db.expunge_all()
+        return CatalogSnapshot(version=version, products=products)
+
+    @staticmethod
+    def _load_products(db: Session, product_ids: List[int]) -> List[FrontendProduct]:
+        """Load products from the database in the requested order, skipping unknown IDs"""
+        loaded = {product.id: product for product in ProductService.get_products_by_ids(db, product_ids)}
+        return [ProductService.product_to_frontend(loaded[product_id]) for product_id in product_ids if product_id in loaded]
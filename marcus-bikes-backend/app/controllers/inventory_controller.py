@@ -3,7 +3,15 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.services.inventory_service import InventoryService
-from app.schemas import Inventory, InventoryCreate, InventoryUpdate
+from app.schemas import Inventory, InventoryCreate, InventoryUpdate, InventoryListItem, InventoryListPage
+from app.models.enums import StockStatusEnum
+from app.pagination import encode_cursor, decode_cursor, INTEGER
+
+# Sort orders of the inventory listing
+INVENTORY_LISTING_SORTS = ("id", "quantity", "-quantity")
+
+# Largest page of the inventory listing
+MAX_LISTING_LIMIT = 500
 
 class InventoryController:
     @staticmethod
@@ -11,6 +19,50 @@ class InventoryController:
         """Get all inventory records with pagination"""
         return InventoryService.get_inventories(db, skip=skip, limit=limit)
 
+    @staticmethod
+    def get_inventory_listing(
+        db: Session,
+        product_id: Optional[int] = None,
+        component_id: Optional[int] = None,
+        category: Optional[str] = None,
+        stock_status: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> InventoryListPage:
+        """Get a filtered page of inventory records with option, component and product names"""
+        if not 1 <= limit <= MAX_LISTING_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_LISTING_LIMIT}")
+        if sort not in INVENTORY_LISTING_SORTS:
+            raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(INVENTORY_LISTING_SORTS)}")
+        status_filter = None
+        if stock_status:
+            try:
+                status_filter = StockStatusEnum(stock_status)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Unknown stock status: {stock_status}")
+
+        keys = ("id",) if sort == "id" else ("quantity", "id")
+        position = decode_cursor(cursor, **{key: INTEGER for key in keys})
+        rows = InventoryService.get_inventory_listing(
+            db,
+            product_id=product_id,
+            component_id=component_id,
+            category=category,
+            stock_status=status_filter,
+            name_prefix=name_prefix,
+            sort=sort,
+            after=position,
+            limit=limit + 1
+        )
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({key: rows[-1][key] for key in keys})
+        return InventoryListPage(items=[InventoryListItem(**row) for row in rows], next_cursor=next_cursor)
+
     @staticmethod
     def get_inventory_by_option(db: Session, option_id: int) -> Inventory:
         """Get inventory record for a specific option"""
@@ -21,14 +73,7 @@ class InventoryController:
 
     @staticmethod
     def create_inventory(db: Session, inventory: InventoryCreate) -> Inventory:
-        """Create a new inventory record"""
-        # Check if inventory for this option already exists
-        existing = InventoryService.get_inventory_by_option(db, option_id=inventory.option_id)
-        if existing:
-            raise HTTPException(
-                status_code=400, 
-                detail="Inventory record already exists for this option. Use update instead."
-            )
+        """Create or replace the inventory record for an option"""
         return InventoryService.create_inventory(db=db, inventory=inventory)
 
     @staticmethod
@@ -2,8 +2,13 @@ from typing import List, Dict, Any, Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app import ingestion
 from app.services.order_service import OrderService
-from app.schemas import Order, OrderCreate, OrderUpdate, OrderFilter
+from app.services.order_archive_service import OrderArchiveService, ARCHIVED_ORDER_REASON
+from app.schemas import Order, OrderCreate, OrderUpdate, OrderFilter, OrderBulkStatusUpdate, OrderBulkStatusResult, OrderReceipt, OrderIngestionStatus, OrderIngestionStats
+
+# Most orders moved by one bulk status update
+MAX_BULK_STATUS_ORDERS = 1000
 
 class OrderController:
     @staticmethod
@@ -13,8 +18,10 @@ class OrderController:
 
     @staticmethod
     def get_order(db: Session, order_id: int) -> Order:
-        """Get a specific order by ID"""
+        """Get a specific order by ID, from the archive if it was archived"""
         db_order = OrderService.get_order(db, order_id=order_id)
+        if db_order is None:
+            db_order = OrderArchiveService.get_archived_order(db, order_id=order_id)
         if db_order is None:
             raise HTTPException(status_code=404, detail="Order not found")
         return db_order
@@ -24,21 +31,72 @@ class OrderController:
         """Create a new order"""
         return OrderService.create_order(db=db, order=order)
 
+    @staticmethod
+    def ingestion_enabled() -> bool:
+        """Whether new orders go through the ingestion queue (ORDER_INGESTION_PATH)"""
+        return ingestion.order_ingestion is not None
+
+    @staticmethod
+    def enqueue_order(order: OrderCreate) -> OrderReceipt:
+        """Journal a new order for the ingestion worker"""
+        try:
+            reference = ingestion.order_ingestion.enqueue(order)
+        except ingestion.IngestionUnavailable as error:
+            raise HTTPException(status_code=503, detail=str(error))
+        return OrderReceipt(reference=reference, status=ingestion.QUEUED)
+
+    @staticmethod
+    def get_ingestion_stats() -> OrderIngestionStats:
+        """Get the counters of the ingestion queue"""
+        if ingestion.order_ingestion is None:
+            raise HTTPException(status_code=404, detail="Order ingestion is not enabled")
+        return ingestion.order_ingestion.stats()
+
+    @staticmethod
+    def get_ingestion_status(db: Session, reference: str) -> OrderIngestionStatus:
+        """Get the status of an order accepted by the ingestion queue"""
+        if ingestion.order_ingestion is None:
+            raise HTTPException(status_code=404, detail="Order ingestion is not enabled")
+        ingestion_status = ingestion.order_ingestion.get_status(db, reference)
+        if ingestion_status is None:
+            raise HTTPException(status_code=404, detail="Order reference not found")
+        return ingestion_status
+
     @staticmethod
     def update_order(db: Session, order_id: int, order: OrderUpdate) -> Order:
         """Update an order's information"""
         order_data = order.dict(exclude_unset=True)
         db_order = OrderService.update_order(db, order_id=order_id, order_data=order_data)
         if db_order is None:
-            raise HTTPException(status_code=404, detail="Order not found")
+            OrderController._raise_not_found(db, order_id)
         return db_order
 
+    @staticmethod
+    def bulk_update_status(db: Session, request: OrderBulkStatusUpdate) -> OrderBulkStatusResult:
+        """Move a batch of orders to a status, reporting the orders that could not be moved"""
+        order_ids = list(dict.fromkeys(request.order_ids))
+        if not order_ids:
+            raise HTTPException(status_code=400, detail="order_ids must not be empty")
+        if len(order_ids) > MAX_BULK_STATUS_ORDERS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_STATUS_ORDERS} orders can be updated at once")
+        updated, failed = OrderService.bulk_update_status(
+            db, order_ids, request.status, from_status=request.from_status
+        )
+        return OrderBulkStatusResult(status=request.status, updated=updated, failed=failed)
+
     @staticmethod
     def delete_order(db: Session, order_id: int) -> None:
         """Delete an order"""
         success = OrderService.delete_order(db, order_id=order_id)
         if not success:
-            raise HTTPException(status_code=404, detail="Order not found")
+            OrderController._raise_not_found(db, order_id)
+
+    @staticmethod
+    def _raise_not_found(db: Session, order_id: int) -> None:
+        """404 for an unknown order, 409 for an archived one, which cannot change"""
+        if OrderArchiveService.is_archived(db, order_id):
+            raise HTTPException(status_code=409, detail=ARCHIVED_ORDER_REASON)
+        raise HTTPException(status_code=404, detail="Order not found")
             
     @staticmethod
     def filter_orders(
@@ -47,5 +105,5 @@ class OrderController:
         skip: int = 0, 
         limit: int = 100
     ) -> List[Order]:
-        """Filter orders by date range, status, and product category"""
+        """Filter orders by date range, status, product category, product and option"""
         return OrderService.filter_orders(db, filters=filters, skip=skip, limit=limit) 
\ No newline at end of file
@@ -2,6 +2,10 @@ from sqlalchemy.orm import Session
 
 from app.models.price_rule import PriceRule
 from app.schemas.price_rule import PriceRuleCreate, PriceRule as PriceRuleSchema
+from app.models.enums import CatalogEntityEnum, ChangeOperationEnum
+from app.services.price_range_service import PriceRangeService
+from app.services.catalog_change_service import CatalogChangeService
+from app.cache import invalidate_products
 
 class PriceRuleController:
 
@@ -28,7 +32,10 @@ class PriceRuleController:
             product_id=product_id
         )
         db.add(db_price_rule)
+        PriceRangeService.refresh(db, [product_id])
+        CatalogChangeService.record(db, [(CatalogEntityEnum.PRICE_RULE, db_price_rule.id, product_id, ChangeOperationEnum.CREATED)])
         db.commit()
+        invalidate_products(product_id)
         db.refresh(db_price_rule)
         return db_price_rule
 
@@ -36,9 +43,21 @@ class PriceRuleController:
     def update_price_rule(db: Session, price_rule_id: int, price_rule: PriceRuleCreate):
         db_price_rule = PriceRuleController.get_price_rule(db, price_rule_id)
         if db_price_rule:
+            previous_product_id = db_price_rule.product_id
             for key, value in price_rule.dict().items():
                 setattr(db_price_rule, key, value)
+            PriceRangeService.refresh(db, [previous_product_id, db_price_rule.product_id])
+            if db_price_rule.product_id == previous_product_id:
+                changes = [(CatalogEntityEnum.PRICE_RULE, price_rule_id, previous_product_id, ChangeOperationEnum.UPDATED)]
+            else:
+                # Moving a rule to another product changes both products
+                changes = [
+                    (CatalogEntityEnum.PRICE_RULE, price_rule_id, previous_product_id, ChangeOperationEnum.DELETED),
+                    (CatalogEntityEnum.PRICE_RULE, price_rule_id, db_price_rule.product_id, ChangeOperationEnum.CREATED)
+                ]
+            CatalogChangeService.record(db, changes)
             db.commit()
+            invalidate_products(previous_product_id, db_price_rule.product_id)
             db.refresh(db_price_rule)
         return db_price_rule
 
@@ -46,7 +65,11 @@ class PriceRuleController:
     def delete_price_rule(db: Session, price_rule_id: int):
         db_price_rule = PriceRuleController.get_price_rule(db, price_rule_id)
         if db_price_rule:
+            product_id = db_price_rule.product_id
             db.delete(db_price_rule)
+            PriceRangeService.refresh(db, [product_id])
+            CatalogChangeService.record(db, [(CatalogEntityEnum.PRICE_RULE, price_rule_id, product_id, ChangeOperationEnum.DELETED)])
             db.commit()
+            invalidate_products(product_id)
             return True
         return False 
\ No newline at end of file
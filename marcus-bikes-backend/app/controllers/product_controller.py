@@ -2,21 +2,201 @@ from typing import List, Dict, Any, Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.services.product_service import ProductService
-from app.schemas import ProductCreate, FrontendProduct, ProductBase, CategoryProductCount
+from app.services.product_service import ProductService, PRODUCT_SUMMARY_FIELDS, PRODUCT_SORTS
+from app.services.search_service import SearchService
+from app.schemas import ProductCreate, FrontendProduct, ProductBase, CategoryProductCount, ProductSummary, ProductSummaryPage, ProductSearchPage, ProductCount, ConfigurationCheck, ConfigurationQuote
+from app.pagination import encode_cursor, decode_cursor, INTEGER, OPTIONAL_NUMBER
+from app.responses import EncodedBody, list_adapter, ENCODED_BODY_CODEC
+from app.cache import catalog_cache, response_cache, product_key, product_tags, ModelCodec, FlightTimeout, CATEGORY_SUMMARIES_KEY
+from app.snapshot import catalog_snapshot
+from app.configuration import check_product_configuration
 from app.models.enums import CategoryEnum
 
+# Most products a single batch request may ask for
+MAX_BATCH_PRODUCTS = 100
+
+# Largest page of search results
+MAX_SEARCH_LIMIT = 100
+
+# Largest page of product summaries
+MAX_SUMMARY_LIMIT = 500
+
+# Types of the sort keys in product summary cursors
+SUMMARY_CURSOR_TYPES = {"id": INTEGER, "min_price": OPTIONAL_NUMBER}
+
+PRODUCT_CODEC = ModelCodec(FrontendProduct)
+
+category_counts_adapter = list_adapter(CategoryProductCount)
+
 class ProductController:
     @staticmethod
-    def get_products(db: Session, category: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[FrontendProduct]:
+    def get_products(
+        db: Session,
+        category: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        sort: str = "id"
+    ) -> List[FrontendProduct]:
         """Get all products or products by category"""
+        ProductController.validate_sort(sort)
         if category:
-            db_products = ProductService.get_products_by_category(db, category, skip=skip, limit=limit)
+            db_products = ProductService.get_products_by_category(db, category, skip=skip, limit=limit, sort=sort)
         else:
-            db_products = ProductService.get_products(db, skip=skip, limit=limit)
+            db_products = ProductService.get_products(db, skip=skip, limit=limit, sort=sort)
         
         return [ProductService.product_to_frontend(product) for product in db_products]
 
+    @staticmethod
+    def validate_sort(sort: str) -> None:
+        """Check a listing sort order"""
+        if sort not in PRODUCT_SORTS:
+            raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(PRODUCT_SORTS)}")
+
+    @staticmethod
+    def parse_product_ids(ids: str) -> List[int]:
+        """Parse a comma-separated list of product IDs"""
+        try:
+            product_ids = [int(product_id) for product_id in ids.split(",") if product_id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+        if len(product_ids) > MAX_BATCH_PRODUCTS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PRODUCTS} ids can be requested at once")
+        return product_ids
+
+    @staticmethod
+    def get_products_by_ids(db: Session, product_ids: List[int]) -> List[FrontendProduct]:
+        """Get products in the requested order, skipping unknown and repeated IDs
+
+        Products are served from the catalog cache when possible, and the
+        missing ones are loaded together and cached for the next request.
+        With a shared catalog snapshot, they are served from the snapshot
+        instead, and the ones changed since it was built from the database,
+        without caching: every snapshot read checks the catalog version, so
+        writes made through other workers are seen, which this worker's
+        cache would not.
+        """
+        unique_ids = list(dict.fromkeys(product_ids))
+        if catalog_snapshot is not None:
+            products = {
+                product_id: FrontendProduct.model_validate(data)
+                for product_id, data in catalog_snapshot.get_products(db, unique_ids).items()
+            }
+            missing = [product_id for product_id in unique_ids if product_id not in products]
+            if missing:
+                for db_product in ProductService.get_products_by_ids(db, missing):
+                    products[db_product.id] = ProductService.product_to_frontend(db_product)
+            return [products[product_id] for product_id in unique_ids if product_id in products]
+
+        cached = catalog_cache.get_many([product_key(product_id) for product_id in unique_ids], codec=PRODUCT_CODEC)
+        products = {product_id: product for product_id, product in zip(unique_ids, cached) if product is not None}
+        missing = [product_id for product_id in unique_ids if product_id not in products]
+
+        if missing:
+            # Concurrent requests missing the same products share one load
+            try:
+                loaded = catalog_cache.flights.do(
+                    ("products", *sorted(missing)),
+                    lambda: ProductController._load_products(db, missing)
+                )
+            except FlightTimeout:
+                raise HTTPException(status_code=503, detail="Products are being loaded, please retry")
+            for product in loaded:
+                products[product.id] = product
+
+        return [products[product_id] for product_id in unique_ids if product_id in products]
+
+    @staticmethod
+    def _load_products(db: Session, product_ids: List[int]) -> List[FrontendProduct]:
+        """Load products from the database and cache them"""
+        loaded = {
+            product_key(db_product.id): ProductService.product_to_frontend(db_product)
+            for db_product in ProductService.get_products_by_ids(db, product_ids)
+        }
+        if loaded:
+            catalog_cache.set_many(
+                loaded,
+                tags={key: product_tags(product) for key, product in loaded.items()},
+                codec=PRODUCT_CODEC
+            )
+        return list(loaded.values())
+
+    @staticmethod
+    def get_product_summaries(
+        db: Session,
+        fields: Optional[str] = None,
+        category: Optional[str] = None,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> ProductSummaryPage:
+        """Get a page of product summaries, optionally restricted to some fields"""
+        if not 1 <= limit <= MAX_SUMMARY_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SUMMARY_LIMIT}")
+        ProductController.validate_sort(sort)
+        selected = PRODUCT_SUMMARY_FIELDS
+        if fields:
+            selected = tuple(field.strip() for field in fields.split(",") if field.strip() and field.strip() != "id")
+            unknown = [field for field in selected if field not in PRODUCT_SUMMARY_FIELDS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+        # Price sorts page on (min_price, id), so min_price is read even when not requested
+        keys = ("id",) if sort == "id" else ("min_price", "id")
+        queried = selected if set(keys) <= {"id", *selected} else (*selected, "min_price")
+        rows = ProductService.get_product_summaries(
+            db,
+            fields=queried,
+            category=category,
+            sort=sort,
+            after=decode_cursor(cursor, **{key: SUMMARY_CURSOR_TYPES[key] for key in keys}),
+            limit=limit + 1
+        )
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({key: rows[-1][key] for key in keys})
+        if queried is not selected:
+            for row in rows:
+                del row["min_price"]
+        return ProductSummaryPage(items=[ProductSummary(**row) for row in rows], next_cursor=next_cursor)
+
+    @staticmethod
+    def get_product_count(db: Session, category: Optional[str] = None) -> ProductCount:
+        """Count the products, optionally in one category"""
+        return ProductCount(count=ProductService.count_products(db, category=category))
+
+    @staticmethod
+    def search_products(
+        db: Session,
+        q: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        options: Optional[List[str]] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> ProductSearchPage:
+        """Search products with facet counts"""
+        if skip < 0 or not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise HTTPException(status_code=400, detail=f"skip must be positive and limit between 1 and {MAX_SEARCH_LIMIT}")
+        if category and category not in {member.value for member in CategoryEnum}:
+            raise HTTPException(status_code=400, detail=f"Unknown category: {category}")
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise HTTPException(status_code=400, detail="min_price must not be greater than max_price")
+
+        result = SearchService.search(
+            db,
+            query=q,
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            options=[option for option in options or [] if option],
+            skip=skip,
+            limit=limit
+        )
+        return ProductSearchPage(**result)
+
     @staticmethod
     def get_categories(db: Session) -> List[Dict[str, str]]:
         """Get all available product categories"""
@@ -25,10 +205,46 @@ class ProductController:
     @staticmethod
     def get_product(db: Session, product_id: int) -> FrontendProduct:
         """Get a specific product by ID"""
-        db_product = ProductService.get_product(db, product_id=product_id)
-        if db_product is None:
+        products = ProductController.get_products_by_ids(db, [product_id])
+        if not products:
             raise HTTPException(status_code=404, detail="Product not found")
-        return ProductService.product_to_frontend(db_product)
+        return products[0]
+
+    @staticmethod
+    def get_product_body(db: Session, product_id: int) -> EncodedBody:
+        """Get a product's encoded response body, cached with its compressed variants
+
+        With a shared catalog snapshot, bodies are not cached: the snapshot
+        already shares the products between workers, and every read of it
+        checks the catalog version, which a per-worker body cache would skip.
+        """
+        if catalog_snapshot is not None:
+            product = ProductController.get_product(db, product_id)
+            return EncodedBody(product.model_dump_json().encode("utf-8"))
+        key = product_key(product_id)
+        body = response_cache.get(key, codec=ENCODED_BODY_CODEC)
+        if body is None:
+            product = ProductController.get_product(db, product_id)
+            body = EncodedBody(product.model_dump_json().encode("utf-8"))
+            response_cache.set(key, body, tags=product_tags(product), codec=ENCODED_BODY_CODEC)
+        return body
+
+    @staticmethod
+    def check_configuration(db: Session, product_id: int, configuration: ConfigurationCheck) -> ConfigurationQuote:
+        """Price a configuration of a product and check it can be ordered
+
+        Uses the dependency masks and price rule index of the shared catalog
+        snapshot when the product is current in it, otherwise compiles them
+        from the product.
+        """
+        result = None
+        if catalog_snapshot is not None:
+            result = catalog_snapshot.check_configuration(db, product_id, configuration.optionIds)
+        if result is None:
+            product = ProductController.get_product(db, product_id)
+            result = check_product_configuration(product.model_dump(), configuration.optionIds)
+        price, problems = result
+        return ConfigurationQuote(price=price, valid=not problems, problems=problems)
 
     @staticmethod
     def create_product(db: Session, product: ProductCreate) -> FrontendProduct:
@@ -59,6 +275,18 @@ class ProductController:
 
     @staticmethod
     def get_category_counts(db: Session) -> List[CategoryProductCount]:
-        """Get counts of products for each category"""
-        counts_dict = ProductService.count_products_by_category(db)
-        return [CategoryProductCount(category=category, count=count) for category, count in counts_dict.items()] 
\ No newline at end of file
+        """Get counts, price range and in-stock counts of products for each category"""
+        try:
+            summaries = ProductService.get_category_summaries(db)
+        except FlightTimeout:
+            raise HTTPException(status_code=503, detail="Category counts are being computed, please retry")
+        return [CategoryProductCount(**summary) for summary in summaries]
+
+    @staticmethod
+    def get_category_counts_body(db: Session) -> EncodedBody:
+        """Get the encoded category counts response body, cached with its compressed variants"""
+        body = response_cache.get(CATEGORY_SUMMARIES_KEY, codec=ENCODED_BODY_CODEC)
+        if body is None:
+            body = EncodedBody(category_counts_adapter.dump_json(ProductController.get_category_counts(db)))
+            response_cache.set(CATEGORY_SUMMARIES_KEY, body, codec=ENCODED_BODY_CODEC)
+        return body 
\ No newline at end of file
@@ -1,3 +1,4 @@
 from app.database.session import engine, SessionLocal, get_db
+from app.database.instrumentation import QueryStats, current_query_stats, track_queries
 
-__all__ = ["engine", "SessionLocal", "get_db"] 
\ No newline at end of file
+__all__ = ["engine", "SessionLocal", "get_db", "QueryStats", "current_query_stats", "track_queries"] 
\ No newline at end of file
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Maximum number of characters kept from the slowest statement
+MAX_STATEMENT_LENGTH = 500
+
+
+class QueryStats:
+    """Number, total duration and slowest statement of the queries run in a scope"""
+
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, duration: float) -> None:
+        """Record one executed statement and its duration in seconds"""
+        self.count += 1
+        self.total_time += duration
+        if duration >= self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = " ".join(statement.split())[:MAX_STATEMENT_LENGTH]
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_time * 1000
+
+    @property
+    def slowest_ms(self) -> float:
+        return self.slowest_time * 1000
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Process-wide observers called with (statement, duration) for every executed statement
+_query_listeners: List[Callable[[str, float], None]] = []
+
+
+def add_query_listener(listener: Callable[[str, float], None]) -> None:
+    """Call ``listener`` with the statement and its duration after every query"""
+    _query_listeners.append(listener)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Get the stats collected for the current request or tracking scope, if any"""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect the queries executed within the block, e.g. to assert query budgets"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    for listener in _query_listeners:
+        listener(statement, duration)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute, drop their start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
@@ -0,0 +1,138 @@
+"""
+Monthly range partitions on Postgres.
+
+The ``orders`` table is partitioned by ``created_at`` on Postgres (see the
+``orders_partitioning`` migration): one partition per month, named
+``orders_pYYYYMM``, plus ``orders_default`` for rows outside every
+partition. Queries bounded on ``created_at`` only read the partitions of
+their range, and listings sorted by ``created_at`` stop after the newest
+ones.
+
+Partitions are created ahead of time, at startup and by the archival
+command; rows that landed in the default partition meanwhile are moved into
+the new partition when it is created. On other databases, or when the
+table is not partitioned, every function here does nothing.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+
+# Months created past the current one
+PARTITION_MONTHS_AHEAD = 3
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def next_month(moment: datetime) -> datetime:
+    return datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_month(table: str, name: str) -> Optional[datetime]:
+    """The month of a partition from its name; None for the default partition"""
+    suffix = name[len(table) + 2:]
+    if not name.startswith(f"{table}_p") or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return datetime(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def _dialect_name(db) -> str:
+    # Sessions, or connections
+    dialect = getattr(db, "dialect", None) or db.get_bind().dialect
+    return dialect.name
+
+
+def is_partitioned(db, table: str) -> bool:
+    """Whether ``table`` is a partitioned Postgres table; ``db`` is a session or a connection"""
+    if _dialect_name(db) != "postgresql":
+        return False
+    return bool(db.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": table}
+    ).scalar())
+
+
+def list_partitions(db, table: str) -> List[str]:
+    return list(db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+        ),
+        {"table": table}
+    ).scalars())
+
+
+def create_month_partition(db, table: str, month: datetime, column: str = "created_at") -> str:
+    """Create the partition of a month, moving its rows out of the default partition
+
+    The partition is built detached and attached once filled, so the
+    default partition never holds rows of an attached range.
+    """
+    name = partition_name(table, month)
+    bounds = {"start": month, "end": next_month(month)}
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {table}_default WHERE {column} >= :start AND {column} < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds
+    )
+    start, end = (f"'{bound:%Y-%m-%d}'" for bound in (bounds["start"], bounds["end"]))
+    db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({start}) TO ({end})"))
+    return name
+
+
+def ensure_monthly_partitions(
+    db,
+    table: str = "orders",
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    since: Optional[datetime] = None,
+    now: Optional[datetime] = None
+) -> List[str]:
+    """Create the missing partitions from ``since`` (default: this month) to ``months_ahead`` months from now
+
+    Returns the names of the partitions created; committing is left to the caller.
+    """
+    if not is_partitioned(db, table):
+        return []
+    # Workers starting together create each partition once
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:table))"), {"table": table})
+    existing = set(list_partitions(db, table))
+    if f"{table}_default" not in existing:
+        db.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+    month = month_start(since or now or datetime.utcnow())
+    last = month_start(now or datetime.utcnow())
+    for _ in range(months_ahead):
+        last = next_month(last)
+    created = []
+    while month <= last:
+        if partition_name(table, month) not in existing:
+            created.append(create_month_partition(db, table, month))
+        month = next_month(month)
+    return created
+
+
+def drop_empty_partitions(db, before: datetime, table: str = "orders") -> List[str]:
+    """Drop the month partitions entirely before ``before`` that hold no rows any more
+
+    Returns the names of the partitions dropped; committing is left to the caller.
+    """
+    if not is_partitioned(db, table):
+        return []
+    dropped = []
+    for name in list_partitions(db, table):
+        month = partition_month(table, name)
+        if month is None or next_month(month) > before:
+            continue
+        if db.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+            db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
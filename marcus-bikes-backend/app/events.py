@@ -0,0 +1,128 @@
+"""
+In-process broadcast of catalog change events to server-sent event streams.
+
+Writes publish after their transaction commits, usually from the threadpool
+running sync routes, while the streams are served on the event loop. Every
+event is encoded once and handed to all subscribers through
+``call_soon_threadsafe``. Each subscriber has a bounded queue: a client that
+falls behind has its backlog dropped and gets a single ``resync`` event, so
+that slow connections never hold up writers or other clients.
+
+The hub only reaches the streams of its own process.
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+# Events buffered per client before it is asked to resync
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_SECONDS = 15
+
+KEEPALIVE_FRAME = b": keep-alive\n\n"
+
+# Sent first: how long clients wait before reconnecting, in milliseconds
+RETRY_FRAME = b"retry: 3000\n\n"
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """Encode one server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+RESYNC_FRAME = format_event("resync", {"reason": "too many pending events"})
+
+
+class Subscription:
+    """The queue of one stream, optionally restricted to the events of one product"""
+
+    def __init__(self, queue_size: int, product_id: Optional[int] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.product_id = product_id
+        self.dropped = 0
+
+    def put(self, frame: bytes, product_id: Optional[int]) -> None:
+        if self.product_id is not None and product_id != self.product_id:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too slow: drop the backlog, the client refetches what it shows
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.dropped += 1
+            self.queue.put_nowait(RESYNC_FRAME)
+
+    async def get(self, timeout: float = KEEPALIVE_SECONDS) -> bytes:
+        """Next frame, or a keep-alive comment after ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return KEEPALIVE_FRAME
+
+
+class BroadcastHub:
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, product_id: Optional[int] = None) -> Subscription:
+        """Add a subscriber; must be called from the event loop serving the streams"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self.queue_size, product_id)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> None:
+        """Send an event to every subscriber; safe to call from any thread"""
+        loop = self._loop
+        if not self._subscribers or loop is None:
+            return
+        frame = format_event(event, data, event_id)
+        product_id = data.get("product_id")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(frame, product_id)
+            return
+        try:
+            loop.call_soon_threadsafe(self._fan_out, frame, product_id)
+        except RuntimeError:
+            # The loop was closed, e.g. at shutdown
+            self._loop = None
+
+    def _fan_out(self, frame: bytes, product_id: Optional[int]) -> None:
+        for subscription in list(self._subscribers):
+            subscription.put(frame, product_id)
+
+
+async def event_stream(hub: BroadcastHub, product_id: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Frames of a server-sent event stream, until the client disconnects"""
+    subscription = hub.subscribe(product_id)
+    try:
+        yield RETRY_FRAME
+        while True:
+            yield await subscription.get()
+    finally:
+        hub.unsubscribe(subscription)
+
+
+catalog_events = BroadcastHub()
@@ -0,0 +1,359 @@
+"""
+Asynchronous order ingestion.
+
+With ``ORDER_INGESTION_PATH`` set, ``POST /orders`` validates the order,
+appends it to a local journal file and answers 202 with a reference once
+the journal is on disk; a background worker then writes the journaled
+orders to the database in multi-row INSERTs of up to
+``ORDER_INGESTION_BATCH_SIZE``, one commit per batch.
+
+Appends are group-committed: a writer thread writes every order waiting
+and fsyncs once for all of them, so concurrent checkouts share the cost of
+a flush instead of each paying for a database commit. The byte offset of
+the orders already written is kept next to the journal. Orders carry their
+reference into the ``orders`` table, where a unique index makes replaying a
+batch after a crash harmless, and where status lookups find them.
+
+The journal is local to the process: it is locked when the worker starts,
+and a second process given the same path fails to start with
+``IngestionConfigurationError``, so each worker needs its own path.
+"""
+
+import datetime
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.schemas import OrderCreate, OrderIngestionStatus, OrderIngestionStats
+
+try:
+    import fcntl
+except ImportError:  # Windows: the journal is not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+WRITTEN = "written"
+FAILED = "failed"
+
+# Seconds the worker waits before writing a partial batch
+ORDER_INGESTION_FLUSH_INTERVAL = 0.05
+
+# Seconds before a batch is retried when the database is unavailable,
+# doubled after each further failure up to MAX_RETRY_DELAY
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+
+
+class IngestionUnavailable(Exception):
+    """The journal cannot take orders (stopped, or the append failed)"""
+
+
+class IngestionConfigurationError(RuntimeError):
+    """The journal is used by another process"""
+
+
+class OrderIngestion:
+    def __init__(
+        self,
+        path: str,
+        session_factory: Callable[[], Session],
+        batch_size: int = 500,
+        flush_interval: float = ORDER_INGESTION_FLUSH_INTERVAL
+    ):
+        self.path = path
+        self.offset_path = path + ".offset"
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+
+        self._file = None
+        # Serializes writes to the file, truncation and offset updates
+        self._file_lock = threading.Lock()
+        # Guards the append buffer and wakes enqueuers and both threads
+        self._condition = threading.Condition()
+        self._buffer: List[bytes] = []
+        self._appended = 0
+        self._synced = 0
+        self._append_error: Optional[BaseException] = None
+        # Journaled orders not yet written; the worker is woken early for a full batch
+        self._backlog = 0
+        self._wakeup = threading.Event()
+        self._statuses: Dict[str, Dict[str, Any]] = {}
+        self._stopping = False
+        # Cuts the retry delay short at shutdown
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.offset = 0
+
+    def open(self) -> None:
+        """Lock the journal and recover the orders left in it; done by start()"""
+        if self._file is not None:
+            return
+        journal = open(self.path, "ab")
+        if fcntl is not None:
+            try:
+                fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                journal.close()
+                raise IngestionConfigurationError(
+                    f"The order journal {self.path} is used by another process: with several workers, "
+                    "give each its own ORDER_INGESTION_PATH, or run a single worker"
+                )
+        self._file = journal
+        self.offset = self._read_offset()
+        self._recover()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self.offset_path) as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_offset(self, offset: int) -> None:
+        temporary = self.offset_path + ".tmp"
+        with open(temporary, "w") as file:
+            file.write(str(offset))
+        os.replace(temporary, self.offset_path)
+        self.offset = offset
+
+    def _recover(self) -> None:
+        """Drop a torn last line and mark the journaled orders not yet written as queued"""
+        with open(self.path, "rb") as file:
+            data = file.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            logger.warning("Dropping %d bytes of an incomplete order in %s", len(data) - complete, self.path)
+            self._file.truncate(complete)
+        if self.offset > complete:
+            self._write_offset(complete)
+        for line in data[self.offset:complete].splitlines():
+            self._statuses[orjson.loads(line)["reference"]] = {"status": QUEUED}
+            self._backlog += 1
+
+    def start(self) -> None:
+        """Open the journal, then start the journal writer and the database worker"""
+        self.open()
+        for target, name in ((self._append_loop, "order-journal"), (self._ingest_loop, "order-ingestion")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop taking orders, write the queued ones and close the journal"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._wakeup.set()
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        try:
+            self.drain()
+        except Exception:
+            logger.exception("Could not write the queued orders at shutdown")
+        self.close()
+
+    def alive(self) -> bool:
+        """Whether both threads are running and the journal can take orders"""
+        return (
+            bool(self._threads)
+            and all(thread.is_alive() for thread in self._threads)
+            and self._append_error is None
+        )
+
+    def enqueue(self, order: OrderCreate) -> str:
+        """Journal an order and return its reference once it is on disk"""
+        reference = uuid.uuid4().hex
+        record = {
+            "reference": reference,
+            "created_at": datetime.datetime.utcnow().isoformat(),
+            "order": order.model_dump(mode="json")
+        }
+        line = orjson.dumps(record) + b"\n"
+        with self._condition:
+            if self._stopping or not self._threads:
+                raise IngestionUnavailable("Order ingestion is not running")
+            self._statuses[reference] = {"status": QUEUED}
+            self._buffer.append(line)
+            self._appended += 1
+            sequence = self._appended
+            self._condition.notify_all()
+            while self._synced < sequence and self._append_error is None:
+                self._condition.wait()
+            if self._synced < sequence:
+                self._statuses.pop(reference, None)
+                raise IngestionUnavailable(f"Could not journal the order: {self._append_error}")
+        return reference
+
+    def _append_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._buffer and not self._stopping:
+                    self._condition.wait()
+                if not self._buffer:
+                    return
+                lines, self._buffer = self._buffer, []
+            try:
+                with self._file_lock:
+                    self._file.write(b"".join(lines))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+            except OSError as error:
+                logger.exception("Could not append to the order journal %s", self.path)
+                with self._condition:
+                    self._append_error = error
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._synced += len(lines)
+                self._backlog += len(lines)
+                if self._backlog >= self.batch_size:
+                    self._wakeup.set()
+                self._condition.notify_all()
+
+    def _ingest_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopping:
+                return
+            try:
+                self.drain()
+                self.failures = 0
+            except Exception:
+                # Anything but a crash of the worker: the batch is retried from the journal
+                self.failures += 1
+                delay = min(RETRY_DELAY * 2 ** (self.failures - 1), MAX_RETRY_DELAY)
+                logger.exception("Could not write queued orders, retrying in %.0fs", delay)
+                self._stopped.wait(delay)
+
+    def _read_batch(self) -> List[bytes]:
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            lines = []
+            for line in file:
+                if not line.endswith(b"\n") or len(lines) == self.batch_size:
+                    break
+                lines.append(line)
+        return lines
+
+    def drain(self) -> int:
+        """Write every journaled order to the database, batch by batch; returns how many were written"""
+        written = 0
+        while True:
+            lines = self._read_batch()
+            if not lines:
+                self._compact()
+                return written
+            records = [orjson.loads(line) for line in lines]
+            written += self._write_batch(records)
+            with self._file_lock:
+                self._write_offset(self.offset + sum(len(line) for line in lines))
+            with self._condition:
+                self._backlog -= len(lines)
+
+    def _compact(self) -> None:
+        """Empty the journal once everything in it has been written"""
+        with self._condition, self._file_lock:
+            if self._buffer or self.offset == 0 or self.offset != os.fstat(self._file.fileno()).st_size:
+                return
+            self._file.truncate(0)
+            self._write_offset(0)
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> int:
+        from app.services.order_service import OrderService
+
+        rows = [self._row(record) for record in records]
+        with self.session_factory() as db:
+            try:
+                order_ids, existing = OrderService.insert_orders(db, rows)
+                db.commit()
+            except OperationalError:
+                raise
+            except DBAPIError:
+                # Find the offending orders one by one
+                db.rollback()
+                order_ids, existing = {}, set()
+                for row in rows:
+                    try:
+                        inserted, already_written = OrderService.insert_orders(db, [row])
+                        db.commit()
+                        order_ids.update(inserted)
+                        existing |= already_written
+                    except OperationalError:
+                        raise
+                    except DBAPIError as error:
+                        db.rollback()
+                        logger.error("Could not write queued order %s: %s", row["reference"], error)
+                        with self._condition:
+                            self._statuses[row["reference"]] = {"status": FAILED, "error": str(error.orig)}
+        # Orders written before a crash are queued again by _recover, and skipped
+        with self._condition:
+            for reference in (*order_ids, *existing):
+                self._statuses.pop(reference, None)
+        self.written += len(order_ids)
+        self.batches += 1
+        return len(order_ids)
+
+    @staticmethod
+    def _row(record: Dict[str, Any]) -> Dict[str, Any]:
+        created_at = datetime.datetime.fromisoformat(record["created_at"])
+        return {
+            **record["order"],
+            "reference": record["reference"],
+            "created_at": created_at,
+            "updated_at": created_at
+        }
+
+    def get_status(self, db: Session, reference: str) -> Optional[OrderIngestionStatus]:
+        """Queued or failed orders are known here, written ones are found in the database"""
+        from app.services.order_service import OrderService
+
+        status = self._statuses.get(reference)
+        if status is not None:
+            return OrderIngestionStatus(reference=reference, **status)
+        order_id = OrderService.get_order_id_by_reference(db, reference)
+        if order_id is None:
+            return None
+        return OrderIngestionStatus(reference=reference, status=WRITTEN, order_id=order_id)
+
+    def stats(self) -> OrderIngestionStats:
+        with self._condition:
+            statuses = list(self._statuses.values())
+        return OrderIngestionStats(
+            queued=sum(status["status"] == QUEUED for status in statuses),
+            written=self.written,
+            failed=sum(status["status"] == FAILED for status in statuses),
+            batches=self.batches
+        )
+
+
+def ingestion_from_environment() -> Optional[OrderIngestion]:
+    path = os.getenv("ORDER_INGESTION_PATH")
+    if not path:
+        return None
+    from app.database.session import SessionLocal
+
+    return OrderIngestion(path, SessionLocal, batch_size=int(os.getenv("ORDER_INGESTION_BATCH_SIZE", "500")))
+
+
+# Only used when ORDER_INGESTION_PATH is set
+order_ingestion = ingestion_from_environment()
@@ -1,5 +1,9 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.routes.product_routes import router as product_router
 from app.routes.option_routes import router as option_router
@@ -7,13 +11,51 @@ from app.routes.order_routes import router as order_router
 from app.routes.inventory_routes import router as inventory_router
 from app.routes.admin_routes import router as admin_router
 from app.routes.price_rule_routes import router as price_rule_router
-from app.database.session import engine
+from app.routes.catalog_routes import router as catalog_router
+from app.database.session import engine, SessionLocal
+from app.middleware import QueryTimingMiddleware, MetricsMiddleware, CompressionMiddleware, IdempotencyMiddleware
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from app.responses import FastJSONResponse
 from app.models.base import Base
+from app import warmup, ingestion, outbox, order_archive
 
 # Create the database tables
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Marcus Bikes Backend API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the coming month partitions of orders (Postgres)
+    order_archive.create_order_partitions(SessionLocal)
+    # Warm the catalog cache in the background; /ready reports when it is done
+    if warmup.cache_warmer is not None:
+        warmup.cache_warmer.start()
+    # Write queued orders in the background (ORDER_INGESTION_PATH); fails
+    # with IngestionConfigurationError when another process holds the journal
+    if ingestion.order_ingestion is not None:
+        ingestion.order_ingestion.start()
+    # Dispatch outbox events to their sinks (OUTBOX_SINKS)
+    if outbox.outbox_relay is not None:
+        outbox.outbox_relay.start()
+    yield
+    # Writing the queued orders and sending the last events block, so they run off the event loop
+    if ingestion.order_ingestion is not None:
+        await run_in_threadpool(ingestion.order_ingestion.stop)
+    if outbox.outbox_relay is not None:
+        await run_in_threadpool(outbox.outbox_relay.stop)
+    if warmup.cache_warmer is not None:
+        await warmup.cache_warmer.stop()
+
+# Routes without their own response encoding are encoded with orjson
+app = FastAPI(
+    title="Marcus Bikes Backend API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
+
+# Replays of mutating requests retried with an Idempotency-Key header;
+# added first so that replayed responses still get the CORS headers
+app.add_middleware(IdempotencyMiddleware)
 
 # CORS middleware configuration
 app.add_middleware(
@@ -22,8 +64,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Idempotent-Replayed"],
 )
 
+# gzip/brotli response compression, negotiated from Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+
+# Per-request SQL query counts and timings (Server-Timing header and logs)
+app.add_middleware(QueryTimingMiddleware)
+
+# Prometheus request metrics, served on /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(product_router)
 app.include_router(option_router)
@@ -31,6 +83,7 @@ app.include_router(order_router)
 app.include_router(inventory_router)
 app.include_router(admin_router)
 app.include_router(price_rule_router)
+app.include_router(catalog_router)
 
 @app.get("/")
 def read_root():
@@ -38,4 +91,28 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"} 
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness for load balancers: 503 until the catalog cache warm-up
+    (CACHE_WARMUP) is done, and when the order ingestion worker
+    (ORDER_INGESTION_PATH) has stopped.
+    """
+    state = {"cache": warmup.cache_state()}
+    ready = state["cache"] not in (warmup.COLD, warmup.WARMING)
+    if ingestion.order_ingestion is not None:
+        state["ingestion"] = "running" if ingestion.order_ingestion.alive() else "stopped"
+        ready = ready and state["ingestion"] == "running"
+    if not ready:
+        return FastJSONResponse({"status": "not ready", **state}, status_code=503)
+    return {"status": "ready", **state}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus metrics: request latency per route, in-flight requests,
+    DB pool and query stats, and cache hit ratios.
+    """
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
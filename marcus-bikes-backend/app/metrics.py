@@ -0,0 +1,212 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms only hold a few floats per label set and
+are updated under a lock, so recording is cheap enough for every request
+and every SQL statement.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from app.database.instrumentation import add_query_listener
+from app.database.session import engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def set_total(self, value: float, *labelvalues: str) -> None:
+        """Mirror a monotonic count kept elsewhere, read when scraped"""
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labelvalues, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last), sum of observations
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, *labelvalues: str) -> int:
+        entry = self._values.get(labelvalues)
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labelvalues, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# HTTP metrics, labelled by route template (e.g. /products/{product_id}) to bound cardinality
+REQUESTS_TOTAL = Counter("http_requests_total", "Total HTTP requests.", ("method", "route", "status"))
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds.", ("method", "route")
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+
+# Database metrics
+DB_QUERIES_TOTAL = Counter("db_queries_total", "Total SQL statements executed.")
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time in seconds.", buckets=QUERY_BUCKETS
+)
+DB_POOL = Gauge("db_pool_connections", "Database connection pool state.", ("state",))
+
+# Cache metrics, filled from the registered caches when scraped
+CACHE_HITS = Counter("cache_hits_total", "Cache hits since startup.", ("cache",))
+CACHE_MISSES = Counter("cache_misses_total", "Cache misses since startup.", ("cache",))
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Cache hits over lookups since startup.", ("cache",))
+
+REGISTRY: List[Metric] = [
+    REQUESTS_TOTAL,
+    REQUEST_DURATION,
+    REQUESTS_IN_FLIGHT,
+    DB_QUERIES_TOTAL,
+    DB_QUERY_DURATION,
+    DB_POOL,
+    CACHE_HITS,
+    CACHE_MISSES,
+    CACHE_HIT_RATIO,
+]
+
+_cache_stats: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+    """Expose a cache on /metrics; ``stats`` returns its (hits, misses) counts"""
+    _cache_stats[name] = stats
+
+
+def unregister_cache(name: str) -> None:
+    """Stop exposing a cache and drop its series"""
+    _cache_stats.pop(name, None)
+    for metric in (CACHE_HITS, CACHE_MISSES, CACHE_HIT_RATIO):
+        with metric._lock:
+            metric._values.pop((name,), None)
+
+
+def _record_query(statement: str, duration: float) -> None:
+    DB_QUERIES_TOTAL.inc()
+    DB_QUERY_DURATION.observe(duration)
+
+
+add_query_listener(_record_query)
+
+
+def _collect_pool_stats() -> None:
+    pool = engine.pool
+    for state in ("size", "checkedin", "checkedout", "overflow"):
+        getter = getattr(pool, state, None)
+        if callable(getter):
+            DB_POOL.set(getter(), state)
+
+
+def _collect_cache_stats() -> None:
+    for name, stats in _cache_stats.items():
+        hits, misses = stats()
+        CACHE_HITS.set_total(hits, name)
+        CACHE_MISSES.set_total(misses, name)
+        lookups = hits + misses
+        CACHE_HIT_RATIO.set(hits / lookups if lookups else 0.0, name)
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+    _collect_pool_stats()
+    _collect_cache_stats()
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
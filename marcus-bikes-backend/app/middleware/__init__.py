@@ -0,0 +1,6 @@
+from app.middleware.query_timing import QueryTimingMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+
+__all__ = ["QueryTimingMiddleware", "MetricsMiddleware", "CompressionMiddleware", "IdempotencyMiddleware"]
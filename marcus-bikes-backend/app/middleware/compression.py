@@ -0,0 +1,79 @@
+from typing import List
+
+from app.encoding import COMPRESSION_MINIMUM_SIZE, choose_encoding, compress
+
+# Media types worth compressing; event streams are never buffered
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/css", "application/javascript")
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+def add_vary(headers: List, value: bytes = b"accept-encoding") -> List:
+    """Headers with ``value`` added to Vary, keeping any existing Vary values"""
+    for index, (name, existing) in enumerate(headers):
+        if name.lower() == b"vary":
+            if value not in [part.strip().lower() for part in existing.split(b",")]:
+                headers[index] = (name, existing + b", " + value)
+            return headers
+    headers.append((b"vary", value))
+    return headers
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (when installed) or gzip.
+
+    The encoding is negotiated from Accept-Encoding, responses of a
+    compressible type get ``Vary: Accept-Encoding`` whether compressed or
+    not, and bodies under ``minimum_size`` bytes, streamed bodies and
+    responses that already carry a Content-Encoding (precompressed cached
+    bodies, see ``app.responses.EncodedBody``) are sent as they are.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = choose_encoding(accept_encoding)
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held until the first body chunk shows whether the body is streamed
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = list(start.get("headers", []))
+            header_names = {name.lower(): value for name, value in headers}
+            compressible = (
+                b"content-encoding" not in header_names
+                and is_compressible(header_names.get(b"content-type", b"").decode("latin-1"))
+            )
+            if compressible:
+                add_vary(headers)
+            body = message.get("body", b"")
+            if compressible and encoding is not None and not message.get("more_body") and len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+                headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+                message = {**message, "body": body}
+            await send({**start, "headers": headers})
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
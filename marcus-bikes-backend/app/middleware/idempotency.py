@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.database.session import get_db
+from app.models.idempotency_key import IdempotencyKey
+from app.services.idempotency_service import IdempotencyService
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+AUTHORIZATION_HEADER = b"authorization"
+MUTATING_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+MAX_KEY_LENGTH = 255
+
+# Hours a stored response is replayed for
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+# Seconds between two deletions of expired keys by a worker
+IDEMPOTENCY_CLEANUP_INTERVAL = float(os.getenv("IDEMPOTENCY_CLEANUP_INTERVAL", "300"))
+
+# Seconds after which a claim whose request never finished (its worker died) may be taken over
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+
+
+def error_response(status_code: int, detail: str) -> Tuple[int, bytes]:
+    return status_code, json.dumps({"detail": detail}).encode("utf-8")
+
+
+def client_identity(scope) -> str:
+    """Who sent a request: a hash of its credentials, or of its address without any"""
+    authorization = next((value for name, value in scope["headers"] if name == AUTHORIZATION_HEADER), None)
+    if authorization is not None:
+        source = b"authorization:" + authorization
+    else:
+        source = b"address:" + (scope.get("client") or ("",))[0].encode("latin-1")
+    return hashlib.sha256(source).hexdigest()
+
+
+class IdempotencyMiddleware:
+    """
+    Make mutating requests sent with an ``Idempotency-Key`` header safe to retry.
+
+    The first request with a key claims it in the ``idempotency_keys``
+    table (unique per client, method, path and key) and its response,
+    headers included, is stored there. Retries get the stored response
+    back, marked with ``Idempotent-Replayed: true``, without running the
+    route again; a retry arriving while the first request runs gets a 409,
+    and a key reused for a different body or query string a 422. Server
+    errors are not stored, so those requests can be retried, and a claim
+    left unfinished for ``lease`` (its worker died) is taken over by the
+    next retry. Keys expire after ``IDEMPOTENCY_KEY_TTL_HOURS`` and are
+    deleted in the background.
+
+    Clients are told apart by their Authorization header, or else by their
+    address (behind a proxy, have uvicorn trust its forwarded headers).
+
+    Sessions come from the ``get_db`` dependency (including overrides).
+    """
+
+    def __init__(
+        self,
+        app,
+        ttl: timedelta = timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS),
+        lease: timedelta = timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+    ):
+        self.app = app
+        self.ttl = ttl
+        self.lease = lease
+        self.cleaned_at = -IDEMPOTENCY_CLEANUP_INTERVAL
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+        key = next((value.decode("latin-1") for name, value in scope["headers"] if name == HEADER), None)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self._send(send, *error_response(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"))
+            return
+
+        # The body is read here to be hashed, then handed to the route as it was
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        digest = hashlib.sha256(scope.get("query_string", b"") + b"\n" + body).hexdigest()
+        route = f"{scope['method']} {scope['path']}"
+
+        session_factory = scope["app"].dependency_overrides.get(get_db, get_db)
+        outcome, claim = await run_in_threadpool(self._claim, session_factory, client_identity(scope), route, key, digest)
+        if outcome == "replay":
+            status_code, headers, stored_body = claim
+            await self._send(send, status_code, stored_body, headers=headers, replayed=True)
+            return
+        if outcome == "conflict":
+            await self._send(send, *error_response(409, "A request with this Idempotency-Key is in progress"))
+            return
+        if outcome == "mismatch":
+            await self._send(send, *error_response(422, "Idempotency-Key was used for a different request"))
+            return
+
+        replayed_body = False
+
+        async def receive_body():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start = None
+        response_chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        except Exception:
+            await run_in_threadpool(self._finish, session_factory, claim, None, [], b"")
+            raise
+        status_code = start["status"] if start else 500
+        headers = [
+            [name.decode("latin-1"), value.decode("latin-1")]
+            for name, value in (start or {}).get("headers", [])
+            if name.lower() != b"content-length"
+        ]
+        await run_in_threadpool(self._finish, session_factory, claim, status_code, headers, b"".join(response_chunks))
+
+    def _claim(self, session_factory, client: str, route: str, key: str, digest: str):
+        """("run", id of the claimed key), ("replay", stored response), ("conflict" | "mismatch", None)"""
+        sessions = session_factory()
+        db = next(sessions)
+        try:
+            now = time.monotonic()
+            if now - self.cleaned_at >= IDEMPOTENCY_CLEANUP_INTERVAL:
+                self.cleaned_at = now
+                IdempotencyService.delete_expired(db)
+            record = IdempotencyService.get(db, client, route, key)
+            now = datetime.utcnow()
+            if record is not None and (
+                record.expires_at <= now
+                or (record.status_code is None and record.created_at <= now - self.lease)
+            ):
+                IdempotencyService.release(db, record)
+                record = None
+            if record is None:
+                record = IdempotencyService.start(db, client, route, key, digest, self.ttl)
+                if record is None:
+                    return "conflict", None
+                return "run", record.id
+            if record.status_code is None:
+                return "conflict", None
+            if record.request_hash != digest:
+                return "mismatch", None
+            headers = record.response_headers
+            if headers is None:
+                # Stored before headers were
+                headers = [["content-type", record.content_type]] if record.content_type else []
+            return "replay", (record.status_code, headers, record.response_body)
+        finally:
+            sessions.close()
+
+    def _finish(self, session_factory, record_id: int, status_code: Optional[int], headers: List[List[str]], body: bytes) -> None:
+        sessions = session_factory()
+        db = next(sessions)
+        try:
+            record = db.get(IdempotencyKey, record_id)
+            if record is None:
+                return
+            if status_code is None or status_code >= 500:
+                IdempotencyService.release(db, record)
+            else:
+                content_type = next((value for name, value in headers if name.lower() == "content-type"), None)
+                IdempotencyService.complete(db, record, status_code, content_type, headers, body)
+        except Exception:
+            logger.exception("Could not store the response of idempotency key %s", record_id)
+        finally:
+            sessions.close()
+
+    @staticmethod
+    async def _send(
+        send,
+        status_code: int,
+        body: bytes,
+        headers: Optional[List[List[str]]] = None,
+        replayed: bool = False
+    ) -> None:
+        """Send a response; ``headers`` default to a JSON content type"""
+        if headers is None:
+            headers = [["content-type", "application/json"]]
+        raw_headers = [(b"content-length", str(len(body)).encode())]
+        raw_headers += [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        if replayed:
+            raw_headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": status_code, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,43 @@
+import time
+
+from app.metrics import REQUESTS_TOTAL, REQUEST_DURATION, REQUESTS_IN_FLIGHT
+
+# Label used for requests that did not match any route, to bound label cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Record request counts, latencies and in-flight requests per route template.
+
+    The route template (e.g. ``/products/{product_id}``) is read from the scope
+    once routing has happened, so raw paths never become label values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_template = getattr(route, "path", UNMATCHED_ROUTE)
+            REQUEST_DURATION.observe(duration, scope["method"], route_template)
+            REQUESTS_TOTAL.inc(scope["method"], route_template, str(status_code))
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from app.database.instrumentation import QueryStats, track_queries
+
+logger = logging.getLogger("app.requests")
+
+# Requests slower than this many milliseconds are logged as warnings (disabled when unset)
+SLOW_REQUEST_THRESHOLD_MS = os.getenv("SLOW_REQUEST_THRESHOLD_MS")
+
+
+def format_server_timing(stats: QueryStats, total_ms: float) -> str:
+    """Render the request and query timings as a Server-Timing header value"""
+    return (
+        f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries", '
+        f"db-slowest;dur={stats.slowest_ms:.2f}, "
+        f"app;dur={total_ms:.2f}"
+    )
+
+
+def parse_query_count(server_timing: str) -> Optional[int]:
+    """Extract the query count from a Server-Timing header value"""
+    for metric in server_timing.split(","):
+        name, _, params = metric.strip().partition(";")
+        if name == "db":
+            for param in params.split(";"):
+                if param.startswith("desc="):
+                    return int(param[len("desc="):].strip('"').split()[0])
+    return None
+
+
+class QueryTimingMiddleware:
+    """
+    Count the SQL queries run by each request and time them.
+
+    The totals are exposed in a Server-Timing header, logged as one JSON line
+    per request and, above the slow request threshold, logged as a warning.
+    """
+
+    def __init__(self, app, slow_request_threshold_ms: Optional[float] = None):
+        self.app = app
+        if slow_request_threshold_ms is None and SLOW_REQUEST_THRESHOLD_MS:
+            slow_request_threshold_ms = float(SLOW_REQUEST_THRESHOLD_MS)
+        self.slow_request_threshold_ms = slow_request_threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_server_timing(stats, total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with track_queries() as stats:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self._log(scope, status_code, stats, (time.perf_counter() - start) * 1000)
+
+    def _log(self, scope, status_code: int, stats: QueryStats, total_ms: float) -> None:
+        is_slow = self.slow_request_threshold_ms is not None and total_ms >= self.slow_request_threshold_ms
+        level = logging.WARNING if is_slow else logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+
+        record = {
+            "event": "slow_request" if is_slow else "request",
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(total_ms, 2),
+            "db_queries": stats.count,
+            "db_time_ms": round(stats.total_ms, 2),
+            "db_slowest_ms": round(stats.slowest_ms, 2),
+            "db_slowest_statement": stats.slowest_statement,
+        }
+        logger.log(level, json.dumps(record))
@@ -0,0 +1,41 @@
+"""Catalog change log
+
+Revision ID: catalog_changes
+Revises: product_price_range
+Create Date: 2026-10-19
+
+Every write to products, components, options, price rules and stock flags
+appends a row; its version is the global change sequence served by
+GET /catalog/changes.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.enums import CatalogEntityEnum, ChangeOperationEnum
+
+
+# revision identifiers, used by Alembic.
+revision = 'catalog_changes'
+down_revision = 'product_price_range'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'catalog_changes',
+        sa.Column('version', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('entity_type', sa.Enum(CatalogEntityEnum), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.Enum(ChangeOperationEnum), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('version'),
+        sqlite_autoincrement=True
+    )
+
+
+def downgrade():
+    op.drop_table('catalog_changes')
+    sa.Enum(ChangeOperationEnum).drop(op.get_bind(), checkfirst=True)
+    sa.Enum(CatalogEntityEnum).drop(op.get_bind(), checkfirst=True)
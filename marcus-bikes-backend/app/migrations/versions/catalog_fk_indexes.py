@@ -0,0 +1,29 @@
+"""Indexes on components.product_id and options.component_id
+
+Revision ID: catalog_fk_indexes
+Revises: inventory_option_unique
+Create Date: 2026-10-19
+
+Used by the per-category summary aggregate (a product is in stock when all
+of its components have an option in stock) and by loading a product's
+components and options.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'catalog_fk_indexes'
+down_revision = 'inventory_option_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_components_product_id'), 'components', ['product_id'], unique=False)
+    op.create_index(op.f('ix_options_component_id'), 'options', ['component_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_options_component_id'), table_name='options')
+    op.drop_index(op.f('ix_components_product_id'), table_name='components')
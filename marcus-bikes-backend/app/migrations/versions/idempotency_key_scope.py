@@ -0,0 +1,36 @@
+"""Idempotency keys per client, with the response headers
+
+Revision ID: idempotency_key_scope
+Revises: order_details_jsonb
+Create Date: 2026-10-19
+
+Keys become unique per client (a hash of the credentials or address of the
+sender), so that two clients picking the same key never see each other's
+responses, and the headers of stored responses are kept to be replayed.
+Keys stored before belong to no client and expire as usual.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'idempotency_key_scope'
+down_revision = 'order_details_jsonb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('idempotency_keys', sa.Column('client', sa.String(length=64), nullable=False, server_default=''))
+    op.add_column('idempotency_keys', sa.Column('response_headers', sa.JSON(), nullable=True))
+    op.drop_index('ix_idempotency_keys_route_key', table_name='idempotency_keys')
+    op.create_index('ix_idempotency_keys_client_route_key', 'idempotency_keys', ['client', 'route', 'key'], unique=True)
+
+
+def downgrade():
+    # Keys of different clients may share a route and key
+    op.execute("DELETE FROM idempotency_keys")
+    op.drop_index('ix_idempotency_keys_client_route_key', table_name='idempotency_keys')
+    op.create_index('ix_idempotency_keys_route_key', 'idempotency_keys', ['route', 'key'], unique=True)
+    op.drop_column('idempotency_keys', 'response_headers')
+    op.drop_column('idempotency_keys', 'client')
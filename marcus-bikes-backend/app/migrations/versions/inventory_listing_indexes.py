@@ -0,0 +1,26 @@
+"""Index on inventory (quantity, id)
+
+Revision ID: inventory_listing_indexes
+Revises: catalog_fk_indexes
+Create Date: 2026-10-19
+
+Used by the admin inventory listing, which sorts by quantity and pages
+with (quantity, id) keyset cursors.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'inventory_listing_indexes'
+down_revision = 'catalog_fk_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_inventory_quantity_id', 'inventory', ['quantity', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_inventory_quantity_id', table_name='inventory')
@@ -0,0 +1,35 @@
+"""Unique index on inventory.option_id
+
+Revision ID: inventory_option_unique
+Revises: 
+Create Date: 2026-10-19
+
+Removes duplicate inventory rows (keeping the most recent one per option)
+so the unique index can be built, which also lets inventory writes use
+INSERT ... ON CONFLICT (option_id) DO UPDATE.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'inventory_option_unique'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        DELETE FROM inventory
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM inventory GROUP BY option_id
+        )
+        """
+    )
+    op.create_index(op.f('ix_inventory_option_id'), 'inventory', ['option_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_inventory_option_id'), table_name='inventory')
@@ -0,0 +1,36 @@
+"""JSONB order details with a GIN index
+
+Revision ID: order_details_jsonb
+Revises: orders_partitioning
+Create Date: 2026-10-19
+
+On Postgres, orders.order_details becomes JSONB with a jsonb_path_ops GIN
+index (created on every partition), serving the product and option
+containment filters of POST /orders/filter. Nothing changes elsewhere.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'order_details_jsonb'
+down_revision = 'orders_partitioning'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("ALTER TABLE orders ALTER COLUMN order_details TYPE jsonb USING order_details::jsonb")
+    op.create_index(
+        'ix_orders_order_details', 'orders', ['order_details'],
+        postgresql_using='gin',
+        postgresql_ops={'order_details': 'jsonb_path_ops'}
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_orders_order_details', table_name='orders')
+    op.execute("ALTER TABLE orders ALTER COLUMN order_details TYPE json USING order_details::json")
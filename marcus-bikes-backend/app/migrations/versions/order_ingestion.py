@@ -0,0 +1,29 @@
+"""Order ingestion references
+
+Revision ID: order_ingestion
+Revises: idempotency_keys
+Create Date: 2026-10-19
+
+Orders written by the asynchronous ingestion queue keep the reference they
+were acknowledged with; the unique index makes replaying a batch safe and
+serves the status lookups.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'order_ingestion'
+down_revision = 'idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('orders', sa.Column('reference', sa.String(length=32), nullable=True))
+    op.create_index('ix_orders_reference', 'orders', ['reference'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_orders_reference', table_name='orders')
+    op.drop_column('orders', 'reference')
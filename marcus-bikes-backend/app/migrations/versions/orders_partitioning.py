@@ -0,0 +1,142 @@
+"""Monthly order partitions and the order archive
+
+Revision ID: orders_partitioning
+Revises: outbox_events
+Create Date: 2026-10-19
+
+On Postgres, orders becomes a table partitioned by month of created_at
+(orders_pYYYYMM plus orders_default), rebuilt from the existing rows. The
+primary key and the unique reference index include created_at, as
+Postgres requires of the partition key; the id sequence is kept. Other
+databases only get the created_at index. orders_archive holds the
+compressed archived orders; the downgrade moves them back into orders.
+"""
+import gzip
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'orders_partitioning'
+down_revision = 'outbox_events'
+branch_labels = None
+depends_on = None
+
+# Partitions created past the current month; later ones are created at
+# startup and by the archival command
+PARTITION_MONTHS_AHEAD = 3
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+
+def next_month(moment):
+    return datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+
+
+def upgrade():
+    op.create_table(
+        'orders_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_orders_archive_created_at', 'orders_archive', ['created_at'])
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.execute('CREATE INDEX IF NOT EXISTS ix_orders_created_at ON orders (created_at)')
+        return
+
+    op.execute("UPDATE orders SET created_at = COALESCE(updated_at, now()) WHERE created_at IS NULL")
+    op.execute("ALTER TABLE orders ALTER COLUMN created_at SET NOT NULL")
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('orders', 'id')")).scalar()
+    # Columns, types and defaults (including the id sequence) are copied
+    op.execute("CREATE TABLE orders_partitioned (LIKE orders INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.execute("CREATE TABLE orders_partitioned_default PARTITION OF orders_partitioned DEFAULT")
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM orders")).scalar() or datetime.utcnow()
+    month = month_start(oldest)
+    last = month_start(datetime.utcnow())
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        last = next_month(last)
+    while month <= last:
+        end = next_month(month)
+        op.execute(
+            f"CREATE TABLE orders_partitioned_p{month:%Y%m} PARTITION OF orders_partitioned "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        month = end
+    op.execute("INSERT INTO orders_partitioned SELECT * FROM orders")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute("DROP TABLE orders")
+
+    op.execute("ALTER TABLE orders_partitioned RENAME TO orders")
+    op.execute("ALTER TABLE orders_partitioned_default RENAME TO orders_default")
+    for name in bind.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('orders') AND c.relname LIKE 'orders_partitioned_p%'"
+    )).scalars().all():
+        op.execute(f"ALTER TABLE {name} RENAME TO {name.replace('orders_partitioned_', 'orders_', 1)}")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY orders.id")
+
+    op.execute("ALTER TABLE orders ADD PRIMARY KEY (id, created_at)")
+    op.create_index('ix_orders_created_at', 'orders', ['created_at'])
+    op.create_index('ix_orders_status', 'orders', ['status'])
+    op.create_index('ix_orders_reference', 'orders', ['reference', 'created_at'], unique=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('orders', 'id')")).scalar()
+        op.execute("CREATE TABLE orders_unpartitioned (LIKE orders INCLUDING DEFAULTS)")
+        op.execute("INSERT INTO orders_unpartitioned SELECT * FROM orders")
+        if sequence:
+            op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+        op.execute("DROP TABLE orders")
+        op.execute("ALTER TABLE orders_unpartitioned RENAME TO orders")
+        if sequence:
+            op.execute(f"ALTER SEQUENCE {sequence} OWNED BY orders.id")
+        op.execute("ALTER TABLE orders ADD PRIMARY KEY (id)")
+        op.create_index('ix_orders_created_at', 'orders', ['created_at'])
+        op.create_index('ix_orders_status', 'orders', ['status'])
+        op.create_index('ix_orders_reference', 'orders', ['reference'], unique=True)
+    else:
+        op.drop_index('ix_orders_created_at', table_name='orders')
+
+    restore_archived_orders(bind)
+    op.drop_index('ix_orders_archive_created_at', table_name='orders_archive')
+    op.drop_table('orders_archive')
+
+
+def restore_archived_orders(bind, batch_size=1000):
+    """Move the archived orders back into orders before their table is dropped"""
+    orders = sa.Table('orders', sa.MetaData(), autoload_with=bind)
+    archive = sa.table('orders_archive', sa.column('id', sa.Integer()), sa.column('data', sa.LargeBinary()))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(archive.c.id, archive.c.data).where(archive.c.id > last_id).order_by(archive.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        values = []
+        for row in rows:
+            order = json.loads(gzip.decompress(row.data))
+            for name in ('created_at', 'updated_at'):
+                if order.get(name):
+                    order[name] = datetime.fromisoformat(order[name])
+            # The archive keeps the status value ("completed"), the column its enum name
+            order['status'] = order['status'].upper()
+            values.append({column.name: order.get(column.name) for column in orders.columns})
+        bind.execute(orders.insert(), values)
+        last_id = rows[-1].id
@@ -0,0 +1,48 @@
+"""Outbox events
+
+Revision ID: outbox_events
+Revises: order_ingestion
+Create Date: 2026-10-19
+
+Order and inventory domain events, written in the transaction of their
+change and dispatched by the outbox relay; the partial index serves the
+relay's scan of undispatched events.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'outbox_events'
+down_revision = 'order_ingestion'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('event_type', sa.String(length=64), nullable=False),
+        sa.Column('aggregate_type', sa.String(length=32), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True
+    )
+    op.create_index(
+        'ix_outbox_events_pending', 'outbox_events', ['id'],
+        postgresql_where=sa.text('dispatched_at IS NULL'),
+        sqlite_where=sa.text('dispatched_at IS NULL')
+    )
+    op.create_index('ix_outbox_events_dispatched_at', 'outbox_events', ['dispatched_at'])
+
+
+def downgrade():
+    op.drop_index('ix_outbox_events_dispatched_at', table_name='outbox_events')
+    op.drop_index('ix_outbox_events_pending', table_name='outbox_events')
+    op.drop_table('outbox_events')
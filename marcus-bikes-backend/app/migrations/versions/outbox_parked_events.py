@@ -0,0 +1,40 @@
+"""Parked outbox events
+
+Revision ID: outbox_parked_events
+Revises: idempotency_key_scope
+Create Date: 2026-10-19
+
+Events still rejected after OUTBOX_MAX_ATTEMPTS get ``failed_at`` and are
+left out of the relay's scan, so that one bad event no longer holds back
+those after it; the partial pending index is rebuilt without them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'outbox_parked_events'
+down_revision = 'idempotency_key_scope'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('outbox_events', sa.Column('failed_at', sa.DateTime(), nullable=True))
+    op.drop_index('ix_outbox_events_pending', table_name='outbox_events')
+    op.create_index(
+        'ix_outbox_events_pending', 'outbox_events', ['id'],
+        postgresql_where=sa.text('dispatched_at IS NULL AND failed_at IS NULL'),
+        sqlite_where=sa.text('dispatched_at IS NULL AND failed_at IS NULL')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_outbox_events_pending', table_name='outbox_events')
+    op.create_index(
+        'ix_outbox_events_pending', 'outbox_events', ['id'],
+        postgresql_where=sa.text('dispatched_at IS NULL'),
+        sqlite_where=sa.text('dispatched_at IS NULL')
+    )
+    # Parked events become pending again
+    op.drop_column('outbox_events', 'failed_at')
@@ -0,0 +1,63 @@
+"""Materialized price range of products
+
+Revision ID: product_price_range
+Revises: product_search_indexes
+Create Date: 2026-10-19
+
+Adds products.min_price and products.max_price (the cheapest and most
+expensive configuration with the options in stock, price rules included),
+indexed for listings sorted and filtered by price, and fills them in.
+From then on they are kept up to date by PriceRangeService.
+
+The backfill is plain SQL and leaves price rules out: the range of products
+with price rules is made exact by ``python -m app.services.price_range_service``
+or by their next catalog change.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'product_price_range'
+down_revision = 'product_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('products', sa.Column('min_price', sa.Float(), nullable=True))
+    op.add_column('products', sa.Column('max_price', sa.Float(), nullable=True))
+    op.create_index('ix_products_min_price_id', 'products', ['min_price', 'id'], unique=False)
+    op.create_index(op.f('ix_products_max_price'), 'products', ['max_price'], unique=False)
+
+    # Base price plus the cheapest and dearest option in stock of each
+    # component; no range when a component has nothing in stock
+    op.execute("""
+        UPDATE products
+        SET min_price = ranges.min_price, max_price = ranges.max_price
+        FROM (
+            SELECT
+                products.id AS product_id,
+                CASE WHEN count(component_prices.component_id) = count(component_prices.cheapest)
+                    THEN products.base_price + coalesce(sum(component_prices.cheapest), 0) END AS min_price,
+                CASE WHEN count(component_prices.component_id) = count(component_prices.dearest)
+                    THEN products.base_price + coalesce(sum(component_prices.dearest), 0) END AS max_price
+            FROM products
+            LEFT JOIN (
+                SELECT components.id AS component_id, components.product_id,
+                    min(options.price) AS cheapest, max(options.price) AS dearest
+                FROM components
+                LEFT JOIN options ON options.component_id = components.id AND options.in_stock
+                GROUP BY components.id, components.product_id
+            ) AS component_prices ON component_prices.product_id = products.id
+            GROUP BY products.id, products.base_price
+        ) AS ranges
+        WHERE products.id = ranges.product_id
+    """)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_products_max_price'), table_name='products')
+    op.drop_index('ix_products_min_price_id', table_name='products')
+    op.drop_column('products', 'max_price')
+    op.drop_column('products', 'min_price')
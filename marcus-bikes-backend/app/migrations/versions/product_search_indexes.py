@@ -0,0 +1,39 @@
+"""Full-text search indexes on product, component and option names
+
+Revision ID: product_search_indexes
+Revises: inventory_listing_indexes
+Create Date: 2026-10-19
+
+GIN indexes on to_tsvector('simple', name) back GET /products/search on
+Postgres; other databases search an in-memory index instead. Required
+option names are matched case-insensitively through lower(name).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'product_search_indexes'
+down_revision = 'inventory_listing_indexes'
+branch_labels = None
+depends_on = None
+
+FTS_TABLES = ('products', 'components', 'options')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in FTS_TABLES:
+            op.create_index(
+                f'ix_{table}_name_fts', table,
+                [sa.text("to_tsvector('simple', name)")],
+                unique=False, postgresql_using='gin'
+            )
+    op.create_index('ix_options_name_lower', 'options', [sa.text('lower(name)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_options_name_lower', table_name='options')
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in FTS_TABLES:
+            op.drop_index(f'ix_{table}_name_fts', table_name=table)
@@ -4,8 +4,12 @@ from app.models.option import Option
 from app.models.dependency import Dependency
 from app.models.price_rule import PriceRule
 from app.models.order import Order
+from app.models.archived_order import ArchivedOrder
 from app.models.inventory import Inventory
-from app.models.enums import CategoryEnum, DependencyTypeEnum, OrderStatusEnum, StockStatusEnum
+from app.models.catalog_change import CatalogChange
+from app.models.idempotency_key import IdempotencyKey
+from app.models.outbox_event import OutboxEvent
+from app.models.enums import CategoryEnum, DependencyTypeEnum, OrderStatusEnum, StockStatusEnum, CatalogEntityEnum, ChangeOperationEnum
 
 __all__ = [
     "Product",
@@ -14,9 +18,15 @@ __all__ = [
     "Dependency",
     "PriceRule",
     "Order",
+    "ArchivedOrder",
     "Inventory",
+    "CatalogChange",
+    "IdempotencyKey",
+    "OutboxEvent",
     "CategoryEnum",
     "DependencyTypeEnum",
     "OrderStatusEnum",
-    "StockStatusEnum"
+    "StockStatusEnum",
+    "CatalogEntityEnum",
+    "ChangeOperationEnum"
 ] 
\ No newline at end of file
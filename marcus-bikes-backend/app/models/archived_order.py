@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+import datetime
+
+from app.models.base import Base
+
+class ArchivedOrder(Base):
+    """A completed or canceled order moved out of ``orders`` by the archival command
+
+    ``data`` holds every column of the order as gzip-compressed JSON.
+    """
+    __tablename__ = "orders_archive"
+
+    # The ID the order had in ``orders``
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    status = Column(String(16), nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
+    data = Column(LargeBinary, nullable=False)
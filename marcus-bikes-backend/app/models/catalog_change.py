@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime, Enum
+import datetime
+
+from app.models.base import Base
+from app.models.enums import CatalogEntityEnum, ChangeOperationEnum
+
+class CatalogChange(Base):
+    """One write to the catalog; ``version`` is the global, increasing change sequence"""
+    __tablename__ = "catalog_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    version = Column(Integer, primary_key=True, autoincrement=True)
+    entity_type = Column(Enum(CatalogEntityEnum), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # Not a foreign key: deleted products keep their changes
+    product_id = Column(Integer, nullable=False)
+    operation = Column(Enum(ChangeOperationEnum), nullable=False)
+    changed_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Index, func, literal_column
 from sqlalchemy.orm import relationship
 
 from app.models.base import Base
@@ -9,7 +9,16 @@ class Component(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     description = Column(Text)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
 
     product = relationship("Product", back_populates="components")
-    options = relationship("Option", back_populates="component", cascade="all, delete-orphan") 
\ No newline at end of file
+    options = relationship("Option", back_populates="component", cascade="all, delete-orphan")
+
+    # Full-text search on names (Postgres only, SQLite searches an in-memory index)
+    __table_args__ = (
+        Index(
+            "ix_components_name_fts",
+            func.to_tsvector(literal_column("'simple'"), name),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    ) 
\ No newline at end of file
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, JSON, Index
+import datetime
+
+from app.models.base import Base
+
+class IdempotencyKey(Base):
+    """The stored response of a mutating request sent with an Idempotency-Key header
+
+    ``status_code`` is empty while the first request with the key is running,
+    which claimed it at ``created_at``.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_client_route_key", "client", "route", "key", unique=True),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # SHA-256 of who sent the request (credentials, else address), so clients cannot collide
+    client = Column(String(64), nullable=False, server_default="")
+    # Method and path, e.g. "POST /orders/"
+    route = Column(String(255), nullable=False)
+    key = Column(String(255), nullable=False)
+    # SHA-256 of the query string and body, to reject a key reused for another request
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(255), nullable=True)
+    # [name, value] pairs of the response headers, Content-Length excepted
+    response_headers = Column(JSON, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 
 from app.models.base import Base
@@ -8,10 +8,15 @@ class Inventory(Base):
     __tablename__ = "inventory"
 
     id = Column(Integer, primary_key=True)
-    option_id = Column(Integer, ForeignKey("options.id"), nullable=False)
+    option_id = Column(Integer, ForeignKey("options.id"), nullable=False, unique=True, index=True)
     quantity = Column(Integer, default=0)
     stock_status = Column(Enum(StockStatusEnum), default=StockStatusEnum.OUT_OF_STOCK)
     low_stock_threshold = Column(Integer, default=5)  # Threshold to mark as "limited stock"
     
     # Relationship with the Option
-    option = relationship("Option", backref="inventory_record") 
\ No newline at end of file
+    option = relationship("Option", backref="inventory_record")
+
+    # Keyset pagination of the inventory listing sorted by quantity
+    __table_args__ = (
+        Index("ix_inventory_quantity_id", "quantity", "id"),
+    ) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Index, func, literal_column
 from sqlalchemy.orm import relationship
 
 from app.models.base import Base
@@ -10,8 +10,19 @@ class Option(Base):
     name = Column(String, nullable=False)
     price = Column(Float, nullable=False)
     in_stock = Column(Boolean, default=True)
-    component_id = Column(Integer, ForeignKey("components.id"), nullable=False)
+    component_id = Column(Integer, ForeignKey("components.id"), nullable=False, index=True)
     stock_quantity = Column(Integer, default=0)  # New field for tracking stock
 
     component = relationship("Component", back_populates="options")
-    # inventory_record relationship is defined in the Inventory model 
\ No newline at end of file
+    # inventory_record relationship is defined in the Inventory model
+
+    # Full-text search on names (Postgres only, SQLite searches an in-memory index),
+    # and case-insensitive lookups of required option names
+    __table_args__ = (
+        Index(
+            "ix_options_name_fts",
+            func.to_tsvector(literal_column("'simple'"), name),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_options_name_lower", func.lower(name)),
+    ) 
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 import datetime
 
@@ -7,18 +8,33 @@ from app.models.enums import OrderStatusEnum
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Containment queries on order_details (products and options ordered), Postgres only
+        Index(
+            "ix_orders_order_details",
+            "order_details",
+            postgresql_using="gin",
+            postgresql_ops={"order_details": "jsonb_path_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True)
     customer_name = Column(String, nullable=False)
     customer_email = Column(String, nullable=False)
     shipping_address = Column(String, nullable=False)
     total_amount = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Also the partition key of the table on Postgres
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     status = Column(Enum(OrderStatusEnum), default=OrderStatusEnum.PENDING, nullable=False)
     
-    # Store the order details as JSON
-    order_details = Column(JSON, nullable=False)  # This will store product configurations, quantities, etc.
+    # Store the order details as JSON (JSONB on Postgres)
+    # products[].id identifies the product (e.g. "custom-bike") and products[].configuration
+    # maps each component name to the name of the option chosen
+    order_details = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)  # This will store product configurations, quantities, etc.
     
     # For analytics and filtering
-    product_categories = Column(String, nullable=True)  # Comma-separated list of categories in this order 
\ No newline at end of file
+    product_categories = Column(String, nullable=True)  # Comma-separated list of categories in this order
+
+    # Set for orders written by the ingestion queue, which acknowledged them by this reference
+    reference = Column(String(32), nullable=True, unique=True, index=True) 
\ No newline at end of file
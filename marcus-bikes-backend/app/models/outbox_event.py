@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index, text
+import datetime
+
+from app.models.base import Base
+
+class OutboxEvent(Base):
+    """A domain event written in the transaction of the change it describes
+
+    ``dispatched_at`` is set once the relay delivered the event to every sink,
+    ``failed_at`` once the relay gave up on it after too many attempts.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # The relay only reads undispatched events that are not parked, in id order
+        Index(
+            "ix_outbox_events_pending",
+            "id",
+            postgresql_where=text("dispatched_at IS NULL AND failed_at IS NULL"),
+            sqlite_where=text("dispatched_at IS NULL AND failed_at IS NULL")
+        ),
+        Index("ix_outbox_events_dispatched_at", "dispatched_at"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # e.g. "order.created", "inventory.updated"
+    event_type = Column(String(64), nullable=False)
+    # "order" (order ID), "order_batch" (ID of its first order) or "inventory" (option ID)
+    aggregate_type = Column(String(32), nullable=False)
+    aggregate_id = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    dispatched_at = Column(DateTime, nullable=True)
+    failed_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Enum, Text, Integer
+from sqlalchemy import Column, String, Float, Enum, Text, Integer, Index, func, literal_column
 from sqlalchemy.orm import relationship
 
 from app.models.base import Base
@@ -12,7 +12,22 @@ class Product(Base):
     description = Column(Text)
     category = Column(Enum(CategoryEnum), nullable=False)
     base_price = Column(Float, default=0)
+    # Cheapest and most expensive configuration with the options in stock,
+    # maintained by PriceRangeService (NULL when the product cannot be configured)
+    min_price = Column(Float)
+    max_price = Column(Float, index=True)
 
     components = relationship("Component", back_populates="product", cascade="all, delete-orphan")
     dependencies = relationship("Dependency", back_populates="product", cascade="all, delete-orphan")
-    price_rules = relationship("PriceRule", back_populates="product", cascade="all, delete-orphan") 
\ No newline at end of file
+    price_rules = relationship("PriceRule", back_populates="product", cascade="all, delete-orphan")
+
+    # Listings sorted by price, and full-text search on names (Postgres only,
+    # SQLite searches an in-memory index)
+    __table_args__ = (
+        Index("ix_products_min_price_id", "min_price", "id"),
+        Index(
+            "ix_products_name_fts",
+            func.to_tsvector(literal_column("'simple'"), name),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    ) 
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Order archival and partition maintenance.
+
+Run it daily, e.g. from cron:
+
+    ORDER_ARCHIVE_AFTER_DAYS=365 python -m app.order_archive
+
+It creates the month partitions of ``orders`` for the coming months
+(Postgres only), moves the completed and canceled orders created more than
+``ORDER_ARCHIVE_AFTER_DAYS`` days ago to ``orders_archive`` in batches of
+``ORDER_ARCHIVE_BATCH_SIZE``, compressed, and drops the old partitions that
+archiving left empty. Archived orders are still served by
+``GET /orders/{id}``; they no longer appear in listings and filters.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database.partitions import ensure_monthly_partitions, drop_empty_partitions, month_start, PARTITION_MONTHS_AHEAD
+from app.services.order_archive_service import OrderArchiveService
+
+logger = logging.getLogger(__name__)
+
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", "365"))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", "1000"))
+
+
+def create_order_partitions(session_factory: Callable[[], Session], months_ahead: int = PARTITION_MONTHS_AHEAD) -> None:
+    """Create the coming month partitions of ``orders``, as each worker does at startup"""
+    try:
+        with session_factory() as db:
+            created = ensure_monthly_partitions(db, "orders", months_ahead=months_ahead)
+            db.commit()
+        if created:
+            logger.info("Created order partitions %s", ", ".join(created))
+    except Exception:
+        logger.exception("Could not create the order partitions")
+
+
+def run_maintenance(
+    db: Session,
+    archive_after: timedelta = timedelta(days=ORDER_ARCHIVE_AFTER_DAYS),
+    batch_size: int = ORDER_ARCHIVE_BATCH_SIZE,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Create partitions, archive old orders and drop the emptied partitions"""
+    now = now or datetime.utcnow()
+    created = ensure_monthly_partitions(db, "orders", months_ahead=months_ahead, now=now)
+    db.commit()
+    cutoff = now - archive_after
+    archived = OrderArchiveService.archive_orders(db, before=cutoff, batch_size=batch_size)
+    # Only whole months before the cutoff can be empty
+    dropped = drop_empty_partitions(db, before=month_start(cutoff), table="orders")
+    db.commit()
+    return {"partitions_created": created, "archived": archived, "partitions_dropped": dropped}
+
+
+if __name__ == "__main__":
+    from app.database.session import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as session:
+        result = run_maintenance(session)
+    print(
+        f"Archived {result['archived']} orders, "
+        f"created {len(result['partitions_created'])} partitions, "
+        f"dropped {len(result['partitions_dropped'])} empty partitions"
+    )
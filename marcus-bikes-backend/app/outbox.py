@@ -0,0 +1,296 @@
+"""
+Relay of the transactional outbox.
+
+Order and inventory writes add domain events (``order.created``,
+``inventory.updated``, ...) to the ``outbox_events`` table in the
+transaction of the write, so an event exists if and only if its change
+committed. With ``OUTBOX_SINKS`` set, a background thread reads the
+undispatched events in id order, in batches of ``OUTBOX_BATCH_SIZE``,
+hands every batch to each sink and marks it dispatched afterwards.
+
+Delivery is at least once: a batch that fails in any sink is retried as a
+whole (with a growing delay) and a crash between sending and marking sends
+it again, so consumers should skip event ids they have already seen. Once
+events of a failing batch reach ``OUTBOX_MAX_ATTEMPTS``, the batch is sent
+one event at a time and the events still rejected are parked (``failed_at``
+set, never retried) so that they no longer hold back the events after them.
+Sinks are listed in ``OUTBOX_SINKS``, comma separated:
+
+- ``handlers``: the in-process handlers registered on ``event_handlers``
+- ``file:<path>``: JSON lines appended to a file
+- ``webhook:<url>``: the batch POSTed as JSON, any non-2xx status is a failure
+
+The relay is woken when a transaction with events commits, and otherwise
+polls every ``OUTBOX_POLL_INTERVAL`` seconds, which also picks up events
+written by other workers. Dispatched events are deleted after
+``OUTBOX_RETENTION_HOURS``.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.models.outbox_event import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Longest delay between two attempts at a failing batch, in seconds
+MAX_RETRY_DELAY = 60.0
+
+# Seconds between two deletions of old dispatched events
+CLEANUP_INTERVAL = 3600.0
+
+# Failed attempts after which an event still rejected is parked
+OUTBOX_MAX_ATTEMPTS = 20
+
+Message = Dict[str, Any]
+
+
+def describe_error(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+def to_message(event: OutboxEvent) -> Message:
+    """The representation of an event handed to sinks"""
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": event.aggregate_id,
+        "payload": event.payload,
+        "created_at": event.created_at.isoformat() if event.created_at else None
+    }
+
+
+class HandlerSink:
+    """Calls the in-process handlers registered for each event type ("*" for every event)"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[Message], None]]] = defaultdict(list)
+
+    def register(self, event_type: str, handler: Callable[[Message], None]) -> None:
+        self._handlers[event_type].append(handler)
+
+    def unregister(self, event_type: str, handler: Callable[[Message], None]) -> None:
+        if handler in self._handlers.get(event_type, ()):
+            self._handlers[event_type].remove(handler)
+
+    def send(self, messages: Sequence[Message]) -> None:
+        for message in messages:
+            for handler in (*self._handlers.get(message["type"], ()), *self._handlers.get("*", ())):
+                handler(message)
+
+
+class FileSink:
+    """Appends events as JSON lines, flushed to disk once per batch"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, messages: Sequence[Message]) -> None:
+        with open(self.path, "ab") as file:
+            file.write(b"".join(json.dumps(message).encode("utf-8") + b"\n" for message in messages))
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class WebhookSink:
+    """POSTs each batch as ``{"events": [...]}``"""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, messages: Sequence[Message]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"events": list(messages)}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        # urlopen raises HTTPError for 4xx and 5xx responses
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        sinks: Sequence[Any],
+        batch_size: int = 100,
+        interval: float = 1.0,
+        retention: timedelta = timedelta(hours=24),
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS
+    ):
+        self.session_factory = session_factory
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retention = retention
+        self.max_attempts = max_attempts
+        self.dispatched = 0
+        self.failed_batches = 0
+        self.parked = 0
+        self._failures = 0
+        self._cleaned_at = -CLEANUP_INTERVAL
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self) -> None:
+        """Dispatch without waiting for the next poll"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the relay thread after one last attempt at the pending events"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.drain()
+        except Exception:
+            logger.warning("Outbox events left undispatched at shutdown", exc_info=True)
+
+    def relay_once(self) -> int:
+        """Send the next batch of events to every sink; returns how many were dispatched"""
+        from app.services.outbox_service import OutboxService
+
+        with self.session_factory() as db:
+            events = OutboxService.claim_pending(db, limit=self.batch_size)
+            if not events:
+                return 0
+            event_ids = [event.id for event in events]
+            messages = [to_message(event) for event in events]
+            try:
+                for sink in self.sinks:
+                    sink.send(messages)
+            except Exception as error:
+                self.failed_batches += 1
+                if all(event.attempts + 1 < self.max_attempts for event in events):
+                    OutboxService.mark_failed(db, event_ids, describe_error(error))
+                    raise
+                return self._send_one_by_one(db, events)
+            OutboxService.mark_dispatched(db, event_ids)
+        self.dispatched += len(event_ids)
+        return len(event_ids)
+
+    def _send_one_by_one(self, db: Session, events: List[OutboxEvent]) -> int:
+        """Find the events the sinks reject, parking those out of attempts; returns how many were dispatched"""
+        from app.services.outbox_service import OutboxService
+
+        dispatched: List[int] = []
+        failed: Dict[int, str] = {}
+        parked: Dict[int, str] = {}
+        for event in events:
+            try:
+                for sink in self.sinks:
+                    sink.send([to_message(event)])
+            except Exception as error:
+                if event.attempts + 1 >= self.max_attempts:
+                    logger.error(
+                        "Parking outbox event %d (%s) after %d attempts: %s",
+                        event.id, event.event_type, event.attempts + 1, error
+                    )
+                    parked[event.id] = describe_error(error)
+                else:
+                    failed[event.id] = describe_error(error)
+            else:
+                dispatched.append(event.id)
+        for event_id, error in failed.items():
+            OutboxService.mark_failed(db, [event_id], error)
+        for event_id, error in parked.items():
+            OutboxService.mark_parked(db, [event_id], error)
+        if dispatched:
+            OutboxService.mark_dispatched(db, dispatched)
+        self.dispatched += len(dispatched)
+        self.parked += len(parked)
+        return len(dispatched)
+
+    def drain(self) -> int:
+        """Dispatch every pending event, batch by batch"""
+        dispatched = 0
+        while True:
+            count = self.relay_once()
+            dispatched += count
+            if count < self.batch_size:
+                return dispatched
+
+    def cleanup(self) -> int:
+        """Delete the events dispatched longer ago than the retention"""
+        from app.services.outbox_service import OutboxService
+
+        with self.session_factory() as db:
+            return OutboxService.delete_dispatched(db, before=datetime.utcnow() - self.retention)
+
+    def _run(self) -> None:
+        while True:
+            delay = self.interval if not self._failures else min(self.interval * 2 ** self._failures, MAX_RETRY_DELAY)
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+            if self._stopping:
+                return
+            try:
+                self.drain()
+                self._failures = 0
+            except Exception:
+                self._failures += 1
+                logger.exception("Could not dispatch outbox events (attempt %d)", self._failures)
+            now = time.monotonic()
+            if now - self._cleaned_at >= CLEANUP_INTERVAL:
+                self._cleaned_at = now
+                try:
+                    self.cleanup()
+                except Exception:
+                    logger.exception("Could not delete dispatched outbox events")
+
+
+def sinks_from_setting(setting: str) -> List[Any]:
+    sinks = []
+    for name in filter(None, (part.strip() for part in setting.split(","))):
+        if name == "handlers":
+            sinks.append(event_handlers)
+        elif name.startswith("file:"):
+            sinks.append(FileSink(name[len("file:"):]))
+        elif name.startswith("webhook:"):
+            sinks.append(WebhookSink(name[len("webhook:"):]))
+        else:
+            raise ValueError(f"Unknown outbox sink: {name}")
+    return sinks
+
+
+def relay_from_environment() -> Optional[OutboxRelay]:
+    setting = os.getenv("OUTBOX_SINKS")
+    if not setting:
+        return None
+    from app.database.session import SessionLocal
+
+    return OutboxRelay(
+        SessionLocal,
+        sinks_from_setting(setting),
+        batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", "100")),
+        interval=float(os.getenv("OUTBOX_POLL_INTERVAL", "1")),
+        retention=timedelta(hours=float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))),
+        max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", str(OUTBOX_MAX_ATTEMPTS)))
+    )
+
+
+# In-process consumers register here, e.g. event_handlers.register("order.created", send_confirmation)
+event_handlers = HandlerSink()
+
+# Only used when OUTBOX_SINKS is set
+outbox_relay = relay_from_environment()
@@ -0,0 +1,35 @@
+import base64
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Encode the keyset position of the last returned row as an opaque cursor"""
+    raw = json.dumps(position, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+# Value types of the sort keys found in cursors
+INTEGER = (int,)
+NUMBER = (int, float)
+OPTIONAL_NUMBER = (int, float, type(None))
+
+
+def decode_cursor(cursor: Optional[str], **key_types: Tuple[type, ...]) -> Optional[Dict[str, Any]]:
+    """Decode a cursor from ``encode_cursor``, checking it holds the expected keys and value types"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    for key, types in key_types.items():
+        # bool is an int subclass, but never a sort key
+        if key not in position or isinstance(position[key], bool) or not isinstance(position[key], types):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
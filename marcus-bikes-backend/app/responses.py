@@ -0,0 +1,127 @@
+import struct
+import threading
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Type
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.encoding import COMPRESSION_MINIMUM_SIZE, ENCODINGS, choose_encoding, compress
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Length of the header of a serialized EncodedBody
+ENCODED_HEADER = struct.Struct("<I")
+
+
+def _orjson_default(value: Any) -> Any:
+    """Encode what orjson does not natively, like ``jsonable_encoder`` would"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson, the app's default response class.
+
+    Routes returning plain values (or ORM objects through a
+    ``response_model``) are encoded by it instead of ``json.dumps``. Naive
+    datetimes are written without an offset and enums by value, as
+    ``JSONResponse`` does, so the output is the same, only faster.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def model_response(model: BaseModel, status_code: int = 200, exclude_unset: bool = False) -> Response:
+    """
+    Serialize an already validated model.
+
+    FastAPI would otherwise dump the model to a dict and validate it again
+    against the route's ``response_model`` before encoding it. The
+    ``response_model`` is still declared on the route for the OpenAPI schema.
+    """
+    content = model.model_dump_json(exclude_unset=exclude_unset)
+    return Response(content=content, media_type=JSON_MEDIA_TYPE, status_code=status_code)
+
+
+def models_response(adapter: TypeAdapter, models: List[Any], status_code: int = 200) -> Response:
+    """Serialize a list of already validated models, see ``model_response``"""
+    return Response(content=adapter.dump_json(models), media_type=JSON_MEDIA_TYPE, status_code=status_code)
+
+
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Build the adapter used to serialize lists of ``model``"""
+    return TypeAdapter(List[model])
+
+
+class EncodedBody:
+    """
+    A JSON response body kept in a cache with its compressed variants.
+
+    Each variant is compressed the first time a client accepts it and then
+    reused, so hot cached responses are compressed once rather than by the
+    compression middleware on every request.
+    """
+
+    def __init__(self, body: bytes, variants: Optional[Dict[str, bytes]] = None):
+        self.body = body
+        self._variants: Dict[str, bytes] = dict(variants or {})
+        self._lock = threading.Lock()
+
+    def variant(self, encoding: str) -> bytes:
+        compressed = self._variants.get(encoding)
+        if compressed is None:
+            compressed = compress(self.body, encoding)
+            with self._lock:
+                compressed = self._variants.setdefault(encoding, compressed)
+        return compressed
+
+
+class EncodedBodyCodec:
+    """
+    Encodes an ``EncodedBody`` for shared cache backends.
+
+    Bodies worth compressing are stored with a variant in every available
+    encoding, so that workers reading them from the cache send them without
+    compressing them again.
+    """
+
+    @staticmethod
+    def dumps(value: EncodedBody) -> bytes:
+        encodings = ENCODINGS if len(value.body) >= COMPRESSION_MINIMUM_SIZE else ()
+        sections = [value.body] + [value.variant(encoding) for encoding in encodings]
+        header = orjson.dumps([[encoding, len(section)] for encoding, section in zip(("identity", *encodings), sections)])
+        return ENCODED_HEADER.pack(len(header)) + header + b"".join(sections)
+
+    @staticmethod
+    def loads(data: bytes) -> EncodedBody:
+        (header_size,) = ENCODED_HEADER.unpack_from(data)
+        offset = ENCODED_HEADER.size + header_size
+        sections = {}
+        for encoding, size in orjson.loads(data[ENCODED_HEADER.size:offset]):
+            sections[encoding] = data[offset:offset + size]
+            offset += size
+        return EncodedBody(sections.pop("identity"), sections)
+
+
+ENCODED_BODY_CODEC = EncodedBodyCodec()
+
+
+def encoded_response(request: Request, encoded: EncodedBody, status_code: int = 200) -> Response:
+    """Send a cached body, precompressed in the encoding negotiated with the client"""
+    headers = {"Vary": "Accept-Encoding"}
+    body = encoded.body
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None and len(body) >= COMPRESSION_MINIMUM_SIZE:
+        body = encoded.variant(encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, status_code=status_code, headers=headers)
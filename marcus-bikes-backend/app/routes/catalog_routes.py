@@ -0,0 +1,50 @@
+from typing import Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database.session import get_db
+from app.controllers.catalog_controller import CatalogController
+from app.schemas import CatalogChanges, CatalogSnapshot
+from app.responses import model_response
+from app.events import catalog_events, event_stream
+
+router = APIRouter(prefix="/catalog", tags=["catalog"])
+
+@router.get("/changes", response_model=CatalogChanges)
+def read_catalog_changes(
+    since: int = 0,
+    limit: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the catalog changes after version `since` (products, components,
+    options, price rules and stock flags), with the current state of the
+    changed products and the IDs of deleted ones. Pass the returned `version`
+    as `since` to get the next changes.
+    """
+    return model_response(CatalogController.get_changes(db, since=since, limit=limit))
+
+@router.get("/snapshot", response_model=CatalogSnapshot)
+def read_catalog_snapshot(db: Session = Depends(get_db)):
+    """
+    Get the whole catalog and the change version it includes, to start
+    syncing from with `/catalog/changes`.
+    """
+    return model_response(CatalogController.get_snapshot(db))
+
+@router.get("/events")
+async def stream_catalog_events(product_id: Optional[int] = None):
+    """
+    Server-sent events for every committed catalog change, e.g. option stock
+    flips and product or price rule edits, optionally only those of one
+    product. Each `catalog` event carries the change version (also the event
+    id), the entity, its product and the operation, plus `in_stock` for stock
+    flips. A `resync` event means the client fell behind and events were
+    dropped: refetch, or catch up with `/catalog/changes?since=<last id>`.
+    """
+    return StreamingResponse(
+        event_stream(catalog_events, product_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,10 +1,10 @@
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 
 from app.database.session import get_db
 from app.controllers.inventory_controller import InventoryController
-from app.schemas import Inventory, InventoryCreate, InventoryUpdate
+from app.schemas import Inventory, InventoryCreate, InventoryUpdate, InventoryListPage
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
@@ -19,6 +19,36 @@ def read_inventories(
     """
     return InventoryController.get_inventories(db, skip=skip, limit=limit)
 
+@router.get("/listing", response_model=InventoryListPage)
+def read_inventory_listing(
+    product_id: Optional[int] = None,
+    component_id: Optional[int] = None,
+    category: Optional[str] = None,
+    stock_status: Optional[str] = None,
+    name: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Get inventory records with their option, component and product names.
+    Filter by product, component, category, stock status and option name
+    prefix (`name`), sort by `id`, `quantity` or `-quantity`, and pass the
+    returned `next_cursor` as `cursor` to get the next page.
+    """
+    return InventoryController.get_inventory_listing(
+        db,
+        product_id=product_id,
+        component_id=component_id,
+        category=category,
+        stock_status=stock_status,
+        name_prefix=name,
+        sort=sort,
+        cursor=cursor,
+        limit=limit
+    )
+
 @router.get("/low-stock", response_model=List[Inventory])
 def read_low_stock_items(db: Session = Depends(get_db)):
     """
@@ -36,7 +66,7 @@ def read_inventory_by_option(option_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=Inventory, status_code=status.HTTP_201_CREATED)
 def create_inventory(inventory: InventoryCreate, db: Session = Depends(get_db)):
     """
-    Create a new inventory record.
+    Create the inventory record for an option, replacing any existing one.
     """
     return InventoryController.create_inventory(db=db, inventory=inventory)
 
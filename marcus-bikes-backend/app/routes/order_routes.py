@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 
 from app.database.session import get_db
 from app.controllers.order_controller import OrderController
-from app.schemas import Order, OrderCreate, OrderUpdate, OrderFilter
+from app.responses import model_response
+from app.schemas import Order, OrderCreate, OrderUpdate, OrderFilter, OrderBulkStatusUpdate, OrderBulkStatusResult, OrderReceipt, OrderIngestionStatus, OrderIngestionStats
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -27,10 +28,28 @@ def filter_orders(
     db: Session = Depends(get_db)
 ):
     """
-    Filter orders by date range, status, and product category.
+    Filter orders by date range, status, and product category, and by
+    product (product_id) or chosen option (option_id) to find the orders
+    affected by a recalled or delayed part.
     """
     return OrderController.filter_orders(db, filters=filters, skip=skip, limit=limit)
 
+@router.get("/ingestion", response_model=OrderIngestionStats)
+def read_ingestion_stats():
+    """
+    Get the counters of the order ingestion queue: orders queued, written
+    and failed, and batches written.
+    """
+    return model_response(OrderController.get_ingestion_stats())
+
+@router.get("/ingestion/{reference}", response_model=OrderIngestionStatus)
+def read_ingestion_status(reference: str, db: Session = Depends(get_db)):
+    """
+    Get the status of an order accepted for ingestion: queued, written
+    (with its order ID) or failed.
+    """
+    return model_response(OrderController.get_ingestion_status(db, reference=reference))
+
 @router.get("/{order_id}", response_model=Order)
 def read_order(order_id: int, db: Session = Depends(get_db)):
     """
@@ -38,24 +57,45 @@ def read_order(order_id: int, db: Session = Depends(get_db)):
     """
     return OrderController.get_order(db, order_id=order_id)
 
-@router.post("/", response_model=Order, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=Order,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": OrderReceipt}}
+)
 def create_order(order: OrderCreate, db: Session = Depends(get_db)):
     """
     Create a new order.
+
+    With order ingestion enabled, the order is queued instead and a 202
+    with its reference is returned once it is journaled; its status is
+    served on /orders/ingestion/{reference}.
     """
+    if OrderController.ingestion_enabled():
+        return model_response(OrderController.enqueue_order(order), status_code=status.HTTP_202_ACCEPTED)
     return OrderController.create_order(db=db, order=order)
 
+@router.patch("/bulk-status", response_model=OrderBulkStatusResult)
+def bulk_update_order_status(request: OrderBulkStatusUpdate, db: Session = Depends(get_db)):
+    """
+    Move up to 1000 orders to a status at once (e.g. from processing to
+    shipped). Orders that do not exist, or whose status cannot move to the
+    new one (or is not ``from_status`` when given), are listed in ``failed``
+    with the reason; the others are updated together.
+    """
+    return model_response(OrderController.bulk_update_status(db, request))
+
 @router.patch("/{order_id}", response_model=Order)
 def update_order(order_id: int, order: OrderUpdate, db: Session = Depends(get_db)):
     """
-    Update an order's information.
+    Update an order's information. Archived orders are read-only (409).
     """
     return OrderController.update_order(db, order_id=order_id, order=order)
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_order(order_id: int, db: Session = Depends(get_db)):
     """
-    Delete an order.
+    Delete an order. Archived orders are read-only (409).
     """
     OrderController.delete_order(db, order_id=order_id)
     return None 
\ No newline at end of file
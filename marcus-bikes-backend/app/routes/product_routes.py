@@ -1,25 +1,36 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, status
 from sqlalchemy.orm import Session
 
 from app.database.session import get_db
 from app.controllers.product_controller import ProductController
-from app.schemas import ProductCreate, FrontendProduct, ProductBase, CategoryProductCount
+from app.schemas import ProductCreate, FrontendProduct, ProductBase, CategoryProductCount, ProductSummaryPage, ProductCount, ProductSearchPage, ConfigurationCheck, ConfigurationQuote
+from app.responses import model_response, models_response, list_adapter, encoded_response
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+frontend_products_adapter = list_adapter(FrontendProduct)
+
 @router.get("/", response_model=List[FrontendProduct])
 def read_products(
     category: Optional[str] = None,
     skip: int = 0, 
     limit: int = 100, 
+    ids: Optional[str] = None,
+    sort: str = "id",
     db: Session = Depends(get_db)
 ):
     """
     Get all products with pagination.
-    Optionally filter by category.
+    Optionally filter by category, and sort by cheapest configuration
+    with `sort=price` or `sort=-price`.
+    Pass `ids` (comma-separated) to get those products instead, in that order.
     """
-    return ProductController.get_products(db, category=category, skip=skip, limit=limit)
+    if ids is not None:
+        product_ids = ProductController.parse_product_ids(ids)
+        return models_response(frontend_products_adapter, ProductController.get_products_by_ids(db, product_ids))
+    products = ProductController.get_products(db, category=category, skip=skip, limit=limit, sort=sort)
+    return models_response(frontend_products_adapter, products)
 
 @router.get("/categories", response_model=List[dict])
 def read_categories(db: Session = Depends(get_db)):
@@ -28,6 +39,63 @@ def read_categories(db: Session = Depends(get_db)):
     """
     return ProductController.get_categories(db)
 
+@router.get("/summary", response_model=ProductSummaryPage, response_model_exclude_unset=True)
+def read_product_summaries(
+    fields: Optional[str] = None,
+    category: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a lightweight listing of products: name, category, base price,
+    price range and option counts, without the full product tree.
+    Use `fields` (comma-separated) to only return some fields, `sort=price`
+    or `sort=-price` to order by cheapest configuration, and pass
+    the returned `next_cursor` as `cursor` to get the next page.
+    """
+    page = ProductController.get_product_summaries(
+        db, fields=fields, category=category, sort=sort, cursor=cursor, limit=limit
+    )
+    return model_response(page, exclude_unset=True)
+
+@router.get("/count", response_model=ProductCount)
+def count_products(category: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Get the number of products, optionally in one category.
+    """
+    return ProductController.get_product_count(db, category=category)
+
+@router.get("/search", response_model=ProductSearchPage)
+def search_products(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    option: List[str] = Query(default=[]),
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_db)
+):
+    """
+    Search products by product, component and option names (`q`), category,
+    configurable price range and required option names (repeat `option`).
+    Returns the matching products with their price range, the total number
+    of matches and facet counts per category and component option.
+    """
+    page = ProductController.search_products(
+        db,
+        q=q,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        options=option,
+        skip=skip,
+        limit=limit
+    )
+    return model_response(page)
+
 # @router.get("/custom-bike", response_model=FrontendProduct)
 # def read_custom_bike(db: Session = Depends(get_db)):
 #     """
@@ -36,25 +104,34 @@ def read_categories(db: Session = Depends(get_db)):
 #     return ProductController.get_product(db, product_id="custom-bike")
 
 @router.get("/{product_id}", response_model=FrontendProduct)
-def read_product(product_id: int, db: Session = Depends(get_db)):
+def read_product(product_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Get a specific product by ID.
     """
-    return ProductController.get_product(db, product_id=product_id)
+    return encoded_response(request, ProductController.get_product_body(db, product_id=product_id))
+
+@router.post("/{product_id}/configuration", response_model=ConfigurationQuote)
+def check_configuration(product_id: int, configuration: ConfigurationCheck, db: Session = Depends(get_db)):
+    """
+    Price a configuration of a product (the IDs of the chosen options, one
+    per component) and check it can be ordered: every option in stock and
+    the product's dependencies met. `problems` lists what prevents it.
+    """
+    return model_response(ProductController.check_configuration(db, product_id, configuration))
 
 @router.post("/", response_model=FrontendProduct, status_code=status.HTTP_201_CREATED)
 def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     """
     Create a new product.
     """
-    return ProductController.create_product(db=db, product=product)
+    return model_response(ProductController.create_product(db=db, product=product), status_code=status.HTTP_201_CREATED)
 
 @router.put("/{product_id}", response_model=FrontendProduct)
 def update_product(product_id: int, product: ProductBase, db: Session = Depends(get_db)):
     """
     Update a product's basic information.
     """
-    return ProductController.update_product(db, product_id=product_id, product=product)
+    return model_response(ProductController.update_product(db, product_id=product_id, product=product))
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_product(product_id: int, db: Session = Depends(get_db)):
@@ -65,8 +142,9 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     return None
 
 @router.get("/category/counts", response_model=List[CategoryProductCount])
-def get_category_counts(db: Session = Depends(get_db)):
+def get_category_counts(request: Request, db: Session = Depends(get_db)):
     """
-    Get counts of products for each category.
+    Get counts of products for each category, with their configurable price range
+    and how many of them can currently be ordered.
     """
-    return ProductController.get_category_counts(db) 
\ No newline at end of file
+    return encoded_response(request, ProductController.get_category_counts_body(db)) 
\ No newline at end of file
@@ -1,25 +1,30 @@
-from app.schemas.enums import CategoryEnum, DependencyTypeEnum, OrderStatusEnum, StockStatusEnum
+from app.schemas.enums import CategoryEnum, DependencyTypeEnum, OrderStatusEnum, StockStatusEnum, CatalogEntityEnum, ChangeOperationEnum
 from app.schemas.option import Option, OptionCreate, OptionBase
 from app.schemas.component import Component, ComponentCreate, ComponentBase
 from app.schemas.dependency import Dependency, DependencyCreate, DependencyBase
 from app.schemas.price_rule import PriceRule, PriceRuleCreate, PriceRuleBase
-from app.schemas.product import Product, ProductCreate, ProductBase
-from app.schemas.order import Order, OrderCreate, OrderUpdate, OrderFilter
-from app.schemas.inventory import Inventory, InventoryCreate, InventoryUpdate, OptionWithInventory
+from app.schemas.product import Product, ProductCreate, ProductBase, ProductSummary, ProductSummaryPage, ProductCount, ProductSearchFacets, ProductSearchPage
+from app.schemas.order import Order, OrderCreate, OrderUpdate, OrderFilter, OrderBulkStatusUpdate, OrderStatusFailure, OrderBulkStatusResult, OrderReceipt, OrderIngestionStatus, OrderIngestionStats
+from app.schemas.inventory import Inventory, InventoryCreate, InventoryUpdate, OptionWithInventory, InventoryListItem, InventoryListPage
 from app.schemas.frontend import (
     FrontendOption, 
     FrontendComponent, 
     FrontendDependency, 
     FrontendPriceRule, 
     FrontendProduct,
-    CategoryProductCount
+    CategoryProductCount,
+    ConfigurationCheck,
+    ConfigurationQuote
 )
+from app.schemas.catalog import CatalogChangeEntry, CatalogChanges, CatalogSnapshot
 
 __all__ = [
     "CategoryEnum",
     "DependencyTypeEnum",
     "OrderStatusEnum",
     "StockStatusEnum",
+    "CatalogEntityEnum",
+    "ChangeOperationEnum",
     "Option",
     "OptionCreate",
     "OptionBase",
@@ -35,18 +40,36 @@ __all__ = [
     "Product",
     "ProductCreate",
     "ProductBase",
+    "ProductSummary",
+    "ProductSummaryPage",
+    "ProductCount",
+    "ProductSearchFacets",
+    "ProductSearchPage",
     "Order",
     "OrderCreate",
     "OrderUpdate",
     "OrderFilter",
+    "OrderBulkStatusUpdate",
+    "OrderStatusFailure",
+    "OrderBulkStatusResult",
+    "OrderReceipt",
+    "OrderIngestionStatus",
+    "OrderIngestionStats",
     "Inventory",
     "InventoryCreate",
     "InventoryUpdate",
     "OptionWithInventory",
+    "InventoryListItem",
+    "InventoryListPage",
     "FrontendOption",
     "FrontendComponent",
     "FrontendDependency",
     "FrontendPriceRule",
     "FrontendProduct",
-    "CategoryProductCount"
+    "CategoryProductCount",
+    "ConfigurationCheck",
+    "ConfigurationQuote",
+    "CatalogChangeEntry",
+    "CatalogChanges",
+    "CatalogSnapshot"
 ] 
\ No newline at end of file
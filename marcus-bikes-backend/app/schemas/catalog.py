@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from typing import List
+
+from app.schemas.enums import CatalogEntityEnum, ChangeOperationEnum
+from app.schemas.frontend import FrontendProduct
+
+class CatalogChangeEntry(BaseModel):
+    version: int
+    entity_type: CatalogEntityEnum
+    entity_id: int
+    product_id: int
+    operation: ChangeOperationEnum
+
+    class Config:
+        from_attributes = True
+
+class CatalogChanges(BaseModel):
+    """Catalog changes after a version, with the current state of the products they touch
+
+    Pass ``version`` as ``since`` to get the next changes; ``has_more`` is set
+    when the page stopped before the latest change.
+    """
+    version: int
+    has_more: bool
+    changes: List[CatalogChangeEntry]
+    products: List[FrontendProduct]
+    deleted_product_ids: List[int]
+
+class CatalogSnapshot(BaseModel):
+    """The whole catalog, including at least every change up to ``version``"""
+    version: int
+    products: List[FrontendProduct]
@@ -20,4 +20,16 @@ class OrderStatusEnum(str, Enum):
 class StockStatusEnum(str, Enum):
     IN_STOCK = "in_stock"
     OUT_OF_STOCK = "out_of_stock"
-    LIMITED_STOCK = "limited_stock" 
\ No newline at end of file
+    LIMITED_STOCK = "limited_stock"
+
+class CatalogEntityEnum(str, Enum):
+    PRODUCT = "product"
+    COMPONENT = "component"
+    OPTION = "option"
+    PRICE_RULE = "price_rule"
+
+class ChangeOperationEnum(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    STOCK = "stock"
@@ -37,7 +37,23 @@ class FrontendProduct(BaseModel):
     dependencies: List[FrontendDependency]
     priceRules: List[FrontendPriceRule]
     basePrice: float
+    # The cheapest and most expensive configuration in stock, the sort=price key;
+    # None when some component has nothing in stock
+    minPrice: Optional[float] = None
+    maxPrice: Optional[float] = None
 
 class CategoryProductCount(BaseModel):
     category: str
-    count: int 
\ No newline at end of file
+    count: int
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock_count: int = 0 
+class ConfigurationCheck(BaseModel):
+    # The options chosen, one per component
+    optionIds: List[int]
+
+class ConfigurationQuote(BaseModel):
+    price: float
+    valid: bool
+    # Why the configuration cannot be ordered, empty when it is valid
+    problems: List[str] = []
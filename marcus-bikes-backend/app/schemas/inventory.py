@@ -1,7 +1,7 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
-from app.schemas.enums import StockStatusEnum
+from app.schemas.enums import StockStatusEnum, CategoryEnum
 
 class InventoryBase(BaseModel):
     option_id: int
@@ -35,4 +35,22 @@ class OptionWithInventory(BaseModel):
     low_stock_threshold: int
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+# Inventory record joined with the option, component and product it belongs to
+class InventoryListItem(BaseModel):
+    id: int
+    option_id: int
+    option_name: str
+    component_id: int
+    component_name: str
+    product_id: int
+    product_name: str
+    product_category: CategoryEnum
+    quantity: int
+    low_stock_threshold: int
+    stock_status: StockStatusEnum
+
+class InventoryListPage(BaseModel):
+    items: List[InventoryListItem]
+    next_cursor: Optional[str] = None
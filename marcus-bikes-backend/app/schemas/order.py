@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 
 from app.schemas.enums import OrderStatusEnum
@@ -34,4 +34,42 @@ class OrderFilter(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     status: Optional[OrderStatusEnum] = None
-    product_category: Optional[str] = None 
\ No newline at end of file
+    product_category: Optional[str] = None
+    # Orders with an item of this product ("custom-bike", or a catalog ID) and/or with this option chosen
+    product_id: Optional[Union[int, str]] = None
+    option_id: Optional[int] = None
+
+class OrderBulkStatusUpdate(BaseModel):
+    order_ids: List[int]
+    status: OrderStatusEnum
+    # Only move orders currently in this status
+    from_status: Optional[OrderStatusEnum] = None
+
+class OrderStatusFailure(BaseModel):
+    order_id: int
+    # None when the order does not exist
+    current_status: Optional[OrderStatusEnum] = None
+    reason: str
+
+class OrderBulkStatusResult(BaseModel):
+    status: OrderStatusEnum
+    updated: List[int]
+    failed: List[OrderStatusFailure]
+
+class OrderReceipt(BaseModel):
+    """Acknowledgement of an order accepted for asynchronous ingestion"""
+    reference: str
+    status: str
+
+class OrderIngestionStatus(BaseModel):
+    reference: str
+    # queued, written or failed
+    status: str
+    order_id: Optional[int] = None
+    error: Optional[str] = None
+
+class OrderIngestionStats(BaseModel):
+    queued: int
+    written: int
+    failed: int
+    batches: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from app.schemas.enums import CategoryEnum
 from app.schemas.component import Component, ComponentCreate
@@ -24,4 +24,33 @@ class Product(ProductBase):
     price_rules: List[PriceRule]
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class ProductSummary(BaseModel):
+    """Listing view of a product; every field but ``id`` may be left out with ``fields=``"""
+    id: int
+    name: Optional[str] = None
+    category: Optional[CategoryEnum] = None
+    base_price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    component_count: Optional[int] = None
+    option_count: Optional[int] = None
+    in_stock_option_count: Optional[int] = None
+
+class ProductSummaryPage(BaseModel):
+    items: List[ProductSummary]
+    next_cursor: Optional[str] = None
+
+class ProductCount(BaseModel):
+    count: int
+
+class ProductSearchFacets(BaseModel):
+    """Number of matching products per category and per component option name"""
+    categories: Dict[str, int]
+    options: Dict[str, Dict[str, int]]
+
+class ProductSearchPage(BaseModel):
+    items: List[ProductSummary]
+    total: int
+    facets: ProductSearchFacets
@@ -0,0 +1,257 @@
+"""
+In-memory inverted index for product search.
+
+Used when the database has no full-text search (SQLite). Every product gets
+a position in id order, and sets of products are bitmaps: Python ints with
+one bit per position, so that filters are ANDs and counts are popcounts.
+Postings of words and option names that are rare in the catalog are kept as
+sets of positions instead, and only turned into a bitmap when used.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import islice
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Product, Component, Option
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+INFINITY = float("inf")
+
+# Bit positions set in every byte value
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+Posting = Union[int, FrozenSet[int]]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split a name or query into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def to_bitmap(positions: Iterable[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
+
+
+def iter_positions(bitmap: int, size: int) -> Iterator[int]:
+    """Positions of the set bits of ``bitmap``, in increasing order"""
+    for byte_index, byte in enumerate(bitmap.to_bytes((size + 7) // 8, "little")):
+        if byte:
+            base = byte_index * 8
+            for bit in BYTE_BITS[byte]:
+                yield base + bit
+
+
+class ProductSearchIndex:
+    """Search structures for the whole catalog, rebuilt after catalog writes"""
+
+    # A posting becomes a bitmap once it holds at least 1/DENSE_RATIO of the
+    # catalog, which bounds bitmaps to DENSE_RATIO per word of a product. The
+    # price filters keep DENSE_RATIO checkpoint bitmaps each.
+    DENSE_RATIO = 64
+
+    def __init__(self, products: Sequence[Dict[str, Any]], options: Sequence[Tuple[int, str, str]]):
+        """Index ``products`` (listing dicts with ``min_price``/``max_price``) and their
+        options as ``(product_id, component name, option name)``
+        """
+        self.products = sorted(products, key=lambda product: product["id"])
+        self.size = len(self.products)
+        self.all = (1 << self.size) - 1
+        self.dense_threshold = max(1, self.size // self.DENSE_RATIO)
+        position_of = {product["id"]: position for position, product in enumerate(self.products)}
+
+        # Names repeat a lot across a catalog, so tokenize each one once
+        name_tokens: Dict[str, List[str]] = {}
+
+        def tokens_of(name: str) -> List[str]:
+            tokens = name_tokens.get(name)
+            if tokens is None:
+                tokens = name_tokens[name] = tokenize(name)
+            return tokens
+
+        product_tokens: List[Set[str]] = [set(tokens_of(product["name"])) for product in self.products]
+        option_names: Dict[str, Set[int]] = {}
+        facets: Dict[Tuple[str, str], Set[int]] = {}
+        for product_id, component_name, option_name in options:
+            position = position_of.get(product_id)
+            if position is None:
+                continue
+            product_tokens[position].update(tokens_of(component_name))
+            product_tokens[position].update(tokens_of(option_name))
+            option_names.setdefault(option_name.lower(), set()).add(position)
+            facets.setdefault((component_name, option_name), set()).add(position)
+
+        tokens: Dict[str, Set[int]] = {}
+        for position, words in enumerate(product_tokens):
+            for word in words:
+                tokens.setdefault(word, set()).add(position)
+        self.tokens = {word: self._posting(positions) for word, positions in tokens.items()}
+        self.sorted_tokens = sorted(self.tokens)
+        self.option_names = {name: self._posting(positions) for name, positions in option_names.items()}
+
+        categories: Dict[str, Set[int]] = {}
+        for position, product in enumerate(self.products):
+            categories.setdefault(product["category"], set()).add(position)
+        self.categories = {category: to_bitmap(positions, self.size) for category, positions in categories.items()}
+
+        # Common facets are counted with bitmaps, rare ones per matching product
+        self.dense_facets: Dict[Tuple[str, str], int] = {}
+        sparse_facets: List[List[Tuple[str, str]]] = [[] for _ in range(self.size)]
+        for facet, positions in facets.items():
+            if len(positions) >= self.dense_threshold:
+                self.dense_facets[facet] = to_bitmap(positions, self.size)
+            else:
+                for position in positions:
+                    sparse_facets[position].append(facet)
+        self.sparse_facets = [tuple(product_facets) for product_facets in sparse_facets]
+        self.has_sparse_facets = any(self.sparse_facets)
+
+        # Positions sorted by price, with bitmaps of the cheapest (or most
+        # expensive) products up to every checkpoint. Products without a price
+        # range sort past either end, so that price filters never match them.
+        self.checkpoint = self.dense_threshold
+        min_prices = [INFINITY if product["min_price"] is None else product["min_price"] for product in self.products]
+        max_prices = [-INFINITY if product["max_price"] is None else product["max_price"] for product in self.products]
+        self.by_min_price = sorted(range(self.size), key=min_prices.__getitem__)
+        self.min_prices = [min_prices[position] for position in self.by_min_price]
+        self.by_max_price = sorted(range(self.size), key=max_prices.__getitem__)
+        self.max_prices = [max_prices[position] for position in self.by_max_price]
+        self.min_price_prefixes = [0]
+        for start in range(0, self.size, self.checkpoint):
+            chunk = to_bitmap(self.by_min_price[start:start + self.checkpoint], self.size)
+            self.min_price_prefixes.append(self.min_price_prefixes[-1] | chunk)
+        self.max_price_suffixes = [0]
+        for start in reversed(range(0, self.size, self.checkpoint)):
+            chunk = to_bitmap(self.by_max_price[start:start + self.checkpoint], self.size)
+            self.max_price_suffixes.append(self.max_price_suffixes[-1] | chunk)
+        self.max_price_suffixes.reverse()
+
+    def _posting(self, positions: Set[int]) -> Posting:
+        if len(positions) >= self.dense_threshold:
+            return to_bitmap(positions, self.size)
+        return frozenset(positions)
+
+    def _bitmap(self, posting: Posting) -> int:
+        return posting if isinstance(posting, int) else to_bitmap(posting, self.size)
+
+    @classmethod
+    def build(cls, db: Session) -> "ProductSearchIndex":
+        """Load product and option names and prices with two queries and index them
+
+        The price range of a product is the one stored by PriceRangeService
+        (in-stock options and price rules). Rows are read from the session's
+        connection, without ORM result processing.
+        """
+        connection = db.connection()
+        products = [
+            {
+                "id": row.id,
+                "name": row.name,
+                "category": row.category.value,
+                "base_price": row.base_price or 0.0,
+                "min_price": row.min_price,
+                "max_price": row.max_price,
+            }
+            for row in connection.execute(
+                select(Product.id, Product.name, Product.category, Product.base_price, Product.min_price, Product.max_price)
+            )
+        ]
+        options = connection.execute(
+            select(Component.product_id, Component.name, Option.name)
+            .join(Option, Option.component_id == Component.id)
+        ).all()
+        return cls(products, options)
+
+    def match_text(self, query: str) -> int:
+        """Products with a product, component or option name word starting with
+        every word of the query
+        """
+        matched = self.all
+        for token in tokenize(query):
+            start = bisect_left(self.sorted_tokens, token)
+            end = bisect_right(self.sorted_tokens, token + "\uffff", lo=start)
+            positions = 0
+            sparse: Set[int] = set()
+            for word in self.sorted_tokens[start:end]:
+                posting = self.tokens[word]
+                if isinstance(posting, int):
+                    positions |= posting
+                else:
+                    sparse |= posting
+            matched &= positions | to_bitmap(sparse, self.size)
+            if not matched:
+                break
+        return matched
+
+    def price_filter(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        """Products whose price range overlaps ``[min_price, max_price]``"""
+        matched = self.all
+        if min_price is not None:
+            # Most expensive configuration at least min_price: a suffix of by_max_price
+            start = bisect_left(self.max_prices, min_price)
+            checkpoint = -(-start // self.checkpoint)
+            end = min(checkpoint * self.checkpoint, self.size)
+            matched &= self.max_price_suffixes[checkpoint] | to_bitmap(self.by_max_price[start:end], self.size)
+        if max_price is not None:
+            # Cheapest configuration at most max_price: a prefix of by_min_price
+            end = bisect_right(self.min_prices, max_price)
+            checkpoint = end // self.checkpoint
+            start = checkpoint * self.checkpoint
+            matched &= self.min_price_prefixes[checkpoint] | to_bitmap(self.by_min_price[start:end], self.size)
+        return matched
+
+    def option_facets(self, matched: int) -> Dict[str, Dict[str, int]]:
+        """Number of matching products offering each component option"""
+        counts: Counter = Counter()
+        for facet, bitmap in self.dense_facets.items():
+            count = (matched & bitmap).bit_count()
+            if count:
+                counts[facet] = count
+        if self.has_sparse_facets:
+            for position in iter_positions(matched, self.size):
+                counts.update(self.sparse_facets[position])
+
+        facets: Dict[str, Dict[str, int]] = {}
+        for (component_name, option_name), count in sorted(counts.items()):
+            facets.setdefault(component_name, {})[option_name] = count
+        return facets
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        options: Sequence[str] = (),
+        skip: int = 0,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """Search the index; see ``SearchService.search`` for the result format"""
+        matched = self.match_text(query) if query else self.all
+        for option_name in options:
+            matched &= self._bitmap(self.option_names.get(option_name.lower(), frozenset()))
+        if min_price is not None or max_price is not None:
+            matched &= self.price_filter(min_price, max_price)
+
+        # The category facet ignores the category filter, so that other categories stay visible
+        category_facets = {name: (matched & bitmap).bit_count() for name, bitmap in self.categories.items()}
+        if category:
+            matched &= self.categories.get(category, 0)
+
+        page = islice(iter_positions(matched, self.size), skip, skip + limit)
+        return {
+            "items": [dict(self.products[position]) for position in page],
+            "total": matched.bit_count(),
+            "facets": {
+                "categories": {name: count for name, count in sorted(category_facets.items()) if count},
+                "options": self.option_facets(matched),
+            },
+        }
@@ -0,0 +1,111 @@
+from typing import Any, Iterable, List, Tuple
+
+from sqlalchemy import select, insert, func, literal, text, event
+from sqlalchemy.orm import Session
+
+from app.models.catalog_change import CatalogChange
+from app.models.component import Component
+from app.models.option import Option
+from app.models.enums import CatalogEntityEnum, ChangeOperationEnum
+from app.events import catalog_events
+
+# (entity type, entity id, product id, operation)
+Change = Tuple[CatalogEntityEnum, int, int, ChangeOperationEnum]
+
+# Session.info key of the events to publish once the transaction commits
+PENDING_EVENTS_KEY = "pending_catalog_events"
+
+CHANGE_COLUMNS = (
+    CatalogChange.version,
+    CatalogChange.entity_type,
+    CatalogChange.entity_id,
+    CatalogChange.product_id,
+    CatalogChange.operation
+)
+
+class CatalogChangeService:
+    @staticmethod
+    def _lock(db: Session) -> None:
+        """Serialize catalog writers until commit on Postgres
+
+        Versions come from a sequence, so two concurrent transactions could
+        otherwise commit them out of order and a reader at the higher one
+        would never see the lower one. SQLite already serializes writers.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE catalog_changes IN SHARE ROW EXCLUSIVE MODE"))
+
+    @staticmethod
+    def record(db: Session, changes: Iterable[Change]) -> None:
+        """Append changes to the log in the current transaction; committing is left to the caller"""
+        rows = [
+            {"entity_type": entity_type, "entity_id": entity_id, "product_id": product_id, "operation": operation}
+            for entity_type, entity_id, product_id, operation in changes
+        ]
+        if rows:
+            CatalogChangeService._lock(db)
+            result = db.execute(insert(CatalogChange).returning(*CHANGE_COLUMNS, sort_by_parameter_order=True), rows)
+            CatalogChangeService._queue_events(db, result)
+
+    @staticmethod
+    def record_stock(db: Session, option_ids: Iterable[int], in_stock: bool) -> None:
+        """Log a stock flag change of some options, looking up their products in the INSERT"""
+        option_ids = list(option_ids)
+        if not option_ids:
+            return
+        CatalogChangeService._lock(db)
+        result = db.execute(
+            insert(CatalogChange).from_select(
+                ["entity_type", "entity_id", "product_id", "operation"],
+                select(
+                    literal(CatalogEntityEnum.OPTION, CatalogChange.entity_type.type),
+                    Option.id,
+                    Component.product_id,
+                    literal(ChangeOperationEnum.STOCK, CatalogChange.operation.type)
+                )
+                .join(Component, Component.id == Option.component_id)
+                .where(Option.id.in_(option_ids))
+            ).returning(*CHANGE_COLUMNS)
+        )
+        CatalogChangeService._queue_events(db, result, in_stock=in_stock)
+
+    @staticmethod
+    def _queue_events(db: Session, rows, **extra: Any) -> None:
+        """Keep the events of logged changes until the transaction commits"""
+        events = db.info.setdefault(PENDING_EVENTS_KEY, [])
+        for row in rows:
+            events.append({
+                "version": row.version,
+                "entity_type": row.entity_type.value,
+                "entity_id": row.entity_id,
+                "product_id": row.product_id,
+                "operation": row.operation.value,
+                **extra
+            })
+
+    @staticmethod
+    def get_version(db: Session) -> int:
+        """Get the latest change version, 0 before the first change"""
+        return db.scalar(select(func.coalesce(func.max(CatalogChange.version), 0)))
+
+    @staticmethod
+    def get_changes(db: Session, since: int, limit: int = 1000) -> List[CatalogChange]:
+        """Get up to ``limit`` changes after version ``since``, oldest first"""
+        return db.scalars(
+            select(CatalogChange)
+            .where(CatalogChange.version > since)
+            .order_by(CatalogChange.version)
+            .limit(limit)
+        ).all()
+
+
+@event.listens_for(Session, "after_commit")
+def publish_committed_changes(session: Session) -> None:
+    """Stream the changes of a committed transaction to catalog event subscribers"""
+    for data in session.info.pop(PENDING_EVENTS_KEY, ()):
+        catalog_events.publish("catalog", data, event_id=data["version"])
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_changes(session: Session) -> None:
+    session.info.pop(PENDING_EVENTS_KEY, None)
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.idempotency_key import IdempotencyKey
+
+class IdempotencyService:
+    @staticmethod
+    def get(db: Session, client: str, route: str, key: str) -> Optional[IdempotencyKey]:
+        """Get the stored request for a key, through the unique (client, route, key) index"""
+        return db.execute(
+            select(IdempotencyKey).where(
+                IdempotencyKey.client == client, IdempotencyKey.route == route, IdempotencyKey.key == key
+            )
+        ).scalar_one_or_none()
+
+    @staticmethod
+    def start(db: Session, client: str, route: str, key: str, request_hash: str, ttl: timedelta) -> Optional[IdempotencyKey]:
+        """Claim a key before running its request; None if another request claimed it first"""
+        now = datetime.utcnow()
+        record = IdempotencyKey(
+            client=client, route=route, key=key, request_hash=request_hash, created_at=now, expires_at=now + ttl
+        )
+        db.add(record)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+        return record
+
+    @staticmethod
+    def complete(
+        db: Session,
+        record: IdempotencyKey,
+        status_code: int,
+        content_type: Optional[str],
+        headers: List[List[str]],
+        body: bytes
+    ) -> None:
+        """Store the response of a claimed key"""
+        record.status_code = status_code
+        record.content_type = content_type
+        record.response_headers = headers
+        record.response_body = body
+        db.commit()
+
+    @staticmethod
+    def release(db: Session, record: IdempotencyKey) -> None:
+        """Forget a claimed key, so that the request can be retried
+
+        Deleting by id is a no-op when a concurrent retry released it first.
+        """
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record.id))
+        db.commit()
+
+    @staticmethod
+    def delete_expired(db: Session, now: Optional[datetime] = None) -> int:
+        """Delete the keys past their expiry through the expires_at index"""
+        result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or datetime.utcnow())))
+        db.commit()
+        return result.rowcount
@@ -1,9 +1,15 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, update, case, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from app.models import Inventory, Option, StockStatusEnum
+from app.models import Inventory, Option, Component, Product, StockStatusEnum
 from app.schemas import InventoryCreate, InventoryUpdate
+from app.services.price_range_service import PriceRangeService
+from app.services.catalog_change_service import CatalogChangeService
+from app.services.outbox_service import OutboxService
+from app.cache import invalidate_option_products
 
 class InventoryService:
     @staticmethod
@@ -17,84 +23,208 @@ class InventoryService:
         return db.query(Inventory).filter(Inventory.option_id == option_id).first()
     
     @staticmethod
-    def create_inventory(db: Session, inventory: InventoryCreate) -> Inventory:
-        """Create a new inventory record"""
-        # Set the stock status based on quantity
-        stock_status = StockStatusEnum.OUT_OF_STOCK
-        if inventory.quantity > 0:
-            if inventory.quantity <= inventory.low_stock_threshold:
-                stock_status = StockStatusEnum.LIMITED_STOCK
+    def get_inventory_listing(
+        db: Session,
+        product_id: Optional[int] = None,
+        component_id: Optional[int] = None,
+        category: Optional[str] = None,
+        stock_status: Optional[StockStatusEnum] = None,
+        name_prefix: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Dict[str, Any]] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Get inventory rows with their option, component and product names
+
+        Inventory, options, components and products are joined in one query.
+        ``sort`` is ``id``, ``quantity`` or ``-quantity``, and ``after`` is the
+        sort key of the last row of the previous page (``id`` and, when
+        sorting by quantity, ``quantity``).
+        """
+        query = (
+            select(
+                Inventory.id,
+                Inventory.option_id,
+                Option.name.label("option_name"),
+                Component.id.label("component_id"),
+                Component.name.label("component_name"),
+                Product.id.label("product_id"),
+                Product.name.label("product_name"),
+                Product.category.label("product_category"),
+                Inventory.quantity,
+                Inventory.low_stock_threshold,
+                Inventory.stock_status
+            )
+            .join(Option, Option.id == Inventory.option_id)
+            .join(Component, Component.id == Option.component_id)
+            .join(Product, Product.id == Component.product_id)
+        )
+        if product_id is not None:
+            query = query.where(Component.product_id == product_id)
+        if component_id is not None:
+            query = query.where(Option.component_id == component_id)
+        if category:
+            query = query.where(Product.category == category)
+        if stock_status is not None:
+            query = query.where(Inventory.stock_status == stock_status)
+        if name_prefix:
+            query = query.where(Option.name.istartswith(name_prefix, autoescape=True))
+
+        if sort == "id":
+            if after is not None:
+                query = query.where(Inventory.id > after["id"])
+            query = query.order_by(Inventory.id)
+        else:
+            key = tuple_(Inventory.quantity, Inventory.id)
+            if after is not None:
+                position = (after["quantity"], after["id"])
+                query = query.where(key < position if sort == "-quantity" else key > position)
+            if sort == "-quantity":
+                query = query.order_by(Inventory.quantity.desc(), Inventory.id.desc())
             else:
-                stock_status = StockStatusEnum.IN_STOCK
-                
-        db_inventory = Inventory(
+                query = query.order_by(Inventory.quantity, Inventory.id)
+
+        rows = db.execute(query.limit(limit)).all()
+        return [dict(row._mapping) for row in rows]
+
+    @staticmethod
+    def compute_stock_status(quantity: int, low_stock_threshold: int) -> StockStatusEnum:
+        """Derive the stock status from a quantity and its low stock threshold"""
+        if quantity <= 0:
+            return StockStatusEnum.OUT_OF_STOCK
+        if quantity <= low_stock_threshold:
+            return StockStatusEnum.LIMITED_STOCK
+        return StockStatusEnum.IN_STOCK
+
+    @staticmethod
+    def _insert(db: Session):
+        """Get the dialect specific INSERT construct supporting ON CONFLICT"""
+        if db.get_bind().dialect.name == "sqlite":
+            return sqlite_insert(Inventory)
+        return postgresql_insert(Inventory)
+
+    @staticmethod
+    def _record_event(db: Session, db_inventory: Inventory) -> None:
+        """Add the ``inventory.updated`` event of a written record to the outbox"""
+        OutboxService.record(db, "inventory.updated", "inventory", db_inventory.option_id, {
+            "option_id": db_inventory.option_id,
+            "quantity": db_inventory.quantity,
+            "low_stock_threshold": db_inventory.low_stock_threshold,
+            "stock_status": db_inventory.stock_status.value
+        })
+
+    @staticmethod
+    def _sync_option(db: Session, db_inventory: Inventory) -> None:
+        """Mirror the inventory quantity and status onto its option
+
+        When the option goes in or out of stock, the price range of its
+        product is recomputed and the flip is logged in the same transaction. The common case of a
+        quantity change that keeps the stock flag is a single UPDATE.
+        """
+        in_stock = db_inventory.stock_status != StockStatusEnum.OUT_OF_STOCK
+        values = {"in_stock": in_stock, "stock_quantity": db_inventory.quantity}
+        result = db.execute(
+            update(Option)
+            .where(Option.id == db_inventory.option_id, Option.in_stock == in_stock)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            return
+
+        db.execute(
+            update(Option)
+            .where(Option.id == db_inventory.option_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        PriceRangeService.refresh_for_options(db, [db_inventory.option_id])
+        CatalogChangeService.record_stock(db, [db_inventory.option_id], in_stock)
+
+    @staticmethod
+    def create_inventory(db: Session, inventory: InventoryCreate) -> Inventory:
+        """Create or replace the inventory record of an option in a single upsert"""
+        stock_status = InventoryService.compute_stock_status(inventory.quantity, inventory.low_stock_threshold)
+
+        stmt = InventoryService._insert(db).values(
             option_id=inventory.option_id,
             quantity=inventory.quantity,
             low_stock_threshold=inventory.low_stock_threshold,
             stock_status=stock_status
         )
-        
-        db.add(db_inventory)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Inventory.option_id],
+            set_={
+                "quantity": stmt.excluded.quantity,
+                "low_stock_threshold": stmt.excluded.low_stock_threshold,
+                "stock_status": stmt.excluded.stock_status
+            }
+        ).returning(Inventory)
+
+        db_inventory = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
+        # Update the in_stock status of the option in the same transaction
+        InventoryService._sync_option(db, db_inventory)
+        InventoryService._record_event(db, db_inventory)
         db.commit()
-        db.refresh(db_inventory)
-        
-        # Update the in_stock status of the option
-        option = db.query(Option).filter(Option.id == inventory.option_id).first()
-        if option:
-            option.in_stock = (stock_status != StockStatusEnum.OUT_OF_STOCK)
-            option.stock_quantity = inventory.quantity
-            db.commit()
-            
+        invalidate_option_products([db_inventory.option_id])
+
         return db_inventory
-    
+
     @staticmethod
     def update_inventory(db: Session, option_id: int, inventory_data: Dict[str, Any]) -> Optional[Inventory]:
         """Update an inventory record"""
-        db_inventory = InventoryService.get_inventory_by_option(db, option_id)
-        
+        values = dict(inventory_data)
+
+        # Recalculate stock status if quantity changed
+        if values.get("quantity") is not None:
+            quantity = values["quantity"]
+            threshold = values.get("low_stock_threshold")
+            if threshold is not None or quantity <= 0:
+                values["stock_status"] = InventoryService.compute_stock_status(quantity, threshold or 0)
+            else:
+                # Threshold is unchanged, so compare against the stored one
+                status_type = Inventory.stock_status.type
+                values["stock_status"] = case(
+                    (Inventory.low_stock_threshold >= quantity, literal(StockStatusEnum.LIMITED_STOCK, status_type)),
+                    else_=literal(StockStatusEnum.IN_STOCK, status_type)
+                )
+
+        stmt = (
+            update(Inventory)
+            .where(Inventory.option_id == option_id)
+            .values(**values)
+            .returning(Inventory)
+        )
+        db_inventory = db.scalars(stmt, execution_options={"populate_existing": True}).one_or_none()
+
         if db_inventory:
-            # Apply all updates
-            for key, value in inventory_data.items():
-                setattr(db_inventory, key, value)
-            
-            # Recalculate stock status if quantity changed
-            if 'quantity' in inventory_data:
-                quantity = inventory_data['quantity']
-                threshold = db_inventory.low_stock_threshold
-                
-                if quantity <= 0:
-                    db_inventory.stock_status = StockStatusEnum.OUT_OF_STOCK
-                elif quantity <= threshold:
-                    db_inventory.stock_status = StockStatusEnum.LIMITED_STOCK
-                else:
-                    db_inventory.stock_status = StockStatusEnum.IN_STOCK
-            
+            # Update the option's in_stock status in the same transaction
+            InventoryService._sync_option(db, db_inventory)
+            InventoryService._record_event(db, db_inventory)
             db.commit()
-            db.refresh(db_inventory)
-            
-            # Update the option's in_stock status
-            option = db.query(Option).filter(Option.id == option_id).first()
-            if option:
-                option.in_stock = (db_inventory.stock_status != StockStatusEnum.OUT_OF_STOCK)
-                option.stock_quantity = db_inventory.quantity
-                db.commit()
-                
+            invalidate_option_products([option_id])
+
         return db_inventory
     
     @staticmethod
     def delete_inventory(db: Session, option_id: int) -> bool:
-        """Delete an inventory record"""
+        """Delete an inventory record, setting its option out of stock in the same transaction"""
         db_inventory = InventoryService.get_inventory_by_option(db, option_id)
         if db_inventory:
             db.delete(db_inventory)
-            db.commit()
-            
-            # Set option to out of stock
             option = db.query(Option).filter(Option.id == option_id).first()
             if option:
+                was_in_stock = option.in_stock
                 option.in_stock = False
                 option.stock_quantity = 0
-                db.commit()
+                if was_in_stock:
+                    db.flush()
+                    PriceRangeService.refresh_for_options(db, [option_id])
+                    CatalogChangeService.record_stock(db, [option_id], False)
+            OutboxService.record(db, "inventory.deleted", "inventory", option_id, {"option_id": option_id})
+            db.commit()
+            invalidate_option_products([option_id])
                 
             return True
         return False
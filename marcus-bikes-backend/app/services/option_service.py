@@ -2,6 +2,9 @@ from sqlalchemy.orm import Session
 from typing import Optional, List
 
 from app.models.option import Option
+from app.services.price_range_service import PriceRangeService
+from app.services.catalog_change_service import CatalogChangeService
+from app.cache import invalidate_option_products
 
 class OptionService:
     @staticmethod
@@ -19,7 +22,11 @@ class OptionService:
         """Update the stock status of an option"""
         db_option = OptionService.get_option(db, option_id=option_id)
         if db_option:
-            db_option.in_stock = in_stock
+            if db_option.in_stock != in_stock:
+                db_option.in_stock = in_stock
+                PriceRangeService.refresh_for_options(db, [option_id])
+                CatalogChangeService.record_stock(db, [option_id], in_stock)
             db.commit()
+            invalidate_option_products([option_id])
             db.refresh(db_option)
         return db_option 
\ No newline at end of file
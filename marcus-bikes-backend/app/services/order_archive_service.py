@@ -0,0 +1,86 @@
+import gzip
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import orjson
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Order, ArchivedOrder, OrderStatusEnum
+
+# Orders in these statuses no longer change, so they can be archived
+ARCHIVED_STATUSES = (OrderStatusEnum.COMPLETED, OrderStatusEnum.CANCELED)
+
+# Why an archived order cannot be changed
+ARCHIVED_ORDER_REASON = "Order is archived and read-only"
+
+ORDER_COLUMNS = [column.name for column in Order.__table__.columns]
+
+def compress_order(order: Order) -> bytes:
+    return gzip.compress(orjson.dumps({name: getattr(order, name) for name in ORDER_COLUMNS}))
+
+def decompress_order(data: bytes) -> Order:
+    """Rebuild an archived order, detached from any session"""
+    values: Dict[str, Any] = orjson.loads(gzip.decompress(data))
+    for name in ("created_at", "updated_at"):
+        if values.get(name):
+            values[name] = datetime.fromisoformat(values[name])
+    values["status"] = OrderStatusEnum(values["status"])
+    return Order(**{name: value for name, value in values.items() if name in ORDER_COLUMNS})
+
+class OrderArchiveService:
+    @staticmethod
+    def archive_orders(db: Session, before: datetime, batch_size: int = 1000) -> int:
+        """Move the completed and canceled orders created before a date to the archive
+
+        Each batch is copied and deleted in its own transaction. The
+        ``created_at`` bound keeps the scan to the old partitions on Postgres.
+        Returns the number of orders archived.
+        """
+        archived = 0
+        while True:
+            orders = db.scalars(
+                select(Order)
+                .where(Order.created_at < before, Order.status.in_(ARCHIVED_STATUSES))
+                .order_by(Order.created_at, Order.id)
+                .limit(batch_size)
+            ).all()
+            if not orders:
+                return archived
+            now = datetime.utcnow()
+            db.execute(insert(ArchivedOrder), [
+                {
+                    "id": order.id,
+                    "status": order.status.value,
+                    "created_at": order.created_at,
+                    "archived_at": now,
+                    "data": compress_order(order)
+                }
+                for order in orders
+            ])
+            db.execute(
+                delete(Order)
+                .where(Order.id.in_([order.id for order in orders]), Order.created_at < before)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            archived += len(orders)
+
+    @staticmethod
+    def get_archived_order(db: Session, order_id: int) -> Optional[Order]:
+        """Get an archived order, as a detached ``Order``"""
+        data = db.scalar(select(ArchivedOrder.data).where(ArchivedOrder.id == order_id))
+        if data is None:
+            return None
+        return decompress_order(data)
+
+    @staticmethod
+    def is_archived(db: Session, order_id: int) -> bool:
+        """Whether an order was moved to the archive"""
+        return db.scalar(select(ArchivedOrder.id).where(ArchivedOrder.id == order_id)) is not None
+
+    @staticmethod
+    def get_archived_statuses(db: Session, order_ids: List[int]) -> Dict[int, OrderStatusEnum]:
+        """Get the status of the orders among ``order_ids`` that were moved to the archive, by ID"""
+        rows = db.execute(select(ArchivedOrder.id, ArchivedOrder.status).where(ArchivedOrder.id.in_(order_ids)))
+        return {order_id: OrderStatusEnum(status) for order_id, status in rows}
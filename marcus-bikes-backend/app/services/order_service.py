@@ -1,9 +1,36 @@
-from typing import List, Optional, Dict, Any
+from collections import Counter
+from typing import List, Optional, Dict, Any, Set, Tuple, Union
 from datetime import datetime
+from enum import Enum
+from sqlalchemy import Integer, any_, bindparam, false, insert, or_, select, text, type_coerce, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import Session
 
-from app.models import Order
+from app.models import Order, OrderStatusEnum, Component, Option
 from app.schemas import OrderCreate, OrderUpdate, OrderFilter
+from app.services.order_archive_service import OrderArchiveService, ARCHIVED_ORDER_REASON
+from app.services.outbox_service import OutboxService
+
+# The statuses an order may move to from each status
+STATUS_TRANSITIONS = {
+    OrderStatusEnum.PENDING: {OrderStatusEnum.PROCESSING, OrderStatusEnum.CANCELED},
+    OrderStatusEnum.PROCESSING: {OrderStatusEnum.SHIPPED, OrderStatusEnum.CANCELED},
+    OrderStatusEnum.SHIPPED: {OrderStatusEnum.COMPLETED},
+    OrderStatusEnum.COMPLETED: set(),
+    OrderStatusEnum.CANCELED: set(),
+}
+
+def order_event_payload(order_id: int, values: Dict[str, Any]) -> Dict[str, Any]:
+    """The payload of ``order.created`` events, from an order's column values"""
+    status = values.get("status") or OrderStatusEnum.PENDING
+    return {
+        "order_id": order_id,
+        "status": status.value,
+        "customer_email": values["customer_email"],
+        "total_amount": values["total_amount"],
+        "product_categories": values.get("product_categories"),
+        "order_details": values["order_details"]
+    }
 
 class OrderService:
     @staticmethod
@@ -16,40 +43,213 @@ class OrderService:
         """Get a specific order by ID"""
         return db.query(Order).filter(Order.id == order_id).first()
     
+    @staticmethod
+    def get_top_product_ids(db: Session, since: datetime, limit: int) -> List[int]:
+        """Get the IDs of the products ordered most (by quantity) since a date"""
+        quantities = Counter()
+        rows = db.query(Order.order_details).filter(Order.created_at >= since).yield_per(1000)
+        for (details,) in rows:
+            for item in (details or {}).get("products", []):
+                try:
+                    quantities[int(item["id"])] += int(item.get("quantity", 1))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return [product_id for product_id, _ in quantities.most_common(limit)]
+    
     @staticmethod
     def create_order(db: Session, order: OrderCreate) -> Order:
         """Create a new order"""
-        db_order = Order(**order.dict())
+        values = order.dict()
+        db_order = Order(**values)
         db.add(db_order)
+        db.flush()
+        OutboxService.record(db, "order.created", "order", db_order.id, order_event_payload(db_order.id, values))
         db.commit()
         db.refresh(db_order)
         return db_order
     
+    @staticmethod
+    def insert_orders(db: Session, rows: List[Dict[str, Any]]) -> Tuple[Dict[str, int], Set[str]]:
+        """Insert queued orders (column values with their ``reference``) in one multi-row INSERT
+
+        References already written are skipped, so a batch replayed after a
+        crash is not written twice. Their ``order.created`` events are added
+        to the outbox. Returns the new order IDs by reference and the
+        references that were already written; committing is left to the caller.
+        """
+        references = [row["reference"] for row in rows]
+        existing = set(db.scalars(select(Order.reference).where(Order.reference.in_(references))))
+        rows = [row for row in rows if row["reference"] not in existing]
+        if not rows:
+            return {}, existing
+        result = db.execute(insert(Order).returning(Order.reference, Order.id, sort_by_parameter_order=True), rows)
+        order_ids = {reference: order_id for reference, order_id in result}
+        OutboxService.record_many(db, [
+            ("order.created", "order", order_ids[row["reference"]], order_event_payload(order_ids[row["reference"]], row))
+            for row in rows
+        ])
+        return order_ids, existing
+
+    @staticmethod
+    def get_order_id_by_reference(db: Session, reference: str) -> Optional[int]:
+        """Get the ID of the order written for an ingestion reference"""
+        return db.scalar(select(Order.id).where(Order.reference == reference))
+    
     @staticmethod
     def update_order(db: Session, order_id: int, order_data: Dict[str, Any]) -> Optional[Order]:
         """Update an order's information"""
         db_order = OrderService.get_order(db, order_id)
         if db_order:
+            previous_status = db_order.status
             for key, value in order_data.items():
                 setattr(db_order, key, value)
             db_order.updated_at = datetime.utcnow()
+            changes = {key: value.value if isinstance(value, Enum) else value for key, value in order_data.items()}
+            OutboxService.record(db, "order.updated", "order", order_id, {
+                "order_id": order_id,
+                "status": db_order.status.value,
+                "previous_status": previous_status.value,
+                "changes": changes
+            })
             db.commit()
             db.refresh(db_order)
         return db_order
     
+    @staticmethod
+    def _id_in(db: Session, order_ids: List[int]):
+        """``id = ANY(:ids)`` on Postgres, one array parameter whatever the number of IDs; ``IN`` elsewhere"""
+        if db.get_bind().dialect.name == "postgresql":
+            return Order.id == any_(bindparam("order_ids", order_ids, type_=ARRAY(Integer)))
+        return Order.id.in_(order_ids)
+
+    @staticmethod
+    def bulk_update_status(
+        db: Session,
+        order_ids: List[int],
+        status: OrderStatusEnum,
+        from_status: Optional[OrderStatusEnum] = None
+    ) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """Move orders to a status in one UPDATE ... RETURNING
+
+        Only orders whose current status may move to ``status`` (and is
+        ``from_status`` when given) are updated. Returns the updated IDs and,
+        for the others, the reason they were left alone; the orders that
+        failed are only read back when there are some. One
+        ``order.status_changed`` event of the ``order_batch`` aggregate covers
+        the whole batch, with the updated ``order_ids`` in its payload.
+        Archived orders are reported as read-only, like single updates.
+        """
+        status = OrderStatusEnum(status)
+        sources = [source for source, targets in STATUS_TRANSITIONS.items() if status in targets]
+        if from_status is not None:
+            sources = [source for source in sources if source == OrderStatusEnum(from_status)]
+
+        updated: List[int] = []
+        if sources:
+            result = db.execute(
+                update(Order)
+                .where(OrderService._id_in(db, order_ids), Order.status.in_(sources))
+                .values(status=status, updated_at=datetime.utcnow())
+                .returning(Order.id)
+                .execution_options(synchronize_session=False)
+            )
+            updated = sorted(result.scalars())
+
+        failed: List[Dict[str, Any]] = []
+        updated_ids = set(updated)
+        remaining = [order_id for order_id in order_ids if order_id not in updated_ids]
+        if remaining:
+            current = dict(db.execute(select(Order.id, Order.status).where(OrderService._id_in(db, remaining))).all())
+            missing = [order_id for order_id in remaining if order_id not in current]
+            archived = OrderArchiveService.get_archived_statuses(db, missing) if missing else {}
+            for order_id in remaining:
+                current_status = current.get(order_id)
+                if order_id in archived:
+                    current_status = archived[order_id]
+                    reason = ARCHIVED_ORDER_REASON
+                elif current_status is None:
+                    reason = "Order not found"
+                elif from_status is not None and current_status != from_status:
+                    reason = f"Order is {current_status.value}, not {OrderStatusEnum(from_status).value}"
+                else:
+                    reason = f"Cannot move an order from {current_status.value} to {status.value}"
+                failed.append({"order_id": order_id, "current_status": current_status, "reason": reason})
+
+        if updated:
+            # A batch has no ID of its own: it is keyed on its first order
+            OutboxService.record(db, "order.status_changed", "order_batch", updated[0], {
+                "order_ids": updated,
+                "status": status.value
+            })
+        db.commit()
+        return updated, failed
+
     @staticmethod
     def delete_order(db: Session, order_id: int) -> bool:
         """Delete an order"""
         db_order = OrderService.get_order(db, order_id)
         if db_order:
             db.delete(db_order)
+            OutboxService.record(db, "order.deleted", "order", order_id, {"order_id": order_id})
             db.commit()
             return True
         return False
     
+    @staticmethod
+    def _product_id_values(product_id: Union[int, str]) -> List[Union[int, str]]:
+        """The values an item ``id`` may hold for a product: a slug ("custom-bike"), or a catalog ID as a number or a string"""
+        text_id = str(product_id)
+        return [int(text_id), text_id] if text_id.isdigit() else [text_id]
+
+    @staticmethod
+    def _contains_item(db: Session, product_id: Optional[Union[int, str]], option_id: Optional[int]):
+        """Orders with one item of ``product_id`` and/or with ``option_id`` chosen
+
+        Items store their choices in ``configuration``, as component name to
+        option name, so the option is looked up and matched by its
+        component's name and its own; options named alike in several products
+        match together unless ``product_id`` narrows the item. On Postgres
+        this is a JSONB containment (``@>``) served by the GIN index.
+        Elsewhere the items are read with ``json_each``.
+        """
+        choice = None
+        if option_id is not None:
+            choice = db.execute(
+                select(Component.name, Option.name)
+                .join(Component, Option.component_id == Component.id)
+                .where(Option.id == option_id)
+            ).first()
+            if choice is None:
+                return false()
+        product_ids = OrderService._product_id_values(product_id) if product_id is not None else []
+
+        if db.get_bind().dialect.name == "postgresql":
+            item: Dict[str, Any] = {}
+            if choice is not None:
+                item["configuration"] = {choice[0]: choice[1]}
+            items = [{**item, "id": value} for value in product_ids] or [item]
+            details = type_coerce(Order.order_details, JSONB)
+            return or_(*(details.contains({"products": [item]}) for item in items))
+
+        conditions = []
+        params = []
+        if product_ids:
+            conditions.append("json_extract(item.value, '$.id') IN :product_ids")
+            params.append(bindparam("product_ids", product_ids, expanding=True))
+        if choice is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM json_each(item.value, '$.configuration') AS chosen "
+                "WHERE chosen.key = :component_name AND chosen.value = :option_name)"
+            )
+            params += [bindparam("component_name", choice[0]), bindparam("option_name", choice[1])]
+        return text(
+            "EXISTS (SELECT 1 FROM json_each(orders.order_details, '$.products') AS item WHERE "
+            + " AND ".join(conditions) + ")"
+        ).bindparams(*params)
+
     @staticmethod
     def filter_orders(db: Session, filters: OrderFilter, skip: int = 0, limit: int = 100) -> List[Order]:
-        """Filter orders by date range, status, and product category"""
+        """Filter orders by date range, status, product category, product and option"""
         query = db.query(Order)
         
         if filters.start_date:
@@ -64,5 +264,8 @@ class OrderService:
         if filters.product_category:
             # Use LIKE query for the comma-separated product_categories field
             query = query.filter(Order.product_categories.like(f"%{filters.product_category}%"))
+
+        if filters.product_id is not None or filters.option_id is not None:
+            query = query.filter(OrderService._contains_item(db, filters.product_id, filters.option_id))
         
         return query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all() 
\ No newline at end of file
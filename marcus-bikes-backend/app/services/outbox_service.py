@@ -0,0 +1,134 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, func, insert, select, update, event
+from sqlalchemy.orm import Session
+
+from app.models.outbox_event import OutboxEvent
+
+# (event type, aggregate type, aggregate id, payload)
+DomainEvent = Tuple[str, str, int, Dict[str, Any]]
+
+# Session.info key set when the transaction wrote outbox events
+PENDING_OUTBOX_KEY = "pending_outbox_events"
+
+class OutboxService:
+    @staticmethod
+    def record(db: Session, event_type: str, aggregate_type: str, aggregate_id: int, payload: Dict[str, Any]) -> None:
+        """Add an event to the outbox in the current transaction; committing is left to the caller"""
+        OutboxService.record_many(db, [(event_type, aggregate_type, aggregate_id, payload)])
+
+    @staticmethod
+    def record_many(db: Session, events: Iterable[DomainEvent]) -> None:
+        """Add (event type, aggregate type, aggregate id, payload) events in one multi-row INSERT
+
+        Nothing is recorded without a relay (``OUTBOX_SINKS`` unset), since
+        nothing would ever dispatch or delete the events.
+        """
+        from app import outbox
+
+        if outbox.outbox_relay is None:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "event_type": event_type,
+                "aggregate_type": aggregate_type,
+                "aggregate_id": aggregate_id,
+                "payload": payload,
+                "created_at": now,
+                "attempts": 0
+            }
+            for event_type, aggregate_type, aggregate_id, payload in events
+        ]
+        if not rows:
+            return
+        db.execute(insert(OutboxEvent), rows)
+        db.info[PENDING_OUTBOX_KEY] = True
+
+    @staticmethod
+    def claim_pending(db: Session, limit: int = 100) -> List[OutboxEvent]:
+        """Get the oldest events neither dispatched nor parked, through the partial pending index
+
+        On Postgres the rows stay locked until the caller commits and rows
+        locked by another relay are skipped, so that relays in several
+        workers never send the same batch concurrently.
+        """
+        query = (
+            select(OutboxEvent)
+            .where(OutboxEvent.dispatched_at.is_(None), OutboxEvent.failed_at.is_(None))
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        return db.scalars(query).all()
+
+    @staticmethod
+    def mark_dispatched(db: Session, event_ids: List[int]) -> None:
+        """Mark events as delivered to every sink"""
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(event_ids))
+            .values(dispatched_at=datetime.utcnow(), attempts=OutboxEvent.attempts + 1, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    @staticmethod
+    def mark_failed(db: Session, event_ids: List[int], error: str) -> None:
+        """Count a failed delivery attempt of events left pending"""
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(event_ids))
+            .values(attempts=OutboxEvent.attempts + 1, last_error=error[:1000])
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    @staticmethod
+    def mark_parked(db: Session, event_ids: List[int], error: str) -> None:
+        """Stop retrying events after their last failed attempt; they stay in the table until requeued"""
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(event_ids))
+            .values(failed_at=datetime.utcnow(), attempts=OutboxEvent.attempts + 1, last_error=error[:1000])
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    @staticmethod
+    def count_pending(db: Session) -> int:
+        """Count the events neither dispatched nor parked"""
+        return db.scalar(
+            select(func.count())
+            .select_from(OutboxEvent)
+            .where(OutboxEvent.dispatched_at.is_(None), OutboxEvent.failed_at.is_(None))
+        )
+
+    @staticmethod
+    def count_parked(db: Session) -> int:
+        """Count the events given up after too many failed attempts"""
+        return db.scalar(select(func.count()).select_from(OutboxEvent).where(OutboxEvent.failed_at.isnot(None)))
+
+    @staticmethod
+    def delete_dispatched(db: Session, before: datetime) -> int:
+        """Delete the events dispatched before a date"""
+        result = db.execute(delete(OutboxEvent).where(OutboxEvent.dispatched_at < before))
+        db.commit()
+        return result.rowcount
+
+
+@event.listens_for(Session, "after_commit")
+def wake_outbox_relay(session: Session) -> None:
+    """Let the relay dispatch the events of a committed transaction without waiting for its next poll"""
+    if session.info.pop(PENDING_OUTBOX_KEY, False):
+        from app import outbox
+
+        if outbox.outbox_relay is not None:
+            outbox.outbox_relay.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_events(session: Session) -> None:
+    session.info.pop(PENDING_OUTBOX_KEY, None)
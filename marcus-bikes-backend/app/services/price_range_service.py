@@ -0,0 +1,154 @@
+import itertools
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.models.component import Component
+from app.models.option import Option
+from app.models.price_rule import PriceRule
+
+# Most configurations of the components coupled by price rules that are
+# enumerated to get an exact range; above it the range is bounded per option
+MAX_ENUMERATED_CONFIGURATIONS = 4096
+
+# Products refreshed per batch by refresh_all
+REFRESH_BATCH_SIZE = 1000
+
+class PriceRangeService:
+    @staticmethod
+    def compute_price_range(
+        base_price: float,
+        components: Dict[int, Sequence[Tuple[int, float]]],
+        rules: Sequence[Tuple[int, int, float]]
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """Get the cheapest and most expensive price of a product configuration
+
+        ``components`` maps each component to its in-stock ``(option id, price)``
+        and ``rules`` are ``(option id, dependent option id, price)`` overrides:
+        the option costs ``price`` when the dependent option is also selected.
+        Components coupled by rules are enumerated together, the others only
+        add their cheapest and most expensive option. Dependencies are not
+        taken into account, so the range may include forbidden configurations.
+        Returns ``(None, None)`` when a component has no option in stock.
+        """
+        if any(not options for options in components.values()):
+            return None, None
+
+        component_of = {option_id: component_id for component_id, options in components.items() for option_id, _ in options}
+        overrides: Dict[int, List[Tuple[int, float]]] = {}
+        coupled = set()
+        for option_id, dependent_option_id, price in rules:
+            if option_id in component_of and dependent_option_id in component_of:
+                overrides.setdefault(option_id, []).append((dependent_option_id, price))
+                coupled.update((component_of[option_id], component_of[dependent_option_id]))
+
+        low = high = base_price or 0.0
+        for component_id, options in components.items():
+            if component_id not in coupled:
+                prices = [price for _, price in options]
+                low += min(prices)
+                high += max(prices)
+
+        coupled_options = [components[component_id] for component_id in sorted(coupled)]
+        configurations = 1
+        for options in coupled_options:
+            configurations *= len(options)
+
+        if coupled_options and configurations <= MAX_ENUMERATED_CONFIGURATIONS:
+            totals = []
+            for configuration in itertools.product(*coupled_options):
+                selected = {option_id for option_id, _ in configuration}
+                total = 0.0
+                for option_id, price in configuration:
+                    for dependent_option_id, override in overrides.get(option_id, ()):
+                        if dependent_option_id in selected:
+                            price = override
+                            break
+                    total += price
+                totals.append(total)
+            low += min(totals)
+            high += max(totals)
+        else:
+            # Too many configurations: every option ranges over its own and override prices
+            for options in coupled_options:
+                prices = [
+                    [price] + [override for _, override in overrides.get(option_id, ())]
+                    for option_id, price in options
+                ]
+                low += min(min(option_prices) for option_prices in prices)
+                high += max(max(option_prices) for option_prices in prices)
+
+        return round(low, 2), round(high, 2)
+
+    @staticmethod
+    def refresh(db: Session, product_ids: Iterable[int]) -> None:
+        """Recompute the stored price range of some products in the current transaction
+
+        Loads the products, their options and price rules with three queries
+        and writes all ranges with one bulk UPDATE. Pending changes are flushed
+        first, and committing is left to the caller.
+        """
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return
+        db.flush()
+
+        base_prices = dict(db.execute(
+            select(Product.id, Product.base_price).where(Product.id.in_(product_ids))
+        ).all())
+        components: Dict[int, Dict[int, List[Tuple[int, float]]]] = {product_id: {} for product_id in base_prices}
+        rows = db.execute(
+            select(Component.product_id, Component.id, Option.id, Option.price, Option.in_stock)
+            .outerjoin(Option, Option.component_id == Component.id)
+            .where(Component.product_id.in_(product_ids))
+        )
+        for product_id, component_id, option_id, price, in_stock in rows:
+            options = components.setdefault(product_id, {}).setdefault(component_id, [])
+            if option_id is not None and in_stock:
+                options.append((option_id, price))
+        rules: Dict[int, List[Tuple[int, int, float]]] = {}
+        rows = db.execute(
+            select(PriceRule.product_id, PriceRule.option_id, PriceRule.dependent_option_id, PriceRule.price)
+            .where(PriceRule.product_id.in_(product_ids))
+        )
+        for product_id, option_id, dependent_option_id, price in rows:
+            rules.setdefault(product_id, []).append((option_id, dependent_option_id, price))
+
+        ranges = []
+        for product_id, base_price in base_prices.items():
+            min_price, max_price = PriceRangeService.compute_price_range(
+                base_price, components.get(product_id, {}), rules.get(product_id, [])
+            )
+            ranges.append({"id": product_id, "min_price": min_price, "max_price": max_price})
+        if ranges:
+            db.execute(update(Product), ranges)
+
+    @staticmethod
+    def refresh_for_options(db: Session, option_ids: Iterable[int]) -> None:
+        """Recompute the price range of the products owning some options"""
+        option_ids = list(option_ids)
+        if not option_ids:
+            return
+        product_ids = db.scalars(
+            select(Component.product_id)
+            .join(Option, Option.component_id == Component.id)
+            .where(Option.id.in_(option_ids))
+        ).all()
+        PriceRangeService.refresh(db, product_ids)
+
+    @staticmethod
+    def refresh_all(db: Session, batch_size: int = REFRESH_BATCH_SIZE) -> None:
+        """Recompute the price range of every product, e.g. after bulk loads"""
+        product_ids = db.scalars(select(Product.id).order_by(Product.id)).all()
+        for start in range(0, len(product_ids), batch_size):
+            PriceRangeService.refresh(db, product_ids[start:start + batch_size])
+
+
+if __name__ == "__main__":
+    from app.database.session import SessionLocal
+
+    with SessionLocal() as session:
+        PriceRangeService.refresh_all(session)
+        session.commit()
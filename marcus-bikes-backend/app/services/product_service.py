@@ -1,19 +1,40 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select, func, case, exists, and_, or_
+from typing import List, Optional, Dict, Any, Sequence
 
 from app.models.product import Product
 from app.models.component import Component
 from app.models.option import Option
 from app.models.dependency import Dependency
 from app.models.price_rule import PriceRule
-from app.schemas import (
-    ProductCreate, 
-    Product as ProductSchema,
-    FrontendProduct,
-    FrontendComponent,
-    FrontendOption,
-    FrontendDependency,
-    FrontendPriceRule
+from app.models.enums import CategoryEnum, CatalogEntityEnum, ChangeOperationEnum
+from app.services.price_range_service import PriceRangeService
+from app.services.catalog_change_service import CatalogChangeService
+from app.cache import catalog_cache, invalidate_products, CATEGORY_SUMMARIES_KEY
+from app.warmup import rewarm_products
+from app.schemas import ProductCreate, FrontendProduct
+
+# Fields of the product listing view, and those needing the per-component aggregate
+PRODUCT_SUMMARY_FIELDS = (
+    "name",
+    "category",
+    "base_price",
+    "min_price",
+    "max_price",
+    "component_count",
+    "option_count",
+    "in_stock_option_count"
+)
+PRODUCT_AGGREGATE_FIELDS = {"component_count", "option_count", "in_stock_option_count"}
+
+# Listing sort orders: by id, or by cheapest configuration (unconfigurable products last)
+PRODUCT_SORTS = ("id", "price", "-price")
+
+# Loader options fetching a whole product tree in one query per relationship
+PRODUCT_TREE_OPTIONS = (
+    selectinload(Product.components).selectinload(Component.options),
+    selectinload(Product.dependencies),
+    selectinload(Product.price_rules)
 )
 
 class ProductService:
@@ -23,28 +44,169 @@ class ProductService:
         return db.query(Product).filter(Product.id == product_id).first()
 
     @staticmethod
-    def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
+    def get_products_by_ids(db: Session, product_ids: Sequence[int]) -> List[Product]:
+        """Get products by ID with their components, options, dependencies and price rules
+
+        The whole trees of all products are loaded by a fixed number of
+        queries, whatever the number of products. Unknown IDs are skipped and
+        products come back in no particular order.
+        """
+        if not product_ids:
+            return []
+        query = select(Product).where(Product.id.in_(product_ids)).options(*PRODUCT_TREE_OPTIONS)
+        return list(db.scalars(query))
+
+    @staticmethod
+    def get_product_ids(db: Session) -> List[int]:
+        """Get the IDs of all products in order"""
+        return list(db.scalars(select(Product.id).order_by(Product.id)))
+
+    @staticmethod
+    def _price_order(sort: str) -> tuple:
+        """ORDER BY clauses of a listing sort order"""
+        if sort == "price":
+            return (Product.min_price.asc().nulls_last(), Product.id)
+        if sort == "-price":
+            return (Product.min_price.desc().nulls_last(), Product.id.desc())
+        return (Product.id,)
+
+    @staticmethod
+    def get_products(db: Session, skip: int = 0, limit: int = 100, sort: str = "id") -> List[Product]:
         """Get all products with pagination"""
-        return db.query(Product).offset(skip).limit(limit).all()
+        return db.query(Product).order_by(*ProductService._price_order(sort)).offset(skip).limit(limit).all()
 
     @staticmethod
-    def get_products_by_category(db: Session, category: str, skip: int = 0, limit: int = 100) -> List[Product]:
+    def count_products(db: Session, category: Optional[str] = None) -> int:
+        """Count the products, optionally in one category"""
+        query = select(func.count()).select_from(Product)
+        if category is not None:
+            query = query.where(Product.category == category)
+        return db.scalar(query)
+
+    @staticmethod
+    def get_products_by_category(db: Session, category: str, skip: int = 0, limit: int = 100, sort: str = "id") -> List[Product]:
         """Get products by category with pagination"""
-        return db.query(Product).filter(Product.category == category).offset(skip).limit(limit).all()
+        return (
+            db.query(Product)
+            .filter(Product.category == category)
+            .order_by(*ProductService._price_order(sort))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
 
     @staticmethod
-    def count_products_by_category(db: Session) -> Dict[str, int]:
-        """Count products for each category"""
-        from sqlalchemy import func
-        from app.models.enums import CategoryEnum
-        
-        # Get counts for all defined categories
-        counts = {}
+    def get_category_summaries(db: Session) -> List[Dict[str, Any]]:
+        """Count products and their price range and availability for each category
+
+        All categories are aggregated by one GROUP BY query, cached until the
+        next catalog or stock write. A product counts as in stock when every one
+        of its components has at least one option in stock.
+        """
+        return catalog_cache.get_or_set(CATEGORY_SUMMARIES_KEY, lambda: ProductService._load_category_summaries(db))
+
+    @staticmethod
+    def _load_category_summaries(db: Session) -> List[Dict[str, Any]]:
+        """Run the category aggregation behind get_category_summaries"""
+        component_out_of_stock = (
+            select(Component.id)
+            .where(Component.product_id == Product.id)
+            .where(~exists().where(Option.component_id == Component.id).where(Option.in_stock.is_(True)))
+        )
+        rows = db.execute(
+            select(
+                Product.category,
+                func.count(Product.id),
+                # The stored ranges of the products, options included, as sort=price listings use
+                func.min(Product.min_price),
+                func.max(Product.max_price),
+                func.sum(case((~exists(component_out_of_stock), 1), else_=0))
+            ).group_by(Product.category)
+        ).all()
+        by_category = {row[0]: row for row in rows}
+
+        # Categories without any product are reported with zero counts
+        summaries = []
         for category in CategoryEnum:
-            count = db.query(Product).filter(Product.category == category.value).count()
-            counts[category.value] = count
-        
-        return counts
+            row = by_category.get(category)
+            summaries.append({
+                "category": category.value,
+                "count": row[1] if row else 0,
+                "min_price": row[2] if row else None,
+                "max_price": row[3] if row else None,
+                "in_stock_count": (row[4] or 0) if row else 0
+            })
+        return summaries
+
+    @staticmethod
+    def get_product_summaries(
+        db: Session,
+        fields: Sequence[str] = PRODUCT_SUMMARY_FIELDS,
+        category: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Dict[str, Any]] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Get listing rows (ids and the requested summary fields) in ``sort`` order
+
+        The price range is read from the columns maintained by
+        PriceRangeService. Option counts are aggregated in the same query from
+        a per-component subquery, which is only joined when one of those
+        fields is requested. ``after`` is the sort key of the last row of the
+        previous page (``id`` and, when sorting by price, ``min_price``).
+        """
+        component_stats = (
+            select(
+                Component.product_id.label("product_id"),
+                func.count(Option.id).label("option_count"),
+                func.sum(case((Option.in_stock.is_(True), 1), else_=0)).label("in_stock_option_count")
+            )
+            .select_from(Component)
+            .outerjoin(Option, Option.component_id == Component.id)
+            .group_by(Component.id, Component.product_id)
+            .subquery()
+        )
+        columns = {
+            "name": Product.name,
+            "category": Product.category,
+            "base_price": Product.base_price,
+            "min_price": Product.min_price,
+            "max_price": Product.max_price,
+            "component_count": func.count(component_stats.c.product_id),
+            "option_count": func.coalesce(func.sum(component_stats.c.option_count), 0),
+            "in_stock_option_count": func.coalesce(func.sum(component_stats.c.in_stock_option_count), 0)
+        }
+
+        query = select(Product.id, *[columns[field].label(field) for field in fields])
+        if any(field in PRODUCT_AGGREGATE_FIELDS for field in fields):
+            query = (
+                query.outerjoin(component_stats, component_stats.c.product_id == Product.id)
+                .group_by(Product.id)
+            )
+        if category:
+            query = query.where(Product.category == category)
+        if after is not None:
+            query = query.where(ProductService._after_position(sort, after))
+
+        rows = db.execute(query.order_by(*ProductService._price_order(sort)).limit(limit)).all()
+        return [dict(row._mapping) for row in rows]
+
+    @staticmethod
+    def _after_position(sort: str, after: Dict[str, Any]):
+        """Keyset condition for the rows following ``after`` in ``sort`` order"""
+        if sort == "id":
+            return Product.id > after["id"]
+
+        # Products without a price range come last, ordered by id like the others
+        later_id = Product.id > after["id"] if sort == "price" else Product.id < after["id"]
+        if after["min_price"] is None:
+            return and_(Product.min_price.is_(None), later_id)
+        later_price = Product.min_price > after["min_price"] if sort == "price" else Product.min_price < after["min_price"]
+        return or_(
+            later_price,
+            and_(Product.min_price == after["min_price"], later_id),
+            Product.min_price.is_(None)
+        )
 
     @staticmethod
     def create_product(db: Session, product: ProductCreate) -> Product:
@@ -62,6 +224,7 @@ class ProductService:
         # Dictionary to store component and option objects for dependencies and price rules
         component_objects = {}
         option_objects = {}
+        price_rule_objects = []
         
         # Create components
         for component in product.components:
@@ -159,8 +322,22 @@ class ProductService:
                 product_id=db_product.id
             )
             db.add(db_price_rule)
+            price_rule_objects.append(db_price_rule)
         
+        PriceRangeService.refresh(db, [db_product.id])
+        CatalogChangeService.record(db, [
+            (entity_type, entity.id, db_product.id, ChangeOperationEnum.CREATED)
+            for entity_type, entities in [
+                (CatalogEntityEnum.PRODUCT, [db_product]),
+                (CatalogEntityEnum.COMPONENT, component_objects.values()),
+                (CatalogEntityEnum.OPTION, option_objects.values()),
+                (CatalogEntityEnum.PRICE_RULE, price_rule_objects)
+            ]
+            for entity in entities
+        ])
         db.commit()
+        invalidate_products(product.id)
+        rewarm_products(product.id)
         db.refresh(db_product)
         return db_product
 
@@ -171,7 +348,11 @@ class ProductService:
         if db_product:
             for key, value in product_data.items():
                 setattr(db_product, key, value)
+            PriceRangeService.refresh(db, [product_id])
+            CatalogChangeService.record(db, [(CatalogEntityEnum.PRODUCT, product_id, product_id, ChangeOperationEnum.UPDATED)])
             db.commit()
+            invalidate_products(product_id)
+            rewarm_products(product_id)
             db.refresh(db_product)
         return db_product
 
@@ -181,65 +362,71 @@ class ProductService:
         db_product = ProductService.get_product(db, product_id=product_id)
         if db_product:
             db.delete(db_product)
+            CatalogChangeService.record(db, [(CatalogEntityEnum.PRODUCT, product_id, product_id, ChangeOperationEnum.DELETED)])
             db.commit()
+            invalidate_products(product_id)
+            # Only the category counts are left to reload
+            rewarm_products()
             return True
         return False
 
     @staticmethod
     def product_to_frontend(product: Product) -> FrontendProduct:
-        """Convert a database product model to a frontend-compatible format"""
-        # Convert components
-        frontend_components = []
-        for component in product.components:
-            frontend_options = [
-                FrontendOption(
-                    id=option.id,
-                    name=option.name,
-                    price=option.price,
-                    inStock=option.in_stock
-                )
-                for option in component.options
-            ]
-            
-            frontend_component = FrontendComponent(
-                id=component.id,
-                name=component.name,
-                description=component.description or "",
-                options=frontend_options
-            )
-            frontend_components.append(frontend_component)
-        
-        # Convert dependencies using relationships
-        frontend_dependencies = []
-        for dependency in product.dependencies:
-            frontend_dependency = FrontendDependency(
-                type=dependency.type.value,
-                sourceComponentId=dependency.source_component_id,
-                sourceOptionId=dependency.source_option_id,
-                targetComponentId=dependency.target_component_id,
-                targetOptionId=dependency.target_option_id
-            )
-            frontend_dependencies.append(frontend_dependency)
-        
-        # Convert price rules using relationships
-        frontend_price_rules = []
-        for rule in product.price_rules:
-            frontend_price_rule = FrontendPriceRule(
-                componentId=rule.component_id,
-                optionId=rule.option_id,
-                dependentComponentId=rule.dependent_component_id,
-                dependentOptionId=rule.dependent_option_id,
-                price=rule.price
-            )
-            frontend_price_rules.append(frontend_price_rule)
-        
-        return FrontendProduct(
-            id=product.id,
-            name=product.name,
-            description=product.description or "",
-            category=product.category.value,
-            components=frontend_components,
-            dependencies=frontend_dependencies,
-            priceRules=frontend_price_rules,
-            basePrice=product.base_price
-        ) 
\ No newline at end of file
+        """Convert a database product model to a frontend-compatible format
+
+        Builds plain dicts and validates the whole tree in a single
+        ``model_validate`` call instead of one model per option, dependency
+        and price rule.
+        """
+        return FrontendProduct.model_validate(ProductService.product_to_frontend_dict(product))
+
+    @staticmethod
+    def product_to_frontend_dict(product: Product) -> Dict[str, Any]:
+        """Convert a database product model to a plain dict in the frontend format"""
+        return {
+            "id": product.id,
+            "name": product.name,
+            "description": product.description or "",
+            "category": product.category.value,
+            "components": [
+                {
+                    "id": component.id,
+                    "name": component.name,
+                    "description": component.description or "",
+                    "options": [
+                        {
+                            "id": option.id,
+                            "name": option.name,
+                            "price": option.price,
+                            "inStock": option.in_stock
+                        }
+                        for option in component.options
+                    ]
+                }
+                for component in product.components
+            ],
+            "dependencies": [
+                {
+                    "type": dependency.type.value,
+                    "sourceComponentId": dependency.source_component_id,
+                    "sourceOptionId": dependency.source_option_id,
+                    "targetComponentId": dependency.target_component_id,
+                    "targetOptionId": dependency.target_option_id
+                }
+                for dependency in product.dependencies
+            ],
+            "priceRules": [
+                {
+                    "type": "override",
+                    "componentId": rule.component_id,
+                    "optionId": rule.option_id,
+                    "dependentComponentId": rule.dependent_component_id,
+                    "dependentOptionId": rule.dependent_option_id,
+                    "price": rule.price
+                }
+                for rule in product.price_rules
+            ],
+            "basePrice": product.base_price,
+            "minPrice": product.min_price,
+            "maxPrice": product.max_price
+        }
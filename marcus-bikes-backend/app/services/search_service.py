@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import select, func, exists, union, literal_column
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.models.component import Component
+from app.models.option import Option
+from app.cache import local_cache, SEARCH_INDEX_KEY
+from app.search import ProductSearchIndex, tokenize
+
+class SearchService:
+    @staticmethod
+    def get_search_index(db: Session) -> ProductSearchIndex:
+        """Get the in-memory search index, building it after catalog writes"""
+        return local_cache.get_or_set(SEARCH_INDEX_KEY, lambda: ProductSearchIndex.build(db))
+
+    @staticmethod
+    def search(
+        db: Session,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        options: Sequence[str] = (),
+        skip: int = 0,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """Search products by name, category, price range and required option names
+
+        Every query word must be the start of a word of the product name or of
+        one of its component or option names. A product matches the price
+        filter when its stored price range (see PriceRangeService) overlaps the
+        requested one; products without an in-stock configuration never do.
+        Returns a page of listing rows ordered by id, the total number of
+        matches and facet counts per category (ignoring the category filter)
+        and per component option. Postgres answers with its full-text indexes,
+        other databases with the in-memory index.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            return SearchService._search_postgresql(db, query, category, min_price, max_price, options, skip, limit)
+        return SearchService.get_search_index(db).search(
+            query=query,
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            options=options,
+            skip=skip,
+            limit=limit
+        )
+
+    @staticmethod
+    def _name_matches(column, token: str):
+        """Full-text prefix match of one word, served by the ix_*_name_fts indexes"""
+        return func.to_tsvector(literal_column("'simple'"), column).op("@@")(
+            func.to_tsquery(literal_column("'simple'"), f"'{token}':*")
+        )
+
+    @staticmethod
+    def _search_postgresql(
+        db: Session,
+        query: Optional[str],
+        category: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        options: Sequence[str],
+        skip: int,
+        limit: int
+    ) -> Dict[str, Any]:
+        conditions = []
+        for token in tokenize(query):
+            conditions.append(Product.id.in_(union(
+                select(Product.id).where(SearchService._name_matches(Product.name, token)),
+                select(Component.product_id).where(SearchService._name_matches(Component.name, token)),
+                select(Component.product_id)
+                .join(Option, Option.component_id == Component.id)
+                .where(SearchService._name_matches(Option.name, token))
+            )))
+        for option_name in options:
+            conditions.append(exists(
+                select(Option.id)
+                .join(Component, Component.id == Option.component_id)
+                .where(Component.product_id == Product.id)
+                .where(func.lower(Option.name) == option_name.lower())
+            ))
+        if min_price is not None:
+            conditions.append(Product.max_price >= min_price)
+        if max_price is not None:
+            conditions.append(Product.min_price <= max_price)
+
+        def matching(*columns):
+            return select(*columns).select_from(Product).where(*conditions)
+
+        category_counts = db.execute(
+            matching(Product.category, func.count(Product.id)).group_by(Product.category)
+        ).all()
+        if category:
+            conditions.append(Product.category == category)
+
+        total = db.execute(matching(func.count(Product.id))).scalar()
+        rows = db.execute(
+            matching(
+                Product.id,
+                Product.name,
+                Product.category,
+                Product.base_price,
+                Product.min_price,
+                Product.max_price
+            )
+            .order_by(Product.id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+        option_counts = db.execute(
+            matching(Component.name, Option.name, func.count(func.distinct(Product.id)))
+            .join(Component, Component.product_id == Product.id)
+            .join(Option, Option.component_id == Component.id)
+            .group_by(Component.name, Option.name)
+            .order_by(Component.name, Option.name)
+        ).all()
+
+        option_facets: Dict[str, Dict[str, int]] = {}
+        for component_name, option_name, count in option_counts:
+            option_facets.setdefault(component_name, {})[option_name] = count
+        items: List[Dict[str, Any]] = [
+            {**row._mapping, "category": row.category.value, "base_price": row.base_price or 0.0}
+            for row in rows
+        ]
+        return {
+            "items": items,
+            "total": total,
+            "facets": {
+                "categories": {
+                    product_category.value: count
+                    for product_category, count in sorted(category_counts, key=lambda row: row[0].value)
+                },
+                "options": option_facets,
+            },
+        }
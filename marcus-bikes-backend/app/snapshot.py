@@ -0,0 +1,583 @@
+"""
+Compiled catalog snapshot shared by all workers through a memory-mapped file.
+
+The whole catalog (products in the frontend format, with per-option
+dependency bitmasks and an index of price rules by option) is written once
+to a compact binary file, and every worker maps it read-only, so the pages
+are shared through the OS page cache instead of being copied per process.
+New snapshots are written next to the old one and renamed over it; workers
+that still map the old file keep reading it until they notice the swap.
+
+Layout (little-endian): a header, then fixed-size records for products,
+components, options, dependencies and price rules, the price rule index,
+the dependency masks and a table of deduplicated UTF-8 strings. Records
+refer to strings and to their children by offset and count, and products are
+sorted by id so that a lookup is a binary search over the mapped file.
+"""
+
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.configuration import check_configuration, dependency_masks
+from app.models.catalog_change import CatalogChange
+from app.models.enums import CategoryEnum, DependencyTypeEnum
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent rebuilds are wasted work, not harmful
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MBCS"
+FORMAT_VERSION = 4
+
+# magic, format, catalog version, then the number of products, components,
+# options, dependencies and price rules, and the size of the masks and strings
+HEADER = struct.Struct("<4sH2xQIIIIIII")
+# id, category, base, min and max price (NaN for none), name, description,
+# first/count of components, options, dependencies and price rules, then
+# the offset and size in bytes of the masks
+PRODUCT = struct.Struct("<iB3xdddIIIIIIIIIIIIII")
+# id, name, description, first option, option count
+COMPONENT = struct.Struct("<iIIIIII")
+# id, price, in stock, name
+OPTION = struct.Struct("<idB3xII")
+# type, source component, source option, target component, target option (-1 for any)
+DEPENDENCY = struct.Struct("<B3xiiii")
+# component, option, dependent component, dependent option, price
+PRICE_RULE = struct.Struct("<iiiid")
+# position of a price rule among its product's, the rules sorted by option
+RULE_INDEX = struct.Struct("<I")
+PRODUCT_ID = struct.Struct("<i")
+
+CATEGORIES = list(CategoryEnum)
+CATEGORY_CODES = {category.value: code for code, category in enumerate(CATEGORIES)}
+DEPENDENCY_TYPES = list(DependencyTypeEnum)
+DEPENDENCY_CODES = {dependency_type.value: code for code, dependency_type in enumerate(DEPENDENCY_TYPES)}
+ANY_OPTION = -1
+
+# Products loaded per query when building a snapshot
+BUILD_BATCH_SIZE = 1000
+
+
+def _float(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class SnapshotWriter:
+    """Accumulates the records of a snapshot, products in increasing id order"""
+
+    def __init__(self):
+        self.products = bytearray()
+        self.components = bytearray()
+        self.options = bytearray()
+        self.dependencies = bytearray()
+        self.price_rules = bytearray()
+        self.rule_index = bytearray()
+        self.masks = bytearray()
+        self.strings = bytearray()
+        self.string_offsets: Dict[str, int] = {}
+        self.counts = {"products": 0, "components": 0, "options": 0, "dependencies": 0, "price_rules": 0}
+        self.last_product_id: Optional[int] = None
+
+    def _string(self, value: Optional[str]) -> Tuple[int, int]:
+        encoded = (value or "").encode("utf-8")
+        offset = self.string_offsets.get(value or "")
+        if offset is None:
+            offset = self.string_offsets[value or ""] = len(self.strings)
+            self.strings += encoded
+        return offset, len(encoded)
+
+    def add(self, product: Dict[str, Any]) -> None:
+        """Add a product in the frontend format (``ProductService.product_to_frontend_dict``)"""
+        if self.last_product_id is not None and product["id"] <= self.last_product_id:
+            raise ValueError("Products must be added in increasing id order")
+        self.last_product_id = product["id"]
+
+        first_component = self.counts["components"]
+        first_option = self.counts["options"]
+        for component in product["components"]:
+            component_first_option = self.counts["options"]
+            for option in component["options"]:
+                self.options += OPTION.pack(option["id"], option["price"], option["inStock"], *self._string(option["name"]))
+                self.counts["options"] += 1
+            self.components += COMPONENT.pack(
+                component["id"],
+                *self._string(component["name"]),
+                *self._string(component["description"]),
+                component_first_option,
+                len(component["options"])
+            )
+            self.counts["components"] += 1
+        option_count = self.counts["options"] - first_option
+
+        # Per option, what it requires then what it excludes
+        mask_offset = len(self.masks)
+        mask_size = (option_count + 7) // 8
+        for requires, excludes in dependency_masks(product):
+            self.masks += requires.to_bytes(mask_size, "little") + excludes.to_bytes(mask_size, "little")
+
+        first_dependency = self.counts["dependencies"]
+        for dependency in product["dependencies"]:
+            target_option = dependency["targetOptionId"]
+            self.dependencies += DEPENDENCY.pack(
+                DEPENDENCY_CODES[dependency["type"]],
+                dependency["sourceComponentId"],
+                dependency["sourceOptionId"],
+                dependency["targetComponentId"],
+                ANY_OPTION if target_option is None else target_option
+            )
+            self.counts["dependencies"] += 1
+
+        first_rule = self.counts["price_rules"]
+        rules = product["priceRules"]
+        for rule in rules:
+            self.price_rules += PRICE_RULE.pack(
+                rule["componentId"], rule["optionId"], rule["dependentComponentId"], rule["dependentOptionId"], rule["price"]
+            )
+        # A stable sort keeps the rules of an option in order, the first match wins
+        for position in sorted(range(len(rules)), key=lambda position: rules[position]["optionId"]):
+            self.rule_index += RULE_INDEX.pack(position)
+        self.counts["price_rules"] += len(rules)
+
+        self.products += PRODUCT.pack(
+            product["id"],
+            CATEGORY_CODES[product["category"]],
+            _float(product["basePrice"]),
+            _float(product["minPrice"]),
+            _float(product["maxPrice"]),
+            *self._string(product["name"]),
+            *self._string(product["description"]),
+            first_component,
+            len(product["components"]),
+            first_option,
+            option_count,
+            first_dependency,
+            len(product["dependencies"]),
+            first_rule,
+            len(rules),
+            mask_offset,
+            mask_size
+        )
+        self.counts["products"] += 1
+
+    def write(self, path: str, version: int) -> None:
+        """Write the snapshot to a temporary file and atomically rename it to ``path``"""
+        header = HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            version,
+            self.counts["products"],
+            self.counts["components"],
+            self.counts["options"],
+            self.counts["dependencies"],
+            self.counts["price_rules"],
+            len(self.masks),
+            len(self.strings)
+        )
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary_path = tempfile.mkstemp(dir=directory, prefix=".catalog-snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for section in (
+                    header, self.products, self.components, self.options, self.dependencies,
+                    self.price_rules, self.rule_index, self.masks, self.strings
+                ):
+                    file.write(section)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+
+class CatalogSnapshotFile:
+    """Read-only view of a snapshot file; records are decoded on access"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, file_format, self.version, self.product_count, component_count, option_count,
+            dependency_count, rule_count, mask_bytes, string_bytes
+        ) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or file_format != FORMAT_VERSION:
+            self.buffer.close()
+            raise ValueError(f"{path} is not a catalog snapshot in format {FORMAT_VERSION}")
+
+        self.products_offset = HEADER.size
+        self.components_offset = self.products_offset + self.product_count * PRODUCT.size
+        self.options_offset = self.components_offset + component_count * COMPONENT.size
+        self.dependencies_offset = self.options_offset + option_count * OPTION.size
+        self.rules_offset = self.dependencies_offset + dependency_count * DEPENDENCY.size
+        self.rule_index_offset = self.rules_offset + rule_count * PRICE_RULE.size
+        self.masks_offset = self.rule_index_offset + rule_count * RULE_INDEX.size
+        self.strings_offset = self.masks_offset + mask_bytes
+        if self.strings_offset + string_bytes != len(self.buffer):
+            self.buffer.close()
+            raise ValueError(f"{path} is truncated")
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self.strings_offset + offset
+        return self.buffer[start:start + length].decode("utf-8")
+
+    def _find(self, product_id: int) -> Optional[tuple]:
+        low, high = 0, self.product_count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self.products_offset + middle * PRODUCT.size
+            (candidate,) = PRODUCT_ID.unpack_from(self.buffer, offset)
+            if candidate < product_id:
+                low = middle + 1
+            elif candidate > product_id:
+                high = middle
+            else:
+                return PRODUCT.unpack_from(self.buffer, offset)
+        return None
+
+    def product_ids(self) -> List[int]:
+        return [
+            PRODUCT_ID.unpack_from(self.buffer, self.products_offset + position * PRODUCT.size)[0]
+            for position in range(self.product_count)
+        ]
+
+    def get_product(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Get a product in the frontend format, or None if it is not in the snapshot"""
+        record = self._find(product_id)
+        if record is None:
+            return None
+        (
+            _, category, base_price, min_price, max_price, name_offset, name_length, description_offset, description_length,
+            first_component, component_count, _, _, first_dependency, dependency_count, first_rule, rule_count, _, _
+        ) = record
+
+        components = []
+        for position in range(first_component, first_component + component_count):
+            component_id, component_name_offset, component_name_length, component_description_offset, \
+                component_description_length, first_option, option_count = COMPONENT.unpack_from(
+                    self.buffer, self.components_offset + position * COMPONENT.size
+                )
+            options = []
+            for option_position in range(first_option, first_option + option_count):
+                option_id, price, in_stock, option_name_offset, option_name_length = OPTION.unpack_from(
+                    self.buffer, self.options_offset + option_position * OPTION.size
+                )
+                options.append({
+                    "id": option_id,
+                    "name": self._string(option_name_offset, option_name_length),
+                    "price": price,
+                    "inStock": bool(in_stock)
+                })
+            components.append({
+                "id": component_id,
+                "name": self._string(component_name_offset, component_name_length),
+                "description": self._string(component_description_offset, component_description_length),
+                "options": options
+            })
+
+        dependencies = []
+        for position in range(first_dependency, first_dependency + dependency_count):
+            kind, source_component, source_option, target_component, target_option = DEPENDENCY.unpack_from(
+                self.buffer, self.dependencies_offset + position * DEPENDENCY.size
+            )
+            dependencies.append({
+                "type": DEPENDENCY_TYPES[kind].value,
+                "sourceComponentId": source_component,
+                "sourceOptionId": source_option,
+                "targetComponentId": target_component,
+                "targetOptionId": None if target_option == ANY_OPTION else target_option
+            })
+
+        price_rules = []
+        for position in range(first_rule, first_rule + rule_count):
+            component_id, option_id, dependent_component_id, dependent_option_id, price = PRICE_RULE.unpack_from(
+                self.buffer, self.rules_offset + position * PRICE_RULE.size
+            )
+            price_rules.append({
+                "type": "override",
+                "componentId": component_id,
+                "optionId": option_id,
+                "dependentComponentId": dependent_component_id,
+                "dependentOptionId": dependent_option_id,
+                "price": price
+            })
+
+        return {
+            "id": product_id,
+            "name": self._string(name_offset, name_length),
+            "description": self._string(description_offset, description_length),
+            "category": CATEGORIES[category].value,
+            "components": components,
+            "dependencies": dependencies,
+            "priceRules": price_rules,
+            "basePrice": _optional(base_price),
+            "minPrice": _optional(min_price),
+            "maxPrice": _optional(max_price)
+        }
+
+    def _price_overrides(self, record: tuple, option_id: int) -> List[Tuple[int, float]]:
+        first_rule, rule_count = record[15], record[16]
+
+        def rule(index_position: int) -> tuple:
+            (position,) = RULE_INDEX.unpack_from(self.buffer, self.rule_index_offset + index_position * RULE_INDEX.size)
+            return PRICE_RULE.unpack_from(self.buffer, self.rules_offset + (first_rule + position) * PRICE_RULE.size)
+
+        low, high = first_rule, first_rule + rule_count
+        while low < high:
+            middle = (low + high) // 2
+            if rule(middle)[1] < option_id:
+                low = middle + 1
+            else:
+                high = middle
+        overrides = []
+        while low < first_rule + rule_count:
+            _, rule_option, _, dependent_option, price = rule(low)
+            if rule_option != option_id:
+                break
+            overrides.append((dependent_option, price))
+            low += 1
+        return overrides
+
+    def _dependency_masks(self, record: tuple) -> List[Tuple[int, int]]:
+        option_count, mask_offset, mask_size = record[12], record[17], record[18]
+        masks = []
+        start = self.masks_offset + mask_offset
+        for _ in range(option_count):
+            requires = self.buffer[start:start + mask_size]
+            excludes = self.buffer[start + mask_size:start + 2 * mask_size]
+            masks.append((int.from_bytes(requires, "little"), int.from_bytes(excludes, "little")))
+            start += 2 * mask_size
+        return masks
+
+    def get_price_overrides(self, product_id: int, option_id: int) -> List[Tuple[int, float]]:
+        """``(dependent option, price)`` of the price rules of an option, from the rule index"""
+        record = self._find(product_id)
+        return [] if record is None else self._price_overrides(record, option_id)
+
+    def get_dependency_masks(self, product_id: int) -> List[Tuple[int, int]]:
+        """Per option of a product in position order, the bitmasks (over those
+        positions) of the options it requires and excludes
+        """
+        record = self._find(product_id)
+        return [] if record is None else self._dependency_masks(record)
+
+    def check_configuration(self, product_id: int, option_ids: Sequence[int]) -> Optional[Tuple[float, List[str]]]:
+        """Price a configuration with ``app.configuration.check_configuration``
+        from the stored masks and rule index, without decoding any string
+
+        Returns None if the product is not in the snapshot.
+        """
+        record = self._find(product_id)
+        if record is None:
+            return None
+        base_price, first_component, component_count = record[2], record[9], record[10]
+        components = []
+        for position in range(first_component, first_component + component_count):
+            component = COMPONENT.unpack_from(self.buffer, self.components_offset + position * COMPONENT.size)
+            first_option, option_count = component[5], component[6]
+            options = []
+            for option_position in range(first_option, first_option + option_count):
+                option_id, price, in_stock, _, _ = OPTION.unpack_from(
+                    self.buffer, self.options_offset + option_position * OPTION.size
+                )
+                options.append((option_id, price, bool(in_stock)))
+            components.append((component[0], options))
+        return check_configuration(
+            _optional(base_price),
+            components,
+            self._dependency_masks(record),
+            lambda option_id: self._price_overrides(record, option_id),
+            option_ids
+        )
+
+
+def build_snapshot(db: Session, path: str) -> int:
+    """Write a snapshot of the whole catalog to ``path`` and return its change version
+
+    The version is read before the products, so the snapshot includes at
+    least every change up to it.
+    """
+    from app.services.catalog_change_service import CatalogChangeService
+    from app.services.product_service import ProductService
+
+    version = CatalogChangeService.get_version(db)
+    writer = SnapshotWriter()
+    product_ids = ProductService.get_product_ids(db)
+    for start in range(0, len(product_ids), BUILD_BATCH_SIZE):
+        batch = sorted(ProductService.get_products_by_ids(db, product_ids[start:start + BUILD_BATCH_SIZE]), key=lambda product: product.id)
+        for product in batch:
+            writer.add(ProductService.product_to_frontend_dict(product))
+        db.expunge_all()
+    writer.write(path, version)
+    return version
+
+
+class SharedCatalogSnapshot:
+    """The snapshot mapped by this worker, kept in line with the catalog
+
+    Every read checks the current change version, so a write committed by
+    any worker is seen by the next read: products changed since the mapped
+    snapshot are reported as stale (callers load them from the database),
+    and a new snapshot is built in the background by whichever worker gets
+    the file lock first. The others pick it up through the file's identity,
+    looked at most every ``check_interval`` seconds.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0, rebuild_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.rebuild_interval = rebuild_interval
+        self.snapshot: Optional[CatalogSnapshotFile] = None
+        self.stale: FrozenSet[int] = frozenset()
+        # (snapshot version, catalog version) the stale products were found at
+        self._stale_versions: Optional[Tuple[int, int]] = None
+        self.checked_at = -math.inf
+        self.rebuilt_at = -math.inf
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def _reopen(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.snapshot = None
+            return
+        if self.snapshot is not None and self.snapshot.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            return
+        try:
+            # The previous mapping is released once no reader uses it any more
+            self.snapshot = CatalogSnapshotFile(self.path)
+        except (OSError, ValueError):
+            logger.exception("Could not open the catalog snapshot %s", self.path)
+            self.snapshot = None
+
+    def check(self, db: Session) -> Tuple[Optional[CatalogSnapshotFile], FrozenSet[int]]:
+        """Pick up a swapped file, find stale products and start a rebuild when needed
+
+        Returns the mapped snapshot and its stale products.
+        """
+        from app.services.catalog_change_service import CatalogChangeService
+
+        now = time.monotonic()
+        with self._lock:
+            reopen = now - self.checked_at >= self.check_interval
+            if reopen:
+                self.checked_at = now
+        if reopen:
+            self._reopen()
+        snapshot = self.snapshot
+        version = CatalogChangeService.get_version(db)
+        if snapshot is not None and snapshot.version == version:
+            self.stale = frozenset()
+            return snapshot, self.stale
+        stale = frozenset()
+        if snapshot is not None:
+            if self._stale_versions != (snapshot.version, version):
+                self.stale = frozenset(db.scalars(
+                    select(CatalogChange.product_id).where(CatalogChange.version > snapshot.version).distinct()
+                ))
+                self._stale_versions = (snapshot.version, version)
+            stale = self.stale
+        if now - self.rebuilt_at >= self.rebuild_interval:
+            self.rebuild_in_background(db.get_bind())
+        return snapshot, stale
+
+    def rebuild(self, bind) -> bool:
+        """Build a new snapshot unless another worker is already doing it"""
+        self.rebuilt_at = time.monotonic()
+        with open(self.path + ".lock", "w") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            try:
+                with Session(bind=bind) as db:
+                    build_snapshot(db, self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.checked_at = -math.inf
+        return True
+
+    def rebuild_in_background(self, bind) -> None:
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                self.rebuild(bind)
+            except Exception:
+                logger.exception("Could not build the catalog snapshot %s", self.path)
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name="catalog-snapshot", daemon=True).start()
+
+    def get_products(self, db: Session, product_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        """Get the products of the snapshot that are still current, by id"""
+        snapshot, stale = self.check(db)
+        if snapshot is None:
+            return {}
+        products = {}
+        for product_id in product_ids:
+            if product_id not in stale:
+                product = snapshot.get_product(product_id)
+                if product is not None:
+                    products[product_id] = product
+        return products
+
+    def check_configuration(self, db: Session, product_id: int, option_ids: Sequence[int]) -> Optional[Tuple[float, List[str]]]:
+        """Price a configuration from the snapshot, or None if the product is not current in it"""
+        snapshot, stale = self.check(db)
+        if snapshot is None or product_id in stale:
+            return None
+        return snapshot.check_configuration(product_id, option_ids)
+
+
+def snapshot_from_environment() -> Optional[SharedCatalogSnapshot]:
+    path = os.getenv("CATALOG_SNAPSHOT_PATH")
+    if not path:
+        return None
+    return SharedCatalogSnapshot(
+        path,
+        check_interval=float(os.getenv("CATALOG_SNAPSHOT_CHECK_INTERVAL", "1")),
+        rebuild_interval=float(os.getenv("CATALOG_SNAPSHOT_REBUILD_INTERVAL", "5"))
+    )
+
+
+# Only used when CATALOG_SNAPSHOT_PATH is set
+catalog_snapshot = snapshot_from_environment()
+
+
+if __name__ == "__main__":
+    # Build the snapshot once, e.g. before starting the workers:
+    # CATALOG_SNAPSHOT_PATH=/var/lib/marcus/catalog.snapshot python -m app.snapshot
+    from app.database.session import SessionLocal
+
+    snapshot_path = os.environ["CATALOG_SNAPSHOT_PATH"]
+    with SessionLocal() as session:
+        print(f"Wrote {snapshot_path} at catalog version {build_snapshot(session, snapshot_path)}")
@@ -0,0 +1,154 @@
+"""
+Catalog cache warm-up.
+
+With ``CACHE_WARMUP`` set, each worker loads products into the catalog
+cache when it starts, so that the first shoppers after a deploy do not pay
+for cold reads: ``all`` loads every product, a number N loads the N products
+ordered most over the last ``CACHE_WARMUP_ORDER_DAYS`` days. Batches are
+loaded by ``CACHE_WARMUP_CONCURRENCY`` threads, each with its own session.
+The worker reports itself ready (``GET /ready``) once the warm-up is done.
+
+Products written through ``ProductService`` are loaded again in the
+background after the write commits, together with the category counts.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Products loaded per batch, as a batch product read does
+WARMUP_BATCH_SIZE = 100
+
+COLD = "cold"
+WARMING = "warming"
+WARM = "warm"
+
+
+class CacheWarmer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        top: Optional[int] = None,
+        concurrency: int = 4,
+        order_days: int = 30
+    ):
+        # ``top`` None warms every product
+        self.session_factory = session_factory
+        self.top = top
+        self.concurrency = concurrency
+        self.order_days = order_days
+        self.state = COLD
+        self.warmed = 0
+        self.failed_batches = 0
+        self._counter_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cache-warmup")
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == WARM
+
+    def select_product_ids(self, db: Session) -> List[int]:
+        """Products to warm: all of them, or the most ordered recently"""
+        from app.services.order_service import OrderService
+        from app.services.product_service import ProductService
+
+        if self.top is None:
+            return ProductService.get_product_ids(db)
+        since = datetime.utcnow() - timedelta(days=self.order_days)
+        return OrderService.get_top_product_ids(db, since=since, limit=self.top)
+
+    def warm_products(self, product_ids: Sequence[int]) -> int:
+        """Load products (the cached ones are left as they are) and the category counts"""
+        from app.controllers.product_controller import ProductController
+
+        with self.session_factory() as db:
+            products = ProductController.get_products_by_ids(db, list(product_ids)) if product_ids else []
+            ProductController.get_category_counts(db)
+        return len(products)
+
+    def _warm_batch(self, product_ids: Sequence[int]) -> None:
+        try:
+            warmed = self.warm_products(product_ids)
+        except Exception:
+            with self._counter_lock:
+                self.failed_batches += 1
+            logger.exception("Could not warm products %s", list(product_ids))
+            return
+        with self._counter_lock:
+            self.warmed += warmed
+
+    async def warm(self) -> None:
+        """Warm the cache, then report ready; failed batches are logged and skipped"""
+        self.state = WARMING
+        loop = asyncio.get_running_loop()
+        try:
+            with self.session_factory() as db:
+                product_ids = await loop.run_in_executor(self._executor, self.select_product_ids, db)
+        except Exception:
+            logger.exception("Could not select the products to warm")
+            product_ids = []
+        batches = [product_ids[start:start + WARMUP_BATCH_SIZE] for start in range(0, len(product_ids), WARMUP_BATCH_SIZE)]
+        # The executor runs at most ``concurrency`` batches at a time
+        await asyncio.gather(*[loop.run_in_executor(self._executor, self._warm_batch, batch) for batch in batches or [[]]])
+        self.state = WARM
+        logger.info("Catalog cache warm: %d products in %d batches, %d failed", self.warmed, len(batches), self.failed_batches)
+
+    def start(self) -> asyncio.Task:
+        """Warm in the background of the running event loop"""
+        self._task = asyncio.get_running_loop().create_task(self.warm())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def rewarm(self, product_ids: Sequence[int]) -> None:
+        """Load products again in the background after a committed write"""
+        try:
+            self._executor.submit(self._warm_batch, list(product_ids))
+        except RuntimeError:
+            # Shutting down
+            pass
+
+
+def warmer_from_environment() -> Optional[CacheWarmer]:
+    mode = os.getenv("CACHE_WARMUP", "off")
+    if mode == "off":
+        return None
+    from app.database.session import SessionLocal
+
+    return CacheWarmer(
+        SessionLocal,
+        top=None if mode == "all" else int(mode),
+        concurrency=int(os.getenv("CACHE_WARMUP_CONCURRENCY", "4")),
+        order_days=int(os.getenv("CACHE_WARMUP_ORDER_DAYS", "30"))
+    )
+
+
+# Only used when CACHE_WARMUP is set
+cache_warmer = warmer_from_environment()
+
+
+def rewarm_products(*product_ids: int) -> None:
+    """Re-warm products after a committed catalog write, when warm-up is enabled"""
+    if cache_warmer is not None:
+        cache_warmer.rewarm(product_ids)
+
+
+def cache_state() -> str:
+    """``warm``, ``warming`` or ``cold``; ``disabled`` without warm-up"""
+    return cache_warmer.state if cache_warmer is not None else "disabled"
@@ -0,0 +1 @@
+# Benchmark suite: synthetic catalog generator and API scenarios
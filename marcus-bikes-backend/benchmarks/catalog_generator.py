@@ -0,0 +1,301 @@
+"""
+Synthetic catalog generator for benchmarks.
+
+Scales the hand-written catalog in ``seed.py`` up to thousands of products
+(each with components, options, dependencies, price rules and inventory)
+and millions of orders. Rows are written with multi-row core inserts in
+batches, and generation is deterministic for a given seed.
+"""
+
+import datetime
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Product,
+    Component,
+    Option,
+    Dependency,
+    PriceRule,
+    Order,
+    Inventory,
+    CategoryEnum,
+    DependencyTypeEnum,
+    OrderStatusEnum,
+    StockStatusEnum,
+)
+from app.models.base import Base
+from app.services.price_range_service import PriceRangeService
+
+BATCH_SIZE = 5000
+
+COMPONENT_NAMES = {
+    CategoryEnum.BICYCLE: ["Frame Type", "Frame Finish", "Wheels", "Rim Color", "Chain", "Saddle", "Brakes", "Handlebar"],
+    CategoryEnum.SKI: ["Length", "Core", "Sidewall", "Bindings", "Topsheet", "Edges"],
+    CategoryEnum.SURFBOARD: ["Length", "Shape", "Fins", "Glassing", "Leash", "Deck Pad"],
+    CategoryEnum.ROLLERSKATE: ["Boot", "Plate", "Wheels", "Bearings", "Toe Stop", "Laces"],
+}
+OPTION_ADJECTIVES = ["Standard", "Sport", "Pro", "Carbon", "Classic", "Lightweight", "Racing", "Comfort", "Touring", "Elite"]
+PRODUCT_ADJECTIVES = ["Custom", "Urban", "Mountain", "Trail", "Race", "Alpine", "Freeride", "Retro", "Coastal", "Street"]
+PRODUCT_NOUNS = {
+    CategoryEnum.BICYCLE: "Bike",
+    CategoryEnum.SKI: "Skis",
+    CategoryEnum.SURFBOARD: "Board",
+    CategoryEnum.ROLLERSKATE: "Skates",
+}
+ORDER_STATUSES = list(OrderStatusEnum)
+ORDER_STATUS_WEIGHTS = [5, 10, 15, 60, 10]
+
+
+@dataclass
+class CatalogSpec:
+    products: int = 1000
+    components_per_product: int = 6
+    options_per_component: int = 4
+    dependencies_per_product: int = 3
+    price_rules_per_product: int = 2
+    orders: int = 10000
+    order_history_days: int = 365
+    seed: int = 42
+
+
+@dataclass
+class GeneratedCatalog:
+    """Ids of the generated rows, used by benchmark scenarios to pick targets"""
+    product_ids: List[int] = field(default_factory=list)
+    option_ids: List[int] = field(default_factory=list)
+    # product id -> list of (component id, component name, [(option id, option name, price)])
+    product_components: Dict[int, list] = field(default_factory=dict)
+    product_info: Dict[int, dict] = field(default_factory=dict)
+    orders: int = 0
+
+
+def _flush(conn, model, rows: List[dict]) -> None:
+    if rows:
+        conn.execute(insert(model), rows)
+        rows.clear()
+
+
+def generate_catalog(engine: Engine, spec: CatalogSpec) -> GeneratedCatalog:
+    """Drop and recreate all tables on ``engine`` and fill them with a synthetic catalog"""
+    rng = random.Random(spec.seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    catalog = GeneratedCatalog()
+    categories = list(CategoryEnum)
+    component_id = 0
+    option_id = 0
+
+    with engine.begin() as conn:
+        products, components, options, inventory, dependencies, price_rules = [], [], [], [], [], []
+
+        for product_id in range(1, spec.products + 1):
+            category = categories[product_id % len(categories)]
+            name = f"{rng.choice(PRODUCT_ADJECTIVES)} {PRODUCT_NOUNS[category]} {product_id}"
+            base_price = round(rng.uniform(0, 300), 2)
+            products.append({
+                "id": product_id,
+                "name": name,
+                "description": f"Synthetic {category.value} number {product_id}",
+                "category": category,
+                "base_price": base_price,
+            })
+            catalog.product_ids.append(product_id)
+            catalog.product_info[product_id] = {"name": name, "category": category.value, "base_price": base_price}
+
+            product_components = []
+            component_names = COMPONENT_NAMES[category]
+            for index in range(spec.components_per_product):
+                component_id += 1
+                component_name = component_names[index % len(component_names)]
+                if index >= len(component_names):
+                    component_name = f"{component_name} {index // len(component_names) + 1}"
+                components.append({
+                    "id": component_id,
+                    "name": component_name,
+                    "description": f"Choose your {component_name.lower()}",
+                    "product_id": product_id,
+                })
+
+                component_options = []
+                for option_index in range(spec.options_per_component):
+                    option_id += 1
+                    quantity = rng.choice([0, 3, 10, 25, 50])
+                    price = round(rng.uniform(10, 250), 2)
+                    option_name = f"{OPTION_ADJECTIVES[option_index % len(OPTION_ADJECTIVES)]} {component_name}"
+                    options.append({
+                        "id": option_id,
+                        "name": option_name,
+                        "price": price,
+                        "in_stock": quantity > 0,
+                        "component_id": component_id,
+                        "stock_quantity": quantity,
+                    })
+                    inventory.append({
+                        "option_id": option_id,
+                        "quantity": quantity,
+                        "low_stock_threshold": 5,
+                        "stock_status": (
+                            StockStatusEnum.OUT_OF_STOCK if quantity <= 0
+                            else StockStatusEnum.LIMITED_STOCK if quantity <= 5
+                            else StockStatusEnum.IN_STOCK
+                        ),
+                    })
+                    catalog.option_ids.append(option_id)
+                    component_options.append((option_id, option_name, price))
+                product_components.append((component_id, component_name, component_options))
+            catalog.product_components[product_id] = product_components
+
+            if len(product_components) >= 2:
+                for _ in range(spec.dependencies_per_product):
+                    source, target = rng.sample(product_components, 2)
+                    dependencies.append({
+                        "type": rng.choice(list(DependencyTypeEnum)),
+                        "source_component_id": source[0],
+                        "source_option_id": rng.choice(source[2])[0],
+                        "target_component_id": target[0],
+                        "target_option_id": rng.choice(target[2])[0],
+                        "product_id": product_id,
+                    })
+                for _ in range(spec.price_rules_per_product):
+                    source, target = rng.sample(product_components, 2)
+                    price_rules.append({
+                        "component_id": source[0],
+                        "option_id": rng.choice(source[2])[0],
+                        "dependent_component_id": target[0],
+                        "dependent_option_id": rng.choice(target[2])[0],
+                        "price": round(rng.uniform(5, 100), 2),
+                        "product_id": product_id,
+                    })
+
+            if len(options) >= BATCH_SIZE:
+                _flush(conn, Product, products)
+                _flush(conn, Component, components)
+                _flush(conn, Option, options)
+                _flush(conn, Inventory, inventory)
+                _flush(conn, Dependency, dependencies)
+                _flush(conn, PriceRule, price_rules)
+
+        _flush(conn, Product, products)
+        _flush(conn, Component, components)
+        _flush(conn, Option, options)
+        _flush(conn, Inventory, inventory)
+        _flush(conn, Dependency, dependencies)
+        _flush(conn, PriceRule, price_rules)
+
+    with Session(engine) as db:
+        PriceRangeService.refresh_all(db)
+        db.commit()
+
+    _generate_orders(engine, spec, catalog, rng)
+    _reset_sequences(engine)
+    return catalog
+
+
+def build_order(catalog: GeneratedCatalog, rng: random.Random, items: int = 1) -> dict:
+    """Build an order payload (as accepted by ``POST /orders``) for random products"""
+    products = []
+    categories = set()
+    total = 0.0
+    for product_id in rng.sample(catalog.product_ids, min(items, len(catalog.product_ids))):
+        info = catalog.product_info[product_id]
+        configuration = {}
+        option_ids = []
+        price = info["base_price"]
+        for _, component_name, component_options in catalog.product_components[product_id]:
+            chosen_id, chosen_name, chosen_price = rng.choice(component_options)
+            configuration[component_name] = chosen_name
+            option_ids.append(chosen_id)
+            price += chosen_price
+        quantity = rng.randint(1, 2)
+        total += price * quantity
+        categories.add(info["category"])
+        products.append({
+            "id": product_id,
+            "name": info["name"],
+            "category": info["category"],
+            "quantity": quantity,
+            "price": round(price, 2),
+            "configuration": configuration,
+            "optionIds": option_ids,
+        })
+
+    return {
+        "customer_name": f"Customer {rng.randint(1, 10 ** 6)}",
+        "customer_email": f"customer{rng.randint(1, 10 ** 6)}@example.com",
+        "shipping_address": f"{rng.randint(1, 999)} Benchmark Street, Test City",
+        "total_amount": round(total, 2),
+        "product_categories": ",".join(sorted(categories)),
+        "order_details": {
+            "products": products,
+            "shipping_method": "standard",
+            "payment_method": "credit_card",
+        },
+    }
+
+
+def _generate_orders(engine: Engine, spec: CatalogSpec, catalog: GeneratedCatalog, rng: random.Random) -> None:
+    now = datetime.datetime.utcnow()
+    history_seconds = spec.order_history_days * 24 * 3600
+    rows = []
+    with engine.begin() as conn:
+        for _ in range(spec.orders):
+            order = build_order(catalog, rng, items=rng.choice([1, 1, 1, 2, 3]))
+            created_at = now - datetime.timedelta(seconds=rng.randint(0, history_seconds))
+            rows.append({
+                **order,
+                "status": rng.choices(ORDER_STATUSES, weights=ORDER_STATUS_WEIGHTS)[0],
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+            if len(rows) >= BATCH_SIZE:
+                _flush(conn, Order, rows)
+        _flush(conn, Order, rows)
+    catalog.orders = spec.orders
+
+
+def _reset_sequences(engine: Engine) -> None:
+    """Move Postgres id sequences past the explicitly inserted ids"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for table in ("products", "components", "options"):
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+            ))
+
+
+def load_catalog(engine: Engine) -> GeneratedCatalog:
+    """Rebuild the scenario lookup tables from an already generated database"""
+    catalog = GeneratedCatalog()
+    with engine.connect() as conn:
+        for row in conn.execute(text("SELECT id, name, category, base_price FROM products ORDER BY id")):
+            category = row.category.lower() if isinstance(row.category, str) else row.category.value
+            catalog.product_ids.append(row.id)
+            catalog.product_info[row.id] = {"name": row.name, "category": category, "base_price": row.base_price}
+            catalog.product_components[row.id] = []
+
+        components = {}
+        for row in conn.execute(text("SELECT id, name, product_id FROM components ORDER BY id")):
+            entry = (row.id, row.name, [])
+            components[row.id] = entry
+            catalog.product_components[row.product_id].append(entry)
+
+        for row in conn.execute(text("SELECT id, name, price, component_id FROM options ORDER BY id")):
+            components[row.component_id][2].append((row.id, row.name, row.price))
+            catalog.option_ids.append(row.id)
+
+        catalog.orders = conn.execute(text("SELECT COUNT(*) FROM orders")).scalar()
+
+    # Products without any option cannot be ordered by the scenarios
+    catalog.product_components = {
+        product_id: [c for c in product_components if c[2]]
+        for product_id, product_components in catalog.product_components.items()
+    }
+    return catalog
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Compare two benchmark result files, e.g. from two commits.
+
+    python -m benchmarks.compare baseline.json benchmarks/results/latest.json
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+METRICS = [
+    ("throughput_rps", lambda s: s["throughput_rps"]),
+    ("p50_ms", lambda s: s["latency_ms"]["p50"]),
+    ("p95_ms", lambda s: s["latency_ms"]["p95"]),
+    ("p99_ms", lambda s: s["latency_ms"]["p99"]),
+    ("queries", lambda s: s["queries_per_request"]["mean"]),
+]
+
+
+def change(old, new) -> str:
+    if old in (None, 0) or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline:  {baseline.get('commit')}  candidate: {candidate.get('commit')}")
+    print(f"{'scenario':<22}{'metric':<16}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name, new_stats in candidate["scenarios"].items():
+        old_stats = baseline["scenarios"].get(name)
+        if old_stats is None:
+            continue
+        for metric, read in METRICS:
+            old, new = read(old_stats), read(new_stats)
+            print(f"{name:<22}{metric:<16}{str(old):>12}{str(new):>12}{change(old, new):>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Scripted benchmark scenarios.
+
+Each scenario turns a random generator and the generated catalog into the
+next HTTP request to send, as ``(method, url, json_body)``.
+"""
+
+import datetime
+import random
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.models.enums import CategoryEnum, OrderStatusEnum
+from benchmarks.catalog_generator import GeneratedCatalog, build_order
+
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+Scenario = Callable[[GeneratedCatalog, random.Random], Request]
+
+
+def browse_category(catalog: GeneratedCatalog, rng: random.Random) -> Request:
+    """Shopper opens a category listing page"""
+    category = rng.choice(list(CategoryEnum)).value
+    return "GET", f"/products/?category={category}&limit=20", None
+
+
+def open_product(catalog: GeneratedCatalog, rng: random.Random) -> Request:
+    """Shopper opens the configurator of one product"""
+    return "GET", f"/products/{rng.choice(catalog.product_ids)}", None
+
+
+def submit_order(catalog: GeneratedCatalog, rng: random.Random) -> Request:
+    """Shopper checks out a cart of one to three configured products"""
+    return "POST", "/orders/", build_order(catalog, rng, items=rng.randint(1, 3))
+
+
+def admin_order_filter(catalog: GeneratedCatalog, rng: random.Random) -> Request:
+    """Admin filters the last month of orders by status and category"""
+    start_date = datetime.datetime.utcnow() - datetime.timedelta(days=30)
+    filters = {
+        "start_date": start_date.isoformat(),
+        "status": rng.choice(list(OrderStatusEnum)).value,
+        "product_category": rng.choice(list(CategoryEnum)).value,
+    }
+    return "POST", "/orders/filter?limit=50", filters
+
+
+def bulk_stock_update(catalog: GeneratedCatalog, rng: random.Random) -> Request:
+    """Admin restocks options one after another, as the inventory page does"""
+    option_id = rng.choice(catalog.option_ids)
+    return "PATCH", f"/inventory/option/{option_id}", {"quantity": rng.randint(0, 50)}
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "browse_category": browse_category,
+    "open_product": open_product,
+    "submit_order": submit_order,
+    "admin_order_filter": admin_order_filter,
+    "bulk_stock_update": bulk_stock_update,
+}
@@ -0,0 +1,91 @@
+"""
+Micro-benchmarks for response encoding (pytest-benchmark).
+
+    pytest benchmarks/test_json_response.py --benchmark-group-by=param:count
+
+Compares, for lists of 10, 100 and 1000 orders, FastAPI's previous default
+``JSONResponse`` (``json.dumps``) with the orjson-backed ``FastJSONResponse``
+now configured app-wide:
+- ``render``: encoding the content FastAPI hands to the response class,
+  already converted to JSON-compatible values by the ``response_model``
+- ``route``: the whole ``response_model=List[Order]`` path of the order
+  listing, from ORM objects to the response body
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import datetime
+import json
+
+from fastapi.responses import JSONResponse
+
+from app.main import app
+from app.models import Order
+from app.models.enums import OrderStatusEnum
+from app.responses import FastJSONResponse
+
+COUNTS = {"10": 10, "100": 100, "1000": 1000}
+
+RESPONSE_CLASSES = {"json": JSONResponse, "orjson": FastJSONResponse}
+
+response_field = next(
+    route for route in app.routes if getattr(route, "path", None) == "/orders/" and "GET" in route.methods
+).response_field
+
+
+def build_orders(count: int):
+    """Transient ORM orders shaped like the ones the frontend sends"""
+    created_at = datetime.datetime(2026, 10, 19, 12, 30, 15, 123456)
+    return [
+        Order(
+            id=order_id,
+            customer_name=f"Customer {order_id}",
+            customer_email=f"customer{order_id}@example.com",
+            shipping_address="123 Test St, Test City, 12345",
+            total_amount=420.5,
+            created_at=created_at,
+            updated_at=created_at,
+            status=OrderStatusEnum.PENDING,
+            product_categories="bicycle",
+            order_details={
+                "products": [
+                    {"id": str(item), "name": f"Bike {item}", "category": "bicycle", "quantity": 1,
+                     "price": 210.25, "configuration": {"frame": "Carbon", "wheels": "Road"}}
+                    for item in range(2)
+                ],
+                "shipping_method": "standard",
+                "payment_method": "credit_card"
+            }
+        )
+        for order_id in range(1, count + 1)
+    ]
+
+
+def serialize(orders):
+    """What FastAPI does before calling the response class"""
+    # ORM objects are validated as they are, through from_attributes
+    value, errors = response_field.validate(orders, {}, loc=("response",))
+    assert not errors
+    return response_field.serialize(value, mode="json")
+
+
+@pytest.fixture(params=list(COUNTS), ids=list(COUNTS))
+def orders(request):
+    return build_orders(COUNTS[request.param])
+
+
+@pytest.mark.parametrize("response_class", list(RESPONSE_CLASSES))
+def test_render(benchmark, orders, response_class):
+    benchmark.group = "render"
+    content = serialize(orders)
+    body = benchmark(RESPONSE_CLASSES[response_class], content)
+    assert json.loads(body.body) == content
+
+
+@pytest.mark.parametrize("response_class", list(RESPONSE_CLASSES))
+def test_route(benchmark, orders, response_class):
+    benchmark.group = "route"
+    body = benchmark(lambda: RESPONSE_CLASSES[response_class](serialize(orders)).body)
+    assert json.loads(body)[0]["created_at"] == "2026-10-19T12:30:15.123456"
@@ -0,0 +1,203 @@
+"""
+Micro-benchmarks for the product serialization path (pytest-benchmark).
+
+    pytest benchmarks/test_serialization.py --benchmark-group-by=param:size
+
+Compares, for products with 10, 100 and 500 options:
+- ``legacy``: the previous conversion, building and validating one pydantic
+  model per option, dependency and price rule
+- ``construct``: the same tree built with ``model_construct`` (no validation)
+- ``validate``: ``ProductService.product_to_frontend``, plain dicts validated
+  in a single ``model_validate`` call
+- ``dict``: ``ProductService.product_to_frontend_dict`` alone
+
+and, at route level, each conversion followed by FastAPI's ``response_model``
+handling (dump, re-validate, serialize, encode) versus the ``model_response``
+path used by the product routes, which encodes the validated model directly.
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+from app.main import app
+from app.responses import model_response
+from app.models import Product, Component, Option, Dependency, PriceRule, CategoryEnum, DependencyTypeEnum
+from app.schemas import FrontendProduct, FrontendComponent, FrontendOption, FrontendDependency, FrontendPriceRule
+from app.services.product_service import ProductService
+
+# (components, options per component): 10, 100 and 500 options per product
+SIZES = {"small": (5, 2), "medium": (10, 10), "large": (20, 25)}
+
+
+def build_product(components: int, options_per_component: int) -> Product:
+    """Build a transient ORM product graph, so only conversion cost is measured"""
+    product = Product(id=1, name="Benchmark Bike", description="A large product", category=CategoryEnum.BICYCLE, base_price=100.0)
+    option_id = 0
+    for component_index in range(components):
+        component = Component(id=component_index + 1, name=f"Component {component_index}", description="A component")
+        for option_index in range(options_per_component):
+            option_id += 1
+            component.options.append(Option(id=option_id, name=f"Option {option_id}", price=10.0 + option_index, in_stock=True))
+        product.components.append(component)
+
+    for index in range(components - 1):
+        source, target = product.components[index], product.components[index + 1]
+        product.dependencies.append(Dependency(
+            type=DependencyTypeEnum.REQUIRES,
+            source_component_id=source.id,
+            source_option_id=source.options[0].id,
+            target_component_id=target.id,
+            target_option_id=target.options[0].id
+        ))
+        product.price_rules.append(PriceRule(
+            component_id=source.id,
+            option_id=source.options[-1].id,
+            dependent_component_id=target.id,
+            dependent_option_id=target.options[-1].id,
+            price=42.0
+        ))
+    return product
+
+
+def legacy_conversion(product: Product) -> FrontendProduct:
+    """The previous conversion path, validating every nested model separately"""
+    return FrontendProduct(
+        id=product.id,
+        name=product.name,
+        description=product.description or "",
+        category=product.category.value,
+        components=[
+            FrontendComponent(
+                id=component.id,
+                name=component.name,
+                description=component.description or "",
+                options=[
+                    FrontendOption(id=option.id, name=option.name, price=option.price, inStock=option.in_stock)
+                    for option in component.options
+                ]
+            )
+            for component in product.components
+        ],
+        dependencies=[
+            FrontendDependency(
+                type=dependency.type.value,
+                sourceComponentId=dependency.source_component_id,
+                sourceOptionId=dependency.source_option_id,
+                targetComponentId=dependency.target_component_id,
+                targetOptionId=dependency.target_option_id
+            )
+            for dependency in product.dependencies
+        ],
+        priceRules=[
+            FrontendPriceRule(
+                componentId=rule.component_id,
+                optionId=rule.option_id,
+                dependentComponentId=rule.dependent_component_id,
+                dependentOptionId=rule.dependent_option_id,
+                price=rule.price
+            )
+            for rule in product.price_rules
+        ],
+        basePrice=product.base_price
+    )
+
+
+def construct_conversion(product: Product) -> FrontendProduct:
+    """The same tree built without any validation"""
+    return FrontendProduct.model_construct(
+        id=product.id,
+        name=product.name,
+        description=product.description or "",
+        category=product.category.value,
+        components=[
+            FrontendComponent.model_construct(
+                id=component.id,
+                name=component.name,
+                description=component.description or "",
+                options=[
+                    FrontendOption.model_construct(id=option.id, name=option.name, price=option.price, inStock=option.in_stock)
+                    for option in component.options
+                ]
+            )
+            for component in product.components
+        ],
+        dependencies=[
+            FrontendDependency.model_construct(
+                type=dependency.type.value,
+                sourceComponentId=dependency.source_component_id,
+                sourceOptionId=dependency.source_option_id,
+                targetComponentId=dependency.target_component_id,
+                targetOptionId=dependency.target_option_id
+            )
+            for dependency in product.dependencies
+        ],
+        priceRules=[
+            FrontendPriceRule.model_construct(
+                componentId=rule.component_id,
+                optionId=rule.option_id,
+                dependentComponentId=rule.dependent_component_id,
+                dependentOptionId=rule.dependent_option_id,
+                price=rule.price
+            )
+            for rule in product.price_rules
+        ],
+        basePrice=product.base_price
+    )
+
+
+CONVERSIONS = {
+    "legacy": legacy_conversion,
+    "construct": construct_conversion,
+    "validate": ProductService.product_to_frontend,
+    "dict": ProductService.product_to_frontend_dict,
+}
+
+response_field = next(route for route in app.routes if getattr(route, "path", None) == "/products/{product_id}").response_field
+
+
+def fastapi_response(content) -> bytes:
+    """What FastAPI does with an endpoint's return value for ``response_model=FrontendProduct``"""
+    # Models are dumped to plain values before being validated again
+    prepared = jsonable_encoder(content)
+    value, errors = response_field.validate(prepared, {}, loc=("response",))
+    assert not errors
+    serialized = response_field.serialize(value, mode="json")
+    return json.dumps(serialized, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+ROUTE_PATHS = {
+    "legacy+response_model": lambda product: fastapi_response(legacy_conversion(product)),
+    "construct+response_model": lambda product: fastapi_response(construct_conversion(product)),
+    "validate+response_model": lambda product: fastapi_response(ProductService.product_to_frontend(product)),
+    "dict+response_model": lambda product: fastapi_response(ProductService.product_to_frontend_dict(product)),
+    "validate+model_response": lambda product: model_response(ProductService.product_to_frontend(product)).body,
+}
+
+
+@pytest.fixture(params=list(SIZES), ids=list(SIZES))
+def size(request):
+    return request.param
+
+
+@pytest.fixture
+def product(size):
+    return build_product(*SIZES[size])
+
+
+@pytest.mark.parametrize("conversion", list(CONVERSIONS))
+def test_product_to_frontend(benchmark, product, conversion):
+    benchmark.group = "product_to_frontend"
+    result = benchmark(CONVERSIONS[conversion], product)
+    assert result is not None
+
+
+@pytest.mark.parametrize("path", list(ROUTE_PATHS))
+def test_route_serialization(benchmark, product, path):
+    benchmark.group = "route"
+    body = benchmark(ROUTE_PATHS[path], product)
+    assert json.loads(body) == json.loads(fastapi_response(legacy_conversion(product)))
@@ -7,6 +7,7 @@ from app import models
 from app.models.base import Base
 from app.schemas import ProductCreate, ComponentCreate, OptionCreate, DependencyCreate, PriceRuleCreate, CategoryEnum, DependencyTypeEnum
 from app.models.enums import StockStatusEnum, OrderStatusEnum
+from app.services.price_range_service import PriceRangeService
 import datetime
 
 # Function to check if a column exists in a table
@@ -133,7 +134,7 @@ def update_schema():
             conn.execute(text("""
                 CREATE TABLE inventory (
                     id SERIAL PRIMARY KEY,
-                    option_id INTEGER NOT NULL,
+                    option_id INTEGER NOT NULL UNIQUE,
                     quantity INTEGER NOT NULL DEFAULT 0,
                     stock_status VARCHAR(20) NOT NULL,
                     low_stock_threshold INTEGER NOT NULL DEFAULT 5,
@@ -609,6 +610,9 @@ try:
     db.add(sample_order3)
     print("Created sample order 3")
 
+    # Store the configurable price range of every product
+    PriceRangeService.refresh_all(db)
+
     # Commit all changes
     db.commit()
     print("All data committed successfully!")
@@ -11,5 +11,6 @@ setup(
         "pydantic",
         "python-dotenv",
         "psycopg2-binary",
+        "orjson",
     ],
 ) 
\ No newline at end of file
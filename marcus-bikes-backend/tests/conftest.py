@@ -3,14 +3,29 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from app.models.base import Base
+from app.models import Product, Component, Option
+from app.models.enums import CategoryEnum
 from app.main import app
 from app.database.session import get_db
+from app.cache import catalog_cache, local_cache, response_cache
+from app import outbox
 
 # Create test database engine
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    # Cached catalog reads must not leak between tests
+    catalog_cache.clear()
+    local_cache.clear()
+    response_cache.clear()
+    yield
+    catalog_cache.clear()
+    local_cache.clear()
+    response_cache.clear()
+
 @pytest.fixture(scope="function")
 def db_session():
     # Create the test database tables
@@ -37,4 +52,41 @@ def client(db_session):
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear() 
\ No newline at end of file
+    app.dependency_overrides.clear() 
+@pytest.fixture
+def outbox_relay(monkeypatch):
+    # Outbox events are only recorded when a relay is configured (OUTBOX_SINKS)
+    relay = outbox.OutboxRelay(TestingSessionLocal, [])
+    monkeypatch.setattr(outbox, "outbox_relay", relay)
+    return relay
+
+@pytest.fixture
+def order_payload():
+    # A valid POST /orders body, fresh for each test
+    return {
+        "customer_name": "Test Customer",
+        "customer_email": "customer@example.com",
+        "shipping_address": "1 Test St",
+        "total_amount": 150.0,
+        "order_details": {"products": [{"id": "custom-bike", "quantity": 1}]}
+    }
+
+@pytest.fixture
+def create_product(db_session):
+    """Add and commit a product with {component: [(option, price) or (option, price, in_stock)]}"""
+    def create(product_id=None, name="Test Bike", components=None, category=CategoryEnum.BICYCLE, base_price=100.0):
+        product = Product(id=product_id, name=name, category=category, base_price=base_price)
+        db_session.add(product)
+        db_session.flush()
+        for component_name, options in (components or {}).items():
+            component = Component(name=component_name, product_id=product.id)
+            db_session.add(component)
+            db_session.flush()
+            db_session.add_all([
+                Option(name=option[0], price=option[1], in_stock=option[2] if len(option) > 2 else True,
+                       component_id=component.id)
+                for option in options
+            ])
+        db_session.commit()
+        return product
+    return create
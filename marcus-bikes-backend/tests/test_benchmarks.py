@@ -0,0 +1,69 @@
+import json
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.catalog_generator import CatalogSpec, generate_catalog, load_catalog, build_order
+from benchmarks.run import main, percentile
+from tests.conftest import engine
+from app.models import Product, Option, Inventory, Order
+
+def test_generate_catalog(db_session):
+    spec = CatalogSpec(products=8, components_per_product=3, options_per_component=2, orders=25)
+    generate_catalog(engine, spec)
+
+    assert db_session.query(Product).count() == 8
+    assert db_session.query(Option).count() == 8 * 3 * 2
+    assert db_session.query(Inventory).count() == 8 * 3 * 2
+    assert db_session.query(Order).count() == 25
+
+    catalog = load_catalog(engine)
+    assert catalog.product_ids == list(range(1, 9))
+    assert len(catalog.product_components[1]) == 3
+    assert catalog.orders == 25
+
+def test_build_order_is_valid_payload(client, db_session):
+    generate_catalog(engine, CatalogSpec(products=4, components_per_product=2, options_per_component=2, orders=0))
+    catalog = load_catalog(engine)
+
+    order = build_order(catalog, random.Random(1), items=2)
+    assert len(order["order_details"]["products"]) == 2
+    response = client.post("/orders/", json=order)
+    assert response.status_code == 201
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([3.0], 0.95) == 3.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_run_uses_database_url(tmp_path):
+    # A fresh interpreter, so the app is first imported by main() itself
+    output = tmp_path / "results.json"
+    environment = {name: value for name, value in os.environ.items() if name != "DATABASE_URL"}
+    subprocess.run(
+        [
+            sys.executable, "-c", "import sys; from benchmarks.run import main; sys.exit(main(sys.argv[1:]))",
+            "--database-url", f"sqlite:///{tmp_path / 'benchmark.db'}",
+            "--products", "4", "--orders", "10", "--requests", "2", "--output", str(output)
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=environment,
+        capture_output=True,
+        check=True,
+        timeout=120
+    )
+
+    report = json.loads(output.read_text())
+    assert report["database"] == "sqlite"
+    assert report["catalog"]["products"] == 4
+    assert all(scenario["errors"] == 0 for scenario in report["scenarios"].values())
+
+def test_run_refuses_a_database_the_app_is_not_bound_to(tmp_path):
+    with pytest.raises(SystemExit):
+        main(["--database-url", f"sqlite:///{tmp_path / 'other.db'}", "--output", str(tmp_path / "results.json")])
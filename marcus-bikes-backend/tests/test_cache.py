@@ -0,0 +1,295 @@
+import asyncio
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app.cache import Cache, ModelCodec, product_key, product_tag, option_tag
+from app.cache.backends import MemoryBackend, RedisBackend
+from app.cache.resp import RespConnection, RespError, encode_command
+from app.cache.singleflight import SingleFlight, FlightTimeout
+from app.schemas import CategoryProductCount
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server for the cache backend"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.data = {}
+        self.expiry = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def live(self, key):
+        if key in self.expiry and self.expiry[key] <= time.monotonic():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return self.data.get(key)
+
+    def run(self, name, *args):
+        now = time.monotonic()
+        if name in (b"SELECT", b"AUTH"):
+            return "+OK"
+        if name == b"GET":
+            return self.live(args[0])
+        if name == b"MGET":
+            return [self.live(key) for key in args]
+        if name == b"SET":
+            options = [arg.upper() for arg in args[2:]]
+            if b"NX" in options and self.live(args[0]) is not None:
+                return None
+            self.data[args[0]] = args[1]
+            self.expiry.pop(args[0], None)
+            if b"PX" in options:
+                self.expiry[args[0]] = now + int(args[3 + options.index(b"PX")]) / 1000
+            return "+OK"
+        if name == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == b"SADD":
+            members = self.data.setdefault(args[0], set())
+            members.update(args[1:])
+            return len(members)
+        if name == b"SMEMBERS":
+            return sorted(self.live(args[0]) or ())
+        if name == b"PEXPIRE":
+            self.expiry[args[0]] = now + int(args[1]) / 1000
+            return 1
+        if name == b"SCAN":
+            pattern = args[args.index(b"MATCH") + 1].decode()
+            return [b"0", [key for key in list(self.data) if self.live(key) is not None and fnmatch.fnmatch(key.decode(), pattern)]]
+        raise ValueError(f"unknown command {name!r}")
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            arguments = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                arguments.append(self.rfile.read(length + 2)[:-2])
+            try:
+                with self.server.lock:
+                    reply = self.server.run(arguments[0].upper(), *arguments[1:])
+            except ValueError as error:
+                reply = RespError(str(error))
+            self.wfile.write(encode_reply(reply))
+
+def encode_reply(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, RespError):
+        return b"-ERR %s\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return reply.encode() + b"\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(encode_reply(item) for item in reply)
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+@pytest.fixture
+def resp_server():
+    server = RespStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_memory_backend_lru_expiry_and_tags():
+    backend = MemoryBackend(max_entries=2)
+    backend.set_many({"a": 1, "b": 2}, ttl=60, tags={"a": ["x"], "b": ["x", "y"]})
+    assert backend.get_many(["a"]) == [1]
+    # "b" is the least recently used entry
+    backend.set_many({"c": 3}, ttl=60, tags={})
+    assert backend.get_many(["a", "b", "c"]) == [1, None, 3]
+
+    backend.set_many({"b": 2}, ttl=60, tags={"b": ["y"]})
+    backend.invalidate_tags(["x"])
+    assert backend.get_many(["a", "b"]) == [None, 2]
+
+    backend.set_many({"short": 1}, ttl=0.01, tags={})
+    time.sleep(0.02)
+    assert backend.get_many(["short"]) == [None]
+
+def test_resp_connection(resp_server):
+    connection = RespConnection.from_url(resp_server.url)
+    assert connection.execute("SET", "key", "value") == "OK"
+    assert connection.execute("GET", "key") == b"value"
+    replies = connection.pipeline([["MGET", "key", "missing"], ["BOGUS"], ["DEL", "key"]])
+    assert replies[0] == [b"value", None]
+    assert isinstance(replies[1], RespError)
+    assert replies[2] == 1
+    connection.close()
+
+def test_redis_backend(resp_server):
+    cache = Cache("test", RedisBackend(resp_server.url, namespace="test"), ttl=60)
+    codec = ModelCodec(CategoryProductCount)
+    count = CategoryProductCount(category="bicycles", count=2, min_price=100.0, max_price=200.0, in_stock_count=1)
+
+    cache.set_many(
+        {product_key(1): count, product_key(2): count},
+        tags={product_key(1): [product_tag(1), option_tag(5)], product_key(2): [product_tag(2)]},
+        codec=codec
+    )
+    assert cache.get_many([product_key(1), product_key(2), product_key(3)], codec=codec) == [count, count, None]
+    assert cache.stats() == (2, 1)
+
+    # Dropping an option's tag drops every product holding it
+    cache.invalidate_tags(option_tag(5))
+    assert cache.get_many([product_key(1), product_key(2)], codec=codec) == [None, count]
+
+    cache.set("counts", {"bicycles": 2})
+    assert cache.get("counts") == {"bicycles": 2}
+    cache.clear()
+    assert cache.get("counts") is None
+    assert not resp_server.data
+
+    backend = cache.backend
+    assert backend.acquire_lock("counts", ttl=60)
+    assert not backend.acquire_lock("counts", ttl=60)
+    backend.release_lock("counts")
+    assert backend.acquire_lock("counts", ttl=60)
+
+def test_shared_response_bodies(resp_server, monkeypatch):
+    from app import responses
+    from app.encoding import COMPRESSION_MINIMUM_SIZE, ENCODINGS
+    from app.responses import EncodedBody, ENCODED_BODY_CODEC
+
+    # Two nodes sharing the server
+    writer = Cache("responses", RedisBackend(resp_server.url, namespace="test:responses"), ttl=60)
+    reader = Cache("responses", RedisBackend(resp_server.url, namespace="test:responses"), ttl=60)
+    body = b'{"name": "Bike"}' * COMPRESSION_MINIMUM_SIZE
+    writer.set(product_key(1), EncodedBody(body), tags=[product_tag(1)], codec=ENCODED_BODY_CODEC)
+    writer.set("small", EncodedBody(b"{}"), codec=ENCODED_BODY_CODEC)
+
+    # Variants are read, not compressed again
+    monkeypatch.setattr(responses, "compress", lambda body, encoding: pytest.fail("compressed again"))
+    cached = reader.get(product_key(1), codec=ENCODED_BODY_CODEC)
+    assert cached.body == body
+    for encoding in ENCODINGS:
+        assert cached.variant(encoding)
+    assert reader.get("small", codec=ENCODED_BODY_CODEC).body == b"{}"
+
+    # A write on one node drops the body for every node
+    writer.invalidate_tags(product_tag(1))
+    assert reader.get(product_key(1), codec=ENCODED_BODY_CODEC) is None
+
+def test_redis_backend_unavailable():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    cache = Cache("test", RedisBackend(f"redis://127.0.0.1:{port}/0", timeout=0.1), ttl=60)
+
+    # Without a server every read is a miss and values are loaded each time
+    cache.set("counts", 1)
+    assert cache.get("counts") is None
+    assert cache.get_or_set("counts", lambda: 2) == 2
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_get_or_set_loads_once(shared, request):
+    if shared:
+        backend = RedisBackend(request.getfixturevalue("resp_server").url, namespace="test")
+    else:
+        backend = MemoryBackend()
+    cache = Cache("test", backend, ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"value": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("key", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 8
+
+def run_threads(count, target):
+    results = []
+    def call():
+        try:
+            results.append(target())
+        except Exception as error:
+            results.append(error)
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_single_flight_shares_results_and_errors():
+    flights = SingleFlight()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return len(calls)
+
+    assert run_threads(8, lambda: flights.do("key", loader)) == [1] * 8
+    assert flights.coalesced == 7
+    assert not flights.in_flight("key")
+
+    # Done calls are forgotten: the next caller loads again
+    assert flights.do("key", loader) == 2
+
+    def failing():
+        time.sleep(0.05)
+        raise ValueError("database down")
+
+    errors = run_threads(4, lambda: flights.do("failing", failing))
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert not flights.in_flight("failing")
+
+def test_single_flight_timeout():
+    flights = SingleFlight(timeout=0.01)
+    results = run_threads(3, lambda: flights.do("slow", lambda: time.sleep(0.1) or "done"))
+    # The leader finishes, the others give up waiting
+    assert results.count("done") == 1
+    assert sum(isinstance(result, FlightTimeout) for result in results) == 2
+
+def test_single_flight_async_and_sync_callers():
+    flights = SingleFlight()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "product"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.do_async("key", loader))
+        await asyncio.sleep(0)
+        # A sync route in the threadpool joins the async load
+        sync_waiter = asyncio.get_running_loop().run_in_executor(None, flights.do, "key", lambda: "not called")
+        results = await asyncio.gather(leader, flights.do_async("key", loader), sync_waiter)
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("database down")
+
+        errors = await asyncio.gather(*[flights.do_async("failing", failing) for _ in range(3)], return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(scenario())
+    assert results == ["product"] * 3
+    assert len(calls) == 1
+    assert all(isinstance(error, ValueError) for error in errors)
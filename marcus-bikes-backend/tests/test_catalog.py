@@ -0,0 +1,74 @@
+from app.models import Option
+
+def product_payload(product_id, name):
+    return {
+        "id": product_id,
+        "name": name,
+        "category": "bicycle",
+        "base_price": 100.0,
+        "components": [{"name": "Frame", "options": [{"name": "Steel", "price": 50.0}, {"name": "Carbon", "price": 200.0}]}],
+        "dependencies": [],
+        "price_rules": []
+    }
+
+def test_catalog_changes(client, db_session):
+    snapshot = client.get("/catalog/snapshot").json()
+    assert snapshot == {"version": 0, "products": []}
+
+    assert client.post("/products/", json=product_payload(1, "Road Bike")).status_code == 201
+    assert client.post("/products/", json=product_payload(2, "City Bike")).status_code == 201
+
+    snapshot = client.get("/catalog/snapshot").json()
+    # A product, a component and two options each
+    assert snapshot["version"] == 8
+    assert [product["id"] for product in snapshot["products"]] == [1, 2]
+
+    changes = client.get("/catalog/changes?since=8").json()
+    assert changes == {"version": 8, "has_more": False, "changes": [], "products": [], "deleted_product_ids": []}
+
+    # An edit, a stock flip and a deletion
+    option_id = db_session.query(Option).filter(Option.name == "Carbon").first().id
+    assert client.put("/products/1", json={"id": 1, "name": "Race Bike", "category": "bicycle"}).status_code == 200
+    assert client.put(f"/options/{option_id}/stock?in_stock=false").status_code == 200
+    assert client.put(f"/options/{option_id}/stock?in_stock=false").status_code == 200
+    assert client.delete("/products/2").status_code == 204
+
+    changes = client.get("/catalog/changes?since=8").json()
+    assert changes["version"] == 11
+    assert [(change["entity_type"], change["operation"], change["product_id"]) for change in changes["changes"]] == [
+        ("product", "updated", 1), ("option", "stock", 1), ("product", "deleted", 2)
+    ]
+    assert [product["name"] for product in changes["products"]] == ["Race Bike"]
+    assert changes["products"][0]["components"][0]["options"][1]["inStock"] is False
+    assert changes["deleted_product_ids"] == [2]
+
+    # Paging, keeping only the latest change of each entity
+    page = client.get("/catalog/changes?since=0&limit=3").json()
+    assert (page["version"], page["has_more"]) == (3, True)
+    page = client.get("/catalog/changes?since=0&limit=20").json()
+    assert page["has_more"] is False
+    assert len(page["changes"]) == 8
+    assert [change["version"] for change in page["changes"]][-3:] == [9, 10, 11]
+
+    assert client.get("/catalog/changes?since=-1").status_code == 400
+    assert client.get("/catalog/changes?since=50").status_code == 409
+
+def test_sync_reads_past_a_stale_product_cache(client, db_session):
+    from app.cache import catalog_cache, product_key
+    from app.controllers.product_controller import PRODUCT_CODEC
+    from app.services.product_service import ProductService
+
+    assert client.post("/products/", json=product_payload(1, "Road Bike")).status_code == 201
+    version = client.get("/catalog/snapshot").json()["version"]
+    # This worker caches the product, then another worker renames it: this
+    # worker's cache is not invalidated
+    assert client.get("/products/1").json()["name"] == "Road Bike"
+    cached = catalog_cache.get(product_key(1), codec=PRODUCT_CODEC)
+    ProductService.update_product(db_session, 1, {"name": "Race Bike"})
+    catalog_cache.set(product_key(1), cached, codec=PRODUCT_CODEC)
+    assert client.get("/products/1").json()["name"] == "Road Bike"
+
+    changes = client.get(f"/catalog/changes?since={version}").json()
+    assert changes["version"] == version + 1
+    assert [product["name"] for product in changes["products"]] == ["Race Bike"]
+    assert [product["name"] for product in client.get("/catalog/snapshot").json()["products"]] == ["Race Bike"]
@@ -0,0 +1,70 @@
+import gzip
+
+from app.cache import response_cache, product_key
+from app.encoding import choose_encoding
+from app.middleware import compression
+from app.middleware.compression import add_vary
+from app.services.product_service import ProductService
+
+# Large enough for its responses to be compressed
+LARGE_PRODUCT = {f"Component {c}": [(f"Option {c}-{o}", 10.0 * o) for o in range(10)] for c in range(5)}
+
+def test_choose_encoding():
+    assert choose_encoding(None, ("br", "gzip")) is None
+    assert choose_encoding("gzip, deflate, br", ("br", "gzip")) == "br"
+    assert choose_encoding("gzip, deflate, br", ("gzip",)) == "gzip"
+    assert choose_encoding("br;q=0.5, gzip;q=0.8", ("br", "gzip")) == "gzip"
+    assert choose_encoding("gzip;q=0, identity", ("br", "gzip")) is None
+    assert choose_encoding("*", ("br", "gzip")) == "br"
+    assert choose_encoding("*;q=0.1, br;q=0", ("br", "gzip")) == "gzip"
+
+def test_add_vary():
+    assert add_vary([]) == [(b"vary", b"accept-encoding")]
+    assert add_vary([(b"vary", b"Origin")]) == [(b"vary", b"Origin, accept-encoding")]
+    assert add_vary([(b"vary", b"Accept-Encoding")]) == [(b"vary", b"Accept-Encoding")]
+
+def test_compressed_responses(client, db_session, create_product):
+    create_product(1, "Big Bike", LARGE_PRODUCT)
+
+    # Compressed by the middleware above the size threshold
+    response = client.get("/products/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json()[0]["name"] == "Big Bike"
+
+    identity = client.get("/products/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert "accept-encoding" in identity.headers["vary"].lower()
+    assert identity.json() == response.json()
+
+    # Small bodies are sent as they are, but still vary by encoding
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "accept-encoding" in response.headers["vary"].lower()
+
+def test_precompressed_cached_responses(client, db_session, monkeypatch, create_product):
+    create_product(1, "Big Bike", LARGE_PRODUCT)
+    calls = []
+    original = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda body, encoding: calls.append(encoding) or original(body, encoding))
+    monkeypatch.setattr("app.responses.compress", compression.compress)
+
+    first = client.get("/products/1", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/products/1", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert second.json() == first.json()
+    # Compressed once, then served from the response cache
+    assert calls == ["gzip"]
+    cached = response_cache.get(product_key(1))
+    assert gzip.decompress(cached.variant("gzip")) == cached.body
+
+    plain = client.get("/products/1", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == cached.body
+
+    # Writes drop the cached body and its variants
+    ProductService.update_product(db_session, 1, {"name": "Renamed Bike"})
+    assert response_cache.get(product_key(1)) is None
+    assert client.get("/products/1", headers={"Accept-Encoding": "gzip"}).json()["name"] == "Renamed Bike"
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import threading
+
+from app.events import BroadcastHub, catalog_events, event_stream, format_event, RESYNC_FRAME, RETRY_FRAME
+from app.models import Product, Component, Option, Inventory
+from app.models.enums import CategoryEnum
+from app.services.inventory_service import InventoryService
+
+def parse_event(frame):
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+def test_format_event():
+    assert format_event("catalog", {"product_id": 1}, event_id=7) == b'id: 7\nevent: catalog\ndata: {"product_id":1}\n\n'
+
+def test_broadcast_hub():
+    async def scenario():
+        hub = BroadcastHub(queue_size=2)
+        everything = hub.subscribe()
+        product_two = hub.subscribe(product_id=2)
+
+        # Published from another thread, like a sync route committing
+        thread = threading.Thread(target=hub.publish, args=("catalog", {"product_id": 1}))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+        hub.publish("catalog", {"product_id": 2})
+        assert parse_event(await everything.get())[1] == {"product_id": 1}
+        assert parse_event(await everything.get())[1] == {"product_id": 2}
+        assert parse_event(await product_two.get(timeout=1))[1] == {"product_id": 2}
+
+        # A client that does not keep up gets one resync event instead of the backlog
+        for product_id in range(3):
+            hub.publish("catalog", {"product_id": product_id})
+        assert await everything.get() == RESYNC_FRAME
+        assert everything.dropped == 3
+        assert everything.queue.empty()
+
+        hub.unsubscribe(everything)
+        hub.unsubscribe(product_two)
+        assert hub.subscriber_count == 0
+
+    asyncio.run(scenario())
+
+def test_event_stream_closes_subscription():
+    async def scenario():
+        hub = BroadcastHub()
+        stream = event_stream(hub, product_id=3)
+        assert await stream.__anext__() == RETRY_FRAME
+        assert hub.subscriber_count == 1
+        hub.publish("catalog", {"product_id": 3})
+        assert parse_event(await stream.__anext__())[1] == {"product_id": 3}
+        await stream.aclose()
+        assert hub.subscriber_count == 0
+
+    asyncio.run(scenario())
+
+def test_stock_flip_events(db_session):
+    db_session.add(Product(id=1, name="Bike", category=CategoryEnum.BICYCLE, base_price=100.0))
+    db_session.flush()
+    component = Component(name="Frame", product_id=1)
+    db_session.add(component)
+    db_session.flush()
+    option = Option(name="Steel", price=50.0, in_stock=True, component_id=component.id)
+    db_session.add(option)
+    db_session.commit()
+    option_id = option.id
+
+    db_session.add(Inventory(option_id=option_id, quantity=5))
+    db_session.commit()
+
+    async def scenario():
+        subscription = catalog_events.subscribe(product_id=1)
+        try:
+            # Out of stock, then a quantity change that keeps the flag
+            await asyncio.to_thread(InventoryService.update_inventory, db_session, option_id, {"quantity": 0})
+            await asyncio.to_thread(InventoryService.update_inventory, db_session, option_id, {"quantity": 0})
+            event, data = parse_event(await subscription.get(timeout=1))
+            assert event == "catalog"
+            assert data == {
+                "version": data["version"], "entity_type": "option", "entity_id": option_id,
+                "product_id": 1, "operation": "stock", "in_stock": False
+            }
+            assert subscription.queue.empty()
+        finally:
+            catalog_events.unsubscribe(subscription)
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from app.middleware.idempotency import client_identity
+from app.models import Order, IdempotencyKey
+from app.services.idempotency_service import IdempotencyService
+
+# The identity of requests sent by the test client without credentials
+TEST_CLIENT = client_identity({"headers": [], "client": ("testclient", 50000)})
+
+def test_order_creation_is_replayed(client, db_session, order_payload):
+    headers = {"Idempotency-Key": "order-1"}
+    first = client.post("/orders/", json=order_payload, headers=headers)
+    assert first.status_code == 201
+    assert "idempotent-replayed" not in first.headers
+
+    # The retry gets the stored response without creating another order
+    retry = client.post("/orders/", json=order_payload, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert retry.headers["content-type"] == first.headers["content-type"]
+    assert db_session.query(Order).count() == 1
+
+    # The same key with another request is rejected
+    response = client.post("/orders/", json={**order_payload, "total_amount": 300.0}, headers=headers)
+    assert response.status_code == 422
+    assert db_session.query(Order).count() == 1
+
+    # Other keys and requests without a key run as usual
+    assert client.post("/orders/", json=order_payload, headers={"Idempotency-Key": "order-2"}).status_code == 201
+    assert client.post("/orders/", json=order_payload).status_code == 201
+    assert db_session.query(Order).count() == 3
+
+    assert client.post("/orders/", json=order_payload, headers={"Idempotency-Key": "x" * 256}).status_code == 400
+
+def test_keys_are_scoped_per_client(client, db_session, order_payload):
+    assert client.post("/orders/", json=order_payload, headers={"Idempotency-Key": "shared"}).status_code == 201
+
+    # Another client using the same key gets its own order
+    response = client.post("/orders/", json=order_payload, headers={"Idempotency-Key": "shared", "Authorization": "Bearer other"})
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+    assert db_session.query(Order).count() == 2
+    assert db_session.query(IdempotencyKey).filter_by(key="shared", client=TEST_CLIENT).count() == 1
+
+def test_errors_and_other_routes_are_replayed(client, db_session):
+    response = client.delete("/orders/999", headers={"Idempotency-Key": "delete-1"})
+    assert response.status_code == 404
+    record = db_session.query(IdempotencyKey).filter_by(key="delete-1").one()
+    assert record.route == "DELETE /orders/999"
+    assert record.status_code == 404
+    assert ["content-type", "application/json"] in record.response_headers
+
+    replay = client.delete("/orders/999", headers={"Idempotency-Key": "delete-1"})
+    assert replay.status_code == 404
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.json() == response.json()
+
+def test_in_progress_and_expired_keys(client, db_session, order_payload):
+    now = datetime.utcnow()
+    db_session.add_all([
+        # Claimed by a request still running
+        IdempotencyKey(client=TEST_CLIENT, route="POST /orders/", key="running", request_hash="0" * 64,
+                       created_at=now, expires_at=now + timedelta(hours=1)),
+        # Claimed by a request whose worker died
+        IdempotencyKey(client=TEST_CLIENT, route="POST /orders/", key="abandoned", request_hash="0" * 64,
+                       created_at=now - timedelta(minutes=5), expires_at=now + timedelta(hours=1)),
+        IdempotencyKey(client=TEST_CLIENT, route="POST /orders/", key="expired", request_hash="0" * 64, status_code=201,
+                       response_body=b"{}", created_at=now - timedelta(days=1), expires_at=now - timedelta(seconds=1)),
+    ])
+    db_session.commit()
+
+    response = client.post("/orders/", json=order_payload, headers={"Idempotency-Key": "running"})
+    assert response.status_code == 409
+    assert db_session.query(Order).count() == 0
+
+    # Expired keys and claims past their lease are claimed again by the next request
+    for key in ("expired", "abandoned"):
+        response = client.post("/orders/", json=order_payload, headers={"Idempotency-Key": key})
+        assert response.status_code == 201
+        assert "idempotent-replayed" not in response.headers
+    assert db_session.query(Order).count() == 2
+
+    assert IdempotencyService.delete_expired(db_session, now=now + timedelta(days=2)) == 3
+    assert db_session.query(IdempotencyKey).count() == 0
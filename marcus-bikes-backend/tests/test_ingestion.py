@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+
+from app import ingestion
+from app.ingestion import OrderIngestion, IngestionConfigurationError
+from app.models import Order
+from app.schemas import OrderCreate
+from tests.conftest import TestingSessionLocal
+
+@pytest.fixture
+def order_queue(tmp_path, db_session, monkeypatch):
+    # Started and stopped by the app lifespan when requested before the client;
+    # a long flush interval leaves the writes to the test's drain() calls
+    queue = OrderIngestion(str(tmp_path / "orders.jsonl"), TestingSessionLocal, flush_interval=60)
+    monkeypatch.setattr(ingestion, "order_ingestion", queue)
+    return queue
+
+def test_orders_are_queued_then_written(order_queue, client, db_session, order_payload):
+    references = []
+    for index in range(3):
+        response = client.post("/orders/", json={**order_payload, "customer_name": f"Customer {index}"})
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+        references.append(response.json()["reference"])
+    assert db_session.query(Order).count() == 0
+    assert client.get(f"/orders/ingestion/{references[0]}").json()["status"] == "queued"
+    assert client.get("/orders/ingestion").json() == {"queued": 3, "written": 0, "failed": 0, "batches": 0}
+
+    # Written in batches of two
+    order_queue.batch_size = 2
+    assert order_queue.drain() == 3
+    assert client.get("/orders/ingestion").json() == {"queued": 0, "written": 3, "failed": 0, "batches": 2}
+    orders = db_session.query(Order).order_by(Order.id).all()
+    assert [order.customer_name for order in orders] == ["Customer 0", "Customer 1", "Customer 2"]
+    assert [order.reference for order in orders] == references
+    assert orders[0].status.value == "pending"
+
+    status = client.get(f"/orders/ingestion/{references[1]}").json()
+    assert status == {"reference": references[1], "status": "written", "order_id": orders[1].id, "error": None}
+    assert client.get("/orders/ingestion/unknown").status_code == 404
+
+    # The journal is emptied once everything in it is written
+    assert order_queue.offset == 0
+    assert open(order_queue.path, "rb").read() == b""
+
+    # Validation still happens before anything is queued
+    assert client.post("/orders/", json={"customer_name": "Incomplete"}).status_code == 422
+
+def test_queued_orders_survive_a_restart(tmp_path, db_session, monkeypatch, order_payload):
+    path = str(tmp_path / "orders.jsonl")
+    first = OrderIngestion(path, TestingSessionLocal, flush_interval=60)
+    first.start()
+    references = [first.enqueue(OrderCreate(**order_payload)) for _ in range(2)]
+    # Crash: the orders were never written, and the last append was torn
+    monkeypatch.setattr(first, "drain", lambda: 0)
+    first.stop()
+    with open(path, "ab") as journal:
+        journal.write(b'{"reference": "torn')
+
+    second = OrderIngestion(path, TestingSessionLocal, flush_interval=60)
+    second.open()
+    assert second.stats().queued == 2
+    assert second.drain() == 2
+    assert {order.reference for order in db_session.query(Order)} == set(references)
+    second.close()
+
+def test_replayed_batches_are_not_written_twice(tmp_path, db_session, order_payload):
+    path = str(tmp_path / "orders.jsonl")
+    queue = OrderIngestion(path, TestingSessionLocal, flush_interval=60)
+    queue.start()
+    reference = queue.enqueue(OrderCreate(**order_payload))
+    journal = open(path, "rb").read()
+    assert queue.drain() == 1
+
+    # As if the offset had not been saved before a crash
+    with open(path, "ab") as file:
+        file.write(journal)
+    assert queue.drain() == 0
+    assert db_session.query(Order).filter_by(reference=reference).count() == 1
+    queue.stop()
+
+    # A crash between committing a batch and saving the offset: after a
+    # restart the order is queued again until its batch is skipped
+    with open(path, "wb") as file:
+        file.write(journal)
+    restarted = OrderIngestion(path, TestingSessionLocal, flush_interval=60)
+    restarted.open()
+    assert restarted.get_status(db_session, reference).status == "queued"
+    assert restarted.drain() == 0
+    status = restarted.get_status(db_session, reference)
+    assert (status.status, status.order_id) == ("written", db_session.query(Order.id).filter_by(reference=reference).scalar())
+    assert restarted.stats().queued == 0
+    restarted.close()
+
+def test_journal_used_by_another_worker(tmp_path):
+    path = str(tmp_path / "orders.jsonl")
+    first = OrderIngestion(path, TestingSessionLocal, flush_interval=60)
+    first.start()
+    # Creating the second one is harmless, starting it is a configuration error
+    second = OrderIngestion(path, TestingSessionLocal, flush_interval=60)
+    with pytest.raises(IngestionConfigurationError, match="ORDER_INGESTION_PATH"):
+        second.start()
+    first.stop()
+
+def test_worker_keeps_going_after_errors(tmp_path, db_session, monkeypatch, order_payload):
+    monkeypatch.setattr(ingestion, "RETRY_DELAY", 0.01)
+    queue = OrderIngestion(str(tmp_path / "orders.jsonl"), TestingSessionLocal, flush_interval=0.01)
+    original_drain = queue.drain
+    attempts = []
+    recovered = threading.Event()
+
+    def drain():
+        attempts.append(1)
+        if len(attempts) <= 2:
+            raise ValueError("unexpected order")
+        written = original_drain()
+        recovered.set()
+        return written
+
+    monkeypatch.setattr(queue, "drain", drain)
+    queue.start()
+    reference = queue.enqueue(OrderCreate(**order_payload))
+    assert recovered.wait(5)
+    assert queue.alive()
+    assert queue.failures == 0
+    monkeypatch.setattr(queue, "drain", original_drain)
+    queue.stop()
+    assert db_session.query(Order).filter_by(reference=reference).count() == 1
+
+def test_ready_reports_a_stopped_worker(order_queue, client):
+    assert client.get("/ready").json() == {"status": "ready", "cache": "disabled", "ingestion": "running"}
+
+    # The journal writer gave up after a failed append
+    order_queue._append_error = OSError("No space left on device")
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["ingestion"] == "stopped"
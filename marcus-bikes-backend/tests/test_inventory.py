@@ -128,4 +128,135 @@ def test_inventory_api_endpoints(client):
     response = client.get("/inventory/")
     assert response.status_code == 200
     data = response.json()
-    assert len(data) > 0 
\ No newline at end of file
+    assert len(data) > 0 
+
+def test_inventory_create_is_upsert(client, db_session):
+    product = Product(name="Test Bike", category=CategoryEnum.BICYCLE, base_price=100.0)
+    db_session.add(product)
+    db_session.flush()
+    component = Component(name="Frame", product_id=product.id)
+    db_session.add(component)
+    db_session.flush()
+    option = Option(name="Carbon", price=200.0, in_stock=True, component_id=component.id)
+    db_session.add(option)
+    db_session.commit()
+    option_id = option.id
+
+    inventory_data = {"option_id": option_id, "quantity": 10, "low_stock_threshold": 5}
+    response = client.post("/inventory/", json=inventory_data)
+    assert response.status_code == 201
+    assert response.json()["stock_status"] == "in_stock"
+
+    # Posting again for the same option replaces the record instead of duplicating it
+    response = client.post("/inventory/", json={**inventory_data, "quantity": 0})
+    assert response.status_code == 201
+    assert response.json()["stock_status"] == "out_of_stock"
+    assert db_session.query(Inventory).filter(Inventory.option_id == option_id).count() == 1
+
+    option = db_session.query(Option).filter(Option.id == option_id).first()
+    assert option.in_stock is False
+    assert option.stock_quantity == 0
+
+def test_inventory_update_recomputes_status(client, db_session):
+    db_session.add(Inventory(option_id=1, quantity=10, stock_status=StockStatusEnum.IN_STOCK, low_stock_threshold=5))
+    db_session.commit()
+
+    response = client.patch("/inventory/option/1", json={"quantity": 3})
+    assert response.status_code == 200
+    assert response.json()["quantity"] == 3
+    assert response.json()["stock_status"] == "limited_stock"
+
+    response = client.patch("/inventory/option/1", json={"quantity": 3, "low_stock_threshold": 2})
+    assert response.json()["stock_status"] == "in_stock"
+
+    response = client.patch("/inventory/option/999", json={"quantity": 3})
+    assert response.status_code == 404
+
+def test_inventory_delete_is_one_transaction(db_session, create_product, monkeypatch):
+    from app.services.inventory_service import InventoryService
+    from app.services.catalog_change_service import CatalogChangeService
+
+    product = create_product(components={"Frame": [("Carbon", 200.0)]})
+    option_id = product.components[0].options[0].id
+    db_session.add(Inventory(option_id=option_id, quantity=5, stock_status=StockStatusEnum.IN_STOCK, low_stock_threshold=2))
+    db_session.commit()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("change log unavailable")
+
+    # A failure while setting the option out of stock keeps the record too
+    monkeypatch.setattr(CatalogChangeService, "record_stock", fail)
+    with pytest.raises(RuntimeError):
+        InventoryService.delete_inventory(db_session, option_id)
+    db_session.rollback()
+    assert db_session.query(Inventory).filter(Inventory.option_id == option_id).count() == 1
+    assert db_session.get(Option, option_id).in_stock is True
+
+    monkeypatch.undo()
+    assert InventoryService.delete_inventory(db_session, option_id)
+    assert db_session.query(Inventory).filter(Inventory.option_id == option_id).count() == 0
+    option = db_session.get(Option, option_id)
+    assert (option.in_stock, option.stock_quantity) == (False, 0)
+
+def test_inventory_listing(client, db_session):
+    from app.middleware.query_timing import parse_query_count
+
+    db_session.add(Product(id=1, name="Bike", category=CategoryEnum.BICYCLE, base_price=100.0))
+    db_session.add(Product(id=2, name="Skis", category=CategoryEnum.SKI, base_price=200.0))
+    db_session.flush()
+    quantities = {"Carbon": 8, "Steel": 0, "Carbon_Pro": 3, "Wood": 8}
+    for product_id, component_name, option_names in [(1, "Frame", ["Carbon", "Steel", "Carbon_Pro"]), (2, "Core", ["Wood"])]:
+        component = Component(name=component_name, product_id=product_id)
+        db_session.add(component)
+        db_session.flush()
+        for option_name in option_names:
+            option = Option(name=option_name, price=10.0, component_id=component.id)
+            db_session.add(option)
+            db_session.flush()
+            quantity = quantities[option_name]
+            db_session.add(Inventory(
+                option_id=option.id,
+                quantity=quantity,
+                low_stock_threshold=5,
+                stock_status=StockStatusEnum.OUT_OF_STOCK if quantity == 0
+                else StockStatusEnum.LIMITED_STOCK if quantity <= 5 else StockStatusEnum.IN_STOCK
+            ))
+    db_session.commit()
+
+    response = client.get("/inventory/listing")
+    assert response.status_code == 200
+    assert parse_query_count(response.headers["server-timing"]) == 1
+    page = response.json()
+    assert page["next_cursor"] is None
+    assert page["items"][0] == {
+        "id": 1, "option_id": 1, "option_name": "Carbon",
+        "component_id": 1, "component_name": "Frame",
+        "product_id": 1, "product_name": "Bike", "product_category": "bicycle",
+        "quantity": 8, "low_stock_threshold": 5, "stock_status": "in_stock"
+    }
+
+    def names(query):
+        return [item["option_name"] for item in client.get(f"/inventory/listing?{query}").json()["items"]]
+
+    assert names("product_id=2") == ["Wood"]
+    assert names("component_id=1&stock_status=out_of_stock") == ["Steel"]
+    assert names("category=bicycle&stock_status=limited_stock") == ["Carbon_Pro"]
+    # Prefix match is case-insensitive and LIKE wildcards are literal
+    assert names("name=carbon") == ["Carbon", "Carbon_Pro"]
+    assert names("name=Carbon_") == ["Carbon_Pro"]
+
+    # Follow the cursor through quantity-sorted pages, ties broken by id
+    for sort, expected in [("quantity", ["Steel", "Carbon_Pro", "Carbon", "Wood"]),
+                           ("-quantity", ["Wood", "Carbon", "Carbon_Pro", "Steel"])]:
+        page = client.get(f"/inventory/listing?sort={sort}&limit=1").json()
+        seen = [item["option_name"] for item in page["items"]]
+        while page["next_cursor"]:
+            page = client.get(f"/inventory/listing?sort={sort}&limit=1&cursor={page['next_cursor']}").json()
+            seen.extend(item["option_name"] for item in page["items"])
+        assert seen == expected
+
+    assert client.get("/inventory/listing?sort=price").status_code == 400
+    assert client.get("/inventory/listing?stock_status=plenty").status_code == 400
+    assert client.get("/inventory/listing?limit=0").status_code == 400
+    assert client.get("/inventory/listing?limit=501").status_code == 400
+    assert client.get("/inventory/listing?limit=500").status_code == 200
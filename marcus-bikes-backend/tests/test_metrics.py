@@ -0,0 +1,43 @@
+import pytest
+
+from app.metrics import Histogram, REQUEST_DURATION, register_cache, unregister_cache
+
+@pytest.fixture
+def test_cache():
+    register_cache("test_cache", lambda: (3, 1))
+    yield "test_cache"
+    unregister_cache("test_cache")
+
+def test_metrics_endpoint_reports_route_templates(client):
+    before = REQUEST_DURATION.count("GET", "/orders/{order_id}")
+    client.get("/orders/12345")
+    client.get("/orders/67890")
+    assert REQUEST_DURATION.count("GET", "/orders/{order_id}") == before + 2
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/orders/{order_id}",le="+Inf"}' in body
+    assert 'http_requests_total{method="GET",route="/orders/{order_id}",status="404"}' in body
+    assert "/orders/12345" not in body
+    assert "http_requests_in_flight" in body
+    assert "db_queries_total" in body
+    assert 'db_pool_connections{state="checkedout"}' in body
+
+def test_metrics_reports_registered_caches(client, test_cache):
+    body = client.get("/metrics").text
+    assert "# TYPE cache_hits_total counter" in body
+    assert "# TYPE cache_misses_total counter" in body
+    assert 'cache_hits_total{cache="test_cache"} 3' in body
+    assert 'cache_hit_ratio{cache="test_cache"} 0.75' in body
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    lines = histogram.render()
+    assert 'test_seconds_bucket{le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+    assert "test_seconds_count 4" in lines
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from app.database.partitions import next_month, partition_name, partition_month, ensure_monthly_partitions
+from app.models import Order, ArchivedOrder
+from app.models.enums import OrderStatusEnum
+from app.order_archive import run_maintenance
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+def create_order(db_session, status, age_days):
+    created_at = NOW - timedelta(days=age_days)
+    order = Order(
+        customer_name=f"{status.value} customer",
+        customer_email="archive@example.com",
+        shipping_address="1 Archive St",
+        total_amount=250.0,
+        status=status,
+        created_at=created_at,
+        updated_at=created_at,
+        product_categories="bicycle",
+        order_details={"products": [{"id": 1, "quantity": 1}]}
+    )
+    db_session.add(order)
+    db_session.commit()
+    return order.id
+
+def test_old_finished_orders_are_archived(client, db_session):
+    old_completed = create_order(db_session, OrderStatusEnum.COMPLETED, 400)
+    old_canceled = create_order(db_session, OrderStatusEnum.CANCELED, 500)
+    old_pending = create_order(db_session, OrderStatusEnum.PENDING, 400)
+    recent_completed = create_order(db_session, OrderStatusEnum.COMPLETED, 10)
+    before = client.get(f"/orders/{old_completed}").json()
+
+    result = run_maintenance(db_session, archive_after=timedelta(days=365), batch_size=1, now=NOW)
+    assert result == {"partitions_created": [], "archived": 2, "partitions_dropped": []}
+
+    remaining = [order.id for order in db_session.query(Order).order_by(Order.id)]
+    assert remaining == [old_pending, recent_completed]
+    archived = db_session.query(ArchivedOrder).order_by(ArchivedOrder.id).all()
+    assert [(order.id, order.status) for order in archived] == [(old_completed, "completed"), (old_canceled, "canceled")]
+    assert archived[0].data[:2] == b"\x1f\x8b"
+
+    # Reads by ID do not depend on where the order lives
+    assert client.get(f"/orders/{old_completed}").json() == before
+    assert client.get(f"/orders/{old_canceled}").json()["status"] == "canceled"
+    assert [order["id"] for order in client.get("/orders/").json()] == [recent_completed, old_pending]
+    # Archived orders are read-only
+    response = client.patch(f"/orders/{old_completed}", json={"status": "shipped"})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Order is archived and read-only"
+    assert client.delete(f"/orders/{old_completed}").status_code == 409
+    assert client.patch("/orders/999", json={"status": "shipped"}).status_code == 404
+    result = client.patch("/orders/bulk-status", json={"order_ids": [old_canceled, 999, old_pending], "status": "processing"}).json()
+    assert result["updated"] == [old_pending]
+    assert result["failed"] == [
+        {"order_id": old_canceled, "current_status": "canceled", "reason": "Order is archived and read-only"},
+        {"order_id": 999, "current_status": None, "reason": "Order not found"},
+    ]
+    assert client.get("/orders/999").status_code == 404
+
+    assert run_maintenance(db_session, archive_after=timedelta(days=365), now=NOW)["archived"] == 0
+
+def test_partition_names(db_session):
+    assert next_month(datetime(2026, 12, 15)) == datetime(2027, 1, 1)
+    assert partition_name("orders", datetime(2026, 3, 1)) == "orders_p202603"
+    assert partition_month("orders", "orders_p202603") == datetime(2026, 3, 1)
+    assert partition_month("orders", "orders_default") is None
+    # Only Postgres tables are partitioned
+    assert ensure_monthly_partitions(db_session, "orders") == []
@@ -1,7 +1,13 @@
+import json
 import pytest
 from datetime import datetime
-from app.models import Order, Product
+from decimal import Decimal
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models import Order, Product, OutboxEvent
 from app.models.enums import OrderStatusEnum, CategoryEnum
+from app.responses import FastJSONResponse
+from app.schemas.enums import OrderStatusEnum as SchemaOrderStatusEnum
 
 def test_create_order(db_session):
     # Create a product first
@@ -112,4 +118,132 @@ def test_order_api_endpoints(client):
     assert response.status_code == 200
     data = response.json()
     assert len(data) > 0
-    assert any(o["customer_name"] == order_data["customer_name"] for o in data) 
\ No newline at end of file
+    assert any(o["customer_name"] == order_data["customer_name"] for o in data) 
+
+def test_fast_json_response_matches_json_response():
+    content = {
+        "created_at": datetime(2026, 10, 19, 12, 30, 15, 123456),
+        "updated_at": datetime(2026, 10, 19, 12, 30),
+        "status": SchemaOrderStatusEnum.SHIPPED,
+        "total_amount": Decimal("199.90"),
+        "quantity": Decimal("2"),
+        "order_details": {"products": [{"id": "1", "quantity": 1}]}
+    }
+    expected = JSONResponse(jsonable_encoder(content)).body
+    assert json.loads(FastJSONResponse(content).body) == json.loads(expected)
+
+def test_order_api_encoding(client, db_session):
+    db_session.add(Order(
+        customer_name="John Doe",
+        customer_email="john@example.com",
+        shipping_address="123 Test St",
+        total_amount=100.0,
+        created_at=datetime(2026, 10, 19, 12, 30, 15, 123456),
+        status=OrderStatusEnum.SHIPPED,
+        order_details={"products": []}
+    ))
+    db_session.commit()
+
+    response = client.get("/orders/")
+    assert response.headers["content-type"] == "application/json"
+    order = response.json()[0]
+    assert order["created_at"] == "2026-10-19T12:30:15.123456"
+    assert order["status"] == "shipped"
+
+def test_bulk_order_status(client, db_session, outbox_relay):
+    statuses = [OrderStatusEnum.PROCESSING] * 3 + [OrderStatusEnum.PENDING, OrderStatusEnum.COMPLETED]
+    orders = [
+        Order(
+            customer_name=f"Customer {index}",
+            customer_email="bulk@example.com",
+            shipping_address="1 Bulk St",
+            total_amount=100.0,
+            status=status,
+            order_details={"products": []}
+        )
+        for index, status in enumerate(statuses)
+    ]
+    db_session.add_all(orders)
+    db_session.commit()
+    ids = [order.id for order in orders]
+
+    response = client.patch("/orders/bulk-status", json={
+        "order_ids": ids + [999, ids[0]],
+        "status": "shipped",
+        "from_status": "processing"
+    })
+    assert response.status_code == 200
+    result = response.json()
+    assert result["status"] == "shipped"
+    assert result["updated"] == ids[:3]
+    assert result["failed"] == [
+        {"order_id": ids[3], "current_status": "pending", "reason": "Order is pending, not processing"},
+        {"order_id": ids[4], "current_status": "completed", "reason": "Order is completed, not processing"},
+        {"order_id": 999, "current_status": None, "reason": "Order not found"},
+    ]
+    db_session.expire_all()
+    assert [order.status for order in db_session.query(Order).order_by(Order.id)] == (
+        [OrderStatusEnum.SHIPPED] * 3 + statuses[3:]
+    )
+
+    # Transitions that are not allowed are refused, already shipped orders included
+    result = client.patch("/orders/bulk-status", json={"order_ids": ids, "status": "processing"}).json()
+    assert result["updated"] == [ids[3]]
+    assert result["failed"][0] == {
+        "order_id": ids[0], "current_status": "shipped", "reason": "Cannot move an order from shipped to processing"
+    }
+
+    # One outbox event per batch
+    events = db_session.query(OutboxEvent).filter_by(event_type="order.status_changed").order_by(OutboxEvent.id).all()
+    assert [(event.aggregate_type, event.aggregate_id, event.payload) for event in events] == [
+        ("order_batch", ids[0], {"order_ids": ids[:3], "status": "shipped"}),
+        ("order_batch", ids[3], {"order_ids": [ids[3]], "status": "processing"}),
+    ]
+
+    assert client.patch("/orders/bulk-status", json={"order_ids": [], "status": "shipped"}).status_code == 400
+    assert client.patch("/orders/bulk-status", json={"order_ids": list(range(1001)), "status": "shipped"}).status_code == 400
+
+def test_filter_orders_by_product_and_option(client, db_session, create_product):
+    # Items as the shop stores them (see seed.py): a product slug or ID and the option chosen per component
+    mountain = create_product(3, "Mountain Bike", {"Frame Type": [("Full-suspension", 130.0), ("Diamond", 100.0)]})
+    create_product(5, "City Bike", {"Frame Type": [("Step-through", 90.0)], "Wheels": [("Road Wheels", 80.0)]})
+    full_suspension, diamond = sorted(option.id for option in mountain.components[0].options)
+    items = [
+        [{"id": 3, "quantity": 1, "configuration": {"Frame Type": "Full-suspension", "Wheels": "Mountain Wheels"}}],
+        [{"id": "3", "quantity": 1, "configuration": {"Frame Type": "Diamond"}},
+         {"id": "custom-bike", "quantity": 1, "configuration": {"Frame Type": "Full-suspension"}}],
+        [{"id": 5, "quantity": 2, "configuration": {"Frame Type": "Step-through", "Wheels": "Road Wheels"}}],
+        [{"id": "custom-bike", "quantity": 1, "configuration": {"Frame Finish": "Full-suspension"}}],
+    ]
+    orders = [
+        Order(
+            customer_name=f"Customer {index}",
+            customer_email="filter@example.com",
+            shipping_address="1 Filter St",
+            total_amount=100.0,
+            status=OrderStatusEnum.PENDING,
+            order_details={"products": products}
+        )
+        for index, products in enumerate(items)
+    ]
+    db_session.add_all(orders)
+    db_session.commit()
+    ids = [order.id for order in orders]
+
+    def filtered(**filters):
+        response = client.post("/orders/filter", json=filters)
+        assert response.status_code == 200
+        return sorted(order["id"] for order in response.json())
+
+    # Product IDs stored as numbers or strings, and product slugs
+    assert filtered(product_id=3) == [ids[0], ids[1]]
+    assert filtered(product_id="custom-bike") == [ids[1], ids[3]]
+    # Options match by component and option name, not under another component
+    assert filtered(option_id=full_suspension) == [ids[0], ids[1]]
+    assert filtered(option_id=diamond) == [ids[1]]
+    # Both must match the same item
+    assert filtered(product_id=3, option_id=full_suspension) == [ids[0]]
+    assert filtered(product_id="custom-bike", option_id=full_suspension) == [ids[1]]
+    assert filtered(product_id=5, option_id=diamond) == []
+    assert filtered(option_id=999) == []
+    assert filtered() == ids
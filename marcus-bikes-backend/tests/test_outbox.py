@@ -0,0 +1,154 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app import outbox
+from app.models import OutboxEvent
+from app.outbox import OutboxRelay, HandlerSink, FileSink, WebhookSink
+from app.services.outbox_service import OutboxService
+from tests.conftest import TestingSessionLocal
+
+def test_writes_add_outbox_events(client, db_session, outbox_relay, order_payload, create_product):
+    order_id = client.post("/orders/", json=order_payload).json()["id"]
+    client.patch(f"/orders/{order_id}", json={"status": "shipped"})
+    assert client.patch("/orders/999", json={"status": "shipped"}).status_code == 404
+    product = create_product(name="Event Bike", components={"Frame": [("Steel", 50.0)]})
+    option_id = product.components[0].options[0].id
+    client.post("/inventory/", json={"option_id": option_id, "quantity": 4, "low_stock_threshold": 5})
+    client.delete(f"/orders/{order_id}")
+
+    events = db_session.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert [(event.event_type, event.aggregate_id) for event in events] == [
+        ("order.created", order_id),
+        ("order.updated", order_id),
+        ("inventory.updated", option_id),
+        ("order.deleted", order_id),
+    ]
+    assert events[0].payload["status"] == "pending"
+    assert events[0].payload["order_details"] == order_payload["order_details"]
+    assert events[1].payload["previous_status"] == "pending"
+    assert events[1].payload["changes"] == {"status": "shipped"}
+    assert events[2].payload["stock_status"] == "limited_stock"
+    assert all(event.dispatched_at is None for event in events)
+
+def test_relay_dispatches_in_batches(client, db_session, tmp_path, outbox_relay, order_payload):
+    for _ in range(3):
+        client.post("/orders/", json=order_payload)
+    received = []
+    handlers = HandlerSink()
+    handlers.register("order.created", received.append)
+    path = tmp_path / "events.jsonl"
+    relay = OutboxRelay(TestingSessionLocal, [handlers, FileSink(str(path))], batch_size=2)
+
+    assert relay.drain() == 3
+    assert [message["type"] for message in received] == ["order.created"] * 3
+    assert [message["id"] for message in received] == sorted(message["id"] for message in received)
+    assert [json.loads(line) for line in path.read_text().splitlines()] == received
+    assert OutboxService.count_pending(db_session) == 0
+    assert relay.drain() == 0
+
+def test_failed_batches_are_retried(client, db_session, outbox_relay, order_payload):
+    client.post("/orders/", json=order_payload)
+    received = []
+    handlers = HandlerSink()
+    handlers.register("*", received.append)
+
+    class FlakySink:
+        failures = 1
+
+        def send(self, messages):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("warehouse unavailable")
+
+    relay = OutboxRelay(TestingSessionLocal, [handlers, FlakySink()])
+    with pytest.raises(ConnectionError):
+        relay.drain()
+    event = db_session.query(OutboxEvent).one()
+    assert event.dispatched_at is None
+    assert event.attempts == 1
+    assert event.last_error == "ConnectionError: warehouse unavailable"
+
+    # At least once: the handler that succeeded sees the event again
+    assert relay.drain() == 1
+    assert len(received) == 2
+    assert received[0]["id"] == received[1]["id"]
+    db_session.refresh(event)
+    assert event.dispatched_at is not None
+    assert event.attempts == 2
+
+def test_events_need_a_relay(client, db_session, order_payload):
+    # Without OUTBOX_SINKS nothing would dispatch or delete the events
+    client.post("/orders/", json=order_payload)
+    assert db_session.query(OutboxEvent).count() == 0
+
+def test_rejected_events_are_parked(client, db_session, outbox_relay, order_payload):
+    for _ in range(3):
+        client.post("/orders/", json=order_payload)
+    rejected_id = db_session.query(OutboxEvent).order_by(OutboxEvent.id).first().id
+    received = []
+
+    class PickySink:
+        def send(self, messages):
+            if any(message["id"] == rejected_id for message in messages):
+                raise ValueError("unknown customer")
+            received.extend(messages)
+
+    relay = OutboxRelay(TestingSessionLocal, [PickySink()], max_attempts=2)
+    with pytest.raises(ValueError):
+        relay.drain()
+    assert received == []
+
+    # Out of attempts: the batch is sent one event at a time and the rejected one is parked
+    assert relay.drain() == 2
+    assert relay.parked == 1
+    assert [message["id"] for message in received] == [rejected_id + 1, rejected_id + 2]
+    event = db_session.get(OutboxEvent, rejected_id)
+    assert event.failed_at is not None and event.dispatched_at is None
+    assert event.attempts == 2
+    assert event.last_error == "ValueError: unknown customer"
+    assert OutboxService.count_pending(db_session) == 0
+    assert OutboxService.count_parked(db_session) == 1
+    assert relay.drain() == 0
+
+def test_webhook_sink():
+    batches = []
+
+    class Receiver(BaseHTTPRequestHandler):
+        def do_POST(self):
+            batches.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204 if len(batches) == 1 else 500)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Receiver)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        sink = WebhookSink(f"http://127.0.0.1:{server.server_port}/events")
+        sink.send([{"id": 1, "type": "order.created"}])
+        assert batches == [{"events": [{"id": 1, "type": "order.created"}]}]
+        with pytest.raises(Exception):
+            sink.send([{"id": 2, "type": "order.created"}])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_commits_wake_the_relay(client, db_session, monkeypatch, order_payload):
+    delivered = threading.Event()
+    handlers = HandlerSink()
+    handlers.register("order.created", lambda message: delivered.set())
+    # Polls far less often than the test waits
+    relay = OutboxRelay(TestingSessionLocal, [handlers], interval=60)
+    monkeypatch.setattr(outbox, "outbox_relay", relay)
+    relay.start()
+    try:
+        client.post("/orders/", json=order_payload)
+        assert delivered.wait(5)
+    finally:
+        relay.stop()
+    assert OutboxService.count_pending(db_session) == 0
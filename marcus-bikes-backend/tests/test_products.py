@@ -2,6 +2,8 @@ import pytest
 from app.models import Product, Component, Option
 from app.schemas import ProductCreate, ComponentCreate, OptionCreate
 from app.models.enums import CategoryEnum
+from app.services.price_range_service import PriceRangeService
+from app.pagination import encode_cursor
 
 def test_create_product(db_session):
     # Create a test product
@@ -90,4 +92,262 @@ def test_product_api_endpoints(client):
     assert response.status_code == 200
     data = response.json()
     assert len(data) > 0
-    assert any(p["name"] == product_data["name"] for p in data) 
\ No newline at end of file
+    assert any(p["name"] == product_data["name"] for p in data) 
+
+def test_product_detail_payload(client, db_session):
+    from app.models import Dependency, PriceRule
+    from app.models.enums import DependencyTypeEnum
+
+    product = Product(id=7, name="Payload Bike", category=CategoryEnum.BICYCLE, base_price=50.0)
+    db_session.add(product)
+    db_session.flush()
+    frame = Component(name="Frame", product_id=product.id)
+    wheels = Component(name="Wheels", description="Wheel set", product_id=product.id)
+    db_session.add_all([frame, wheels])
+    db_session.flush()
+    diamond = Option(name="Diamond", price=100.0, in_stock=True, component_id=frame.id)
+    road = Option(name="Road", price=80.0, in_stock=False, component_id=wheels.id)
+    db_session.add_all([diamond, road])
+    db_session.flush()
+    db_session.add(Dependency(
+        type=DependencyTypeEnum.EXCLUDES, product_id=product.id,
+        source_component_id=frame.id, source_option_id=diamond.id,
+        target_component_id=wheels.id, target_option_id=road.id
+    ))
+    db_session.add(PriceRule(
+        product_id=product.id, component_id=frame.id, option_id=diamond.id,
+        dependent_component_id=wheels.id, dependent_option_id=road.id, price=20.0
+    ))
+    PriceRangeService.refresh(db_session, [product.id])
+    db_session.commit()
+    ids = (frame.id, wheels.id, diamond.id, road.id)
+
+    response = client.get("/products/7")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    frame_id, wheels_id, diamond_id, road_id = ids
+    assert response.json() == {
+        "id": 7,
+        "name": "Payload Bike",
+        "description": "",
+        "category": "bicycle",
+        "components": [
+            {"id": frame_id, "name": "Frame", "description": "", "options": [
+                {"id": diamond_id, "name": "Diamond", "price": 100.0, "inStock": True}
+            ]},
+            {"id": wheels_id, "name": "Wheels", "description": "Wheel set", "options": [
+                {"id": road_id, "name": "Road", "price": 80.0, "inStock": False}
+            ]}
+        ],
+        "dependencies": [{
+            "type": "excludes", "sourceComponentId": frame_id, "sourceOptionId": diamond_id,
+            "targetComponentId": wheels_id, "targetOptionId": road_id
+        }],
+        "priceRules": [{
+            "type": "override", "componentId": frame_id, "optionId": diamond_id,
+            "dependentComponentId": wheels_id, "dependentOptionId": road_id, "price": 20.0
+        }],
+        "basePrice": 50.0,
+        # The Wheels have nothing in stock
+        "minPrice": None,
+        "maxPrice": None
+    }
+    assert client.get("/products/").json() == [response.json()]
+
+def test_category_counts(client, db_session):
+    from app.middleware.query_timing import parse_query_count
+
+    for product_id, category, base_price in [(1, CategoryEnum.BICYCLE, 100.0), (2, CategoryEnum.BICYCLE, 300.0), (3, CategoryEnum.SKI, 50.0)]:
+        db_session.add(Product(id=product_id, name=f"Product {product_id}", category=category, base_price=base_price))
+    db_session.flush()
+    # Product 2 has a component whose only option is out of stock
+    frame = Component(name="Frame", product_id=2)
+    db_session.add(frame)
+    db_session.flush()
+    db_session.add(Option(name="Carbon", price=250.0, in_stock=False, component_id=frame.id))
+    # Product 1 has a component with options of 20 to 80
+    wheels = Component(name="Wheels", product_id=1)
+    db_session.add(wheels)
+    db_session.flush()
+    db_session.add_all([Option(name=name, price=price, component_id=wheels.id) for name, price in [("Road", 20.0), ("Mountain", 80.0)]])
+    db_session.flush()
+    PriceRangeService.refresh(db_session, [1, 2, 3])
+    db_session.commit()
+
+    response = client.get("/products/category/counts")
+    assert response.status_code == 200
+    assert parse_query_count(response.headers["server-timing"]) == 1
+    counts = {entry["category"]: entry for entry in response.json()}
+    # Prices span the configurations of the products in stock, as sort=price listings do
+    assert counts["bicycle"] == {"category": "bicycle", "count": 2, "min_price": 120.0, "max_price": 180.0, "in_stock_count": 1}
+    assert counts["ski"]["count"] == 1
+    assert counts["surfboard"] == {"category": "surfboard", "count": 0, "min_price": None, "max_price": None, "in_stock_count": 0}
+
+    # Served from the cache until the catalog changes
+    response = client.get("/products/category/counts")
+    assert parse_query_count(response.headers["server-timing"]) == 0
+
+    response = client.delete("/products/3")
+    assert response.status_code == 204
+    counts = {entry["category"]: entry for entry in client.get("/products/category/counts").json()}
+    assert counts["ski"]["count"] == 0
+
+def test_product_summaries(client, db_session):
+    from app.middleware.query_timing import parse_query_count
+
+    for product_id in range(1, 6):
+        db_session.add(Product(id=product_id, name=f"Bike {product_id}", category=CategoryEnum.BICYCLE, base_price=100.0))
+    db_session.flush()
+    for name, prices in [("Frame", [(50.0, True), (150.0, False)]), ("Wheels", [(20.0, True), (30.0, True)])]:
+        component = Component(name=name, product_id=1)
+        db_session.add(component)
+        db_session.flush()
+        for price, in_stock in prices:
+            db_session.add(Option(name=f"{name} {price}", price=price, in_stock=in_stock, component_id=component.id))
+    PriceRangeService.refresh_all(db_session)
+    db_session.commit()
+
+    response = client.get("/products/summary?limit=2")
+    assert response.status_code == 200
+    assert parse_query_count(response.headers["server-timing"]) == 1
+    page = response.json()
+    assert page["items"][0] == {
+        "id": 1, "name": "Bike 1", "category": "bicycle", "base_price": 100.0,
+        "min_price": 170.0, "max_price": 180.0,
+        "component_count": 2, "option_count": 4, "in_stock_option_count": 3
+    }
+    assert page["items"][1]["min_price"] == 100.0
+    assert page["items"][1]["component_count"] == 0
+
+    # Follow the cursor through the remaining pages
+    seen = [item["id"] for item in page["items"]]
+    while page["next_cursor"]:
+        page = client.get(f"/products/summary?limit=2&cursor={page['next_cursor']}").json()
+        seen.extend(item["id"] for item in page["items"])
+    assert seen == [1, 2, 3, 4, 5]
+
+    # Sparse fields
+    page = client.get("/products/summary?fields=name,option_count").json()
+    assert page["items"][0] == {"id": 1, "name": "Bike 1", "option_count": 4}
+
+    assert client.get("/products/summary?fields=secret").status_code == 400
+    assert client.get("/products/summary?cursor=not-a-cursor").status_code == 400
+    assert client.get("/products/summary?limit=100000").status_code == 400
+
+def test_product_summaries_reject_mistyped_cursors(client):
+    for position in ({"id": "1"}, {"id": None}, {"id": True}):
+        cursor = encode_cursor(position)
+        assert client.get(f"/products/summary?cursor={cursor}").status_code == 400
+    cursor = encode_cursor({"id": 1, "min_price": "cheap"})
+    assert client.get(f"/products/summary?sort=price&cursor={cursor}").status_code == 400
+
+def test_product_count(client, db_session):
+    db_session.add(Product(id=1, name="Bike", category=CategoryEnum.BICYCLE, base_price=100.0))
+    db_session.add(Product(id=2, name="Skis", category=CategoryEnum.SKI, base_price=200.0))
+    db_session.commit()
+
+    assert client.get("/products/count").json() == {"count": 2}
+    assert client.get("/products/count?category=ski").json() == {"count": 1}
+
+def test_product_summaries_category_filter(client, db_session):
+    db_session.add(Product(id=1, name="Bike", category=CategoryEnum.BICYCLE, base_price=100.0))
+    db_session.add(Product(id=2, name="Skis", category=CategoryEnum.SKI, base_price=200.0))
+    db_session.commit()
+
+    page = client.get("/products/summary?category=ski&fields=name").json()
+    assert page == {"items": [{"id": 2, "name": "Skis"}], "next_cursor": None}
+
+def test_products_by_ids(client, db_session):
+    for product_id in range(1, 4):
+        db_session.add(Product(id=product_id, name=f"Bike {product_id}", category=CategoryEnum.BICYCLE, base_price=100.0))
+    db_session.flush()
+    component = Component(name="Frame", product_id=2)
+    db_session.add(component)
+    db_session.flush()
+    db_session.add(Option(name="Steel", price=50.0, in_stock=True, component_id=component.id))
+    db_session.commit()
+    option_id = db_session.query(Option).first().id
+
+    # Requested order is kept, unknown and repeated ids are skipped
+    response = client.get("/products/?ids=3,1,99,3")
+    assert response.status_code == 200
+    assert [product["id"] for product in response.json()] == [3, 1]
+
+    # Batch and single product reads share the same cache entries
+    batch = client.get("/products/?ids=2").json()[0]
+    assert client.get("/products/2").json() == batch
+    assert batch["components"][0]["options"][0]["inStock"] is True
+
+    # A stock write drops the cached product
+    response = client.put(f"/options/{option_id}/stock?in_stock=false")
+    assert response.status_code == 200
+    assert client.get("/products/?ids=2").json()[0]["components"][0]["options"][0]["inStock"] is False
+
+    assert client.get("/products/?ids=1,abc").status_code == 400
+    assert client.get("/products/?ids=" + ",".join(str(i) for i in range(200))).status_code == 400
+
+def test_compute_price_range():
+    # Frame: Matte 30 or Gloss 20, Wheels: Road 80 or Mountain 100; Matte costs 50 with Mountain wheels
+    components = {1: [(10, 30.0), (11, 20.0)], 2: [(20, 80.0), (21, 100.0)], 3: [(30, 5.0)]}
+    rules = [(10, 21, 50.0)]
+    assert PriceRangeService.compute_price_range(100.0, components, rules) == (205.0, 255.0)
+    assert PriceRangeService.compute_price_range(100.0, components, []) == (205.0, 235.0)
+    # Rules on options that are not in stock are ignored
+    assert PriceRangeService.compute_price_range(100.0, {1: [(11, 20.0)], 2: [(21, 100.0)]}, rules) == (220.0, 220.0)
+    # No configuration can be ordered
+    assert PriceRangeService.compute_price_range(100.0, {1: [], 2: [(20, 80.0)]}, rules) == (None, None)
+    assert PriceRangeService.compute_price_range(100.0, {}, []) == (100.0, 100.0)
+
+def test_price_range_listing(client, db_session):
+    from app.models import Inventory
+    from app.models.enums import StockStatusEnum
+
+    for product_id, base_price in [(1, 300.0), (2, 100.0), (3, 200.0), (4, 50.0)]:
+        db_session.add(Product(id=product_id, name=f"Bike {product_id}", category=CategoryEnum.BICYCLE, base_price=base_price))
+    db_session.flush()
+    frame = Component(name="Frame", product_id=2)
+    db_session.add(frame)
+    db_session.flush()
+    cheap = Option(name="Steel", price=10.0, component_id=frame.id)
+    expensive = Option(name="Carbon", price=500.0, component_id=frame.id)
+    db_session.add_all([cheap, expensive])
+    db_session.flush()
+    db_session.add(Inventory(option_id=cheap.id, quantity=5, stock_status=StockStatusEnum.IN_STOCK))
+    # Product 4 has a component with nothing in stock, so it has no price range
+    wheels = Component(name="Wheels", product_id=4)
+    db_session.add(wheels)
+    db_session.flush()
+    db_session.add(Option(name="Road", price=80.0, in_stock=False, component_id=wheels.id))
+    PriceRangeService.refresh_all(db_session)
+    db_session.commit()
+    cheap_id = cheap.id
+
+    def listing(**params):
+        page = client.get("/products/summary", params={"fields": "min_price,max_price", **params}).json()
+        return [(item["id"], item["min_price"], item["max_price"]) for item in page["items"]]
+
+    assert listing(sort="price") == [(2, 110.0, 600.0), (3, 200.0, 200.0), (1, 300.0, 300.0), (4, None, None)]
+    assert [item[0] for item in listing(sort="-price")] == [1, 3, 2, 4]
+    # The full listing exposes its sort key
+    products = client.get("/products/?sort=price").json()
+    assert [(product["id"], product["minPrice"], product["maxPrice"]) for product in products] == listing(sort="price")
+
+    # Follow the price cursor through every page, including the null range
+    for sort, expected in [("price", [2, 3, 1, 4]), ("-price", [1, 3, 2, 4])]:
+        seen = []
+        page = client.get(f"/products/summary?sort={sort}&limit=1&fields=name").json()
+        while True:
+            assert set(page["items"][0]) == {"id", "name"}
+            seen.extend(item["id"] for item in page["items"])
+            if not page["next_cursor"]:
+                break
+            page = client.get(f"/products/summary?sort={sort}&limit=1&fields=name&cursor={page['next_cursor']}").json()
+        assert seen == expected
+
+    # Selling out the cheap frame moves product 2 past the others
+    response = client.patch(f"/inventory/option/{cheap_id}", json={"quantity": 0})
+    assert response.status_code == 200
+    assert listing(sort="price")[2] == (2, 600.0, 600.0)
+
+    assert client.get("/products/summary?sort=name").status_code == 400
+    assert client.get("/products/?sort=name").status_code == 400
@@ -0,0 +1,63 @@
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database.instrumentation import track_queries
+from app.middleware.query_timing import QueryTimingMiddleware, parse_query_count
+from app.services.product_service import ProductService
+
+def components(count=3, options_per_component=4):
+    """{component: [(option, price)]} for the create_product fixture"""
+    return {
+        f"Component {c}": [(f"Option {c}-{o}", 10.0 * o) for o in range(options_per_component)]
+        for c in range(count)
+    }
+
+def test_server_timing_header_reports_queries(client, db_session, create_product):
+    product_id = create_product(1, "Budget Bike", components()).id
+
+    response = client.get(f"/products/{product_id}")
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert "db;dur=" in server_timing
+    assert "app;dur=" in server_timing
+    assert parse_query_count(server_timing) > 0
+
+def test_product_detail_query_budget(client, db_session, create_product):
+    product_id = create_product(1, "Budget Bike", components(6)).id
+
+    response = client.get(f"/products/{product_id}")
+    # One query for the product, then one each for its components, their
+    # options, dependencies and price rules
+    assert parse_query_count(response.headers["server-timing"]) <= 5
+
+    # Served from the catalog cache the second time
+    response = client.get(f"/products/{product_id}")
+    assert parse_query_count(response.headers["server-timing"]) == 0
+
+def test_product_batch_query_budget(client, db_session, create_product):
+    for product_id in range(1, 4):
+        create_product(product_id, f"Bike {product_id}", components(4, options_per_component=1))
+
+    # The number of queries does not grow with the number of products
+    response = client.get("/products/?ids=1,2,3")
+    assert response.status_code == 200
+    assert parse_query_count(response.headers["server-timing"]) <= 5
+
+def test_track_queries_counts_service_calls(db_session, create_product):
+    product_id = create_product(1, "Budget Bike", components()).id
+    db_session.expire_all()
+
+    with track_queries() as stats:
+        ProductService.get_product(db_session, product_id=product_id)
+    assert stats.count == 1
+    assert stats.slowest_statement.startswith("SELECT")
+    assert stats.total_time >= stats.slowest_time > 0
+
+def test_slow_request_is_logged(client, caplog):
+    slow_client = TestClient(QueryTimingMiddleware(app, slow_request_threshold_ms=0))
+    with caplog.at_level(logging.WARNING, logger="app.requests"):
+        response = slow_client.get("/health")
+    assert response.status_code == 200
+    assert any('"event": "slow_request"' in record.getMessage() for record in caplog.records)
@@ -0,0 +1,81 @@
+from app.models import Product, Component, Option
+from app.models.enums import CategoryEnum
+from app.search import ProductSearchIndex, tokenize
+from app.services.price_range_service import PriceRangeService
+
+def create_catalog(db_session):
+    # (id, name, category, base price, {component: [(option, price)]})
+    catalog = [
+        (1, "Mountain Bike", CategoryEnum.BICYCLE, 100.0, {"Frame": [("Carbon", 300.0), ("Steel", 50.0)], "Wheels": [("Road", 80.0)]}),
+        (2, "City Bike", CategoryEnum.BICYCLE, 80.0, {"Frame": [("Steel", 40.0)]}),
+        (3, "Freeride Skis", CategoryEnum.SKI, 200.0, {"Core": [("Carbon", 150.0), ("Wood", 100.0)]}),
+        (4, "Retro Skates", CategoryEnum.ROLLERSKATE, 60.0, {}),
+    ]
+    for product_id, name, category, base_price, components in catalog:
+        db_session.add(Product(id=product_id, name=name, category=category, base_price=base_price))
+        db_session.flush()
+        for component_name, options in components.items():
+            component = Component(name=component_name, product_id=product_id)
+            db_session.add(component)
+            db_session.flush()
+            for option_name, price in options:
+                db_session.add(Option(name=option_name, price=price, component_id=component.id))
+    PriceRangeService.refresh_all(db_session)
+    db_session.commit()
+
+def test_tokenize():
+    assert tokenize("Carbon-Fiber Frame 29\"") == ["carbon", "fiber", "frame", "29"]
+    assert tokenize(None) == []
+
+def test_search_index(db_session):
+    create_catalog(db_session)
+    index = ProductSearchIndex.build(db_session)
+
+    def ids(**filters):
+        return [item["id"] for item in index.search(**filters)["items"]]
+
+    # Words of product, component and option names, matched by prefix
+    assert ids(query="bike") == [1, 2]
+    assert ids(query="carb") == [1, 3]
+    assert ids(query="carbon mount") == [1]
+    assert ids(query="titanium") == []
+    # Price ranges: 230-480, 120, 300-350 and 60
+    assert ids(min_price=300) == [1, 3]
+    assert ids(max_price=130) == [2, 4]
+    assert ids(min_price=125, max_price=250) == [1]
+    # Every required option must be offered, case-insensitively
+    assert ids(options=["steel"]) == [1, 2]
+    assert ids(options=["Steel", "Road"]) == [1]
+    assert ids(skip=1, limit=2) == [2, 3]
+
+    result = index.search(query="carbon", category="ski")
+    assert result["total"] == 1
+    assert result["items"][0] == {
+        "id": 3, "name": "Freeride Skis", "category": "ski",
+        "base_price": 200.0, "min_price": 300.0, "max_price": 350.0
+    }
+    # The category facet ignores the category filter, option facets do not
+    assert result["facets"] == {
+        "categories": {"bicycle": 1, "ski": 1},
+        "options": {"Core": {"Carbon": 1, "Wood": 1}}
+    }
+
+def test_search_api(client, db_session):
+    create_catalog(db_session)
+
+    response = client.get("/products/search?q=steel&option=Road")
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["id"] for item in page["items"]] == [1]
+    assert page["total"] == 1
+    assert page["facets"]["options"]["Frame"] == {"Carbon": 1, "Steel": 1}
+
+    # The index is rebuilt after catalog writes
+    response = client.put("/products/2", json={"id": 2, "name": "Steel Commuter", "category": "bicycle", "base_price": 80.0})
+    assert response.status_code == 200
+    page = client.get("/products/search?q=commuter").json()
+    assert [item["id"] for item in page["items"]] == [2]
+
+    assert client.get("/products/search?category=boat").status_code == 400
+    assert client.get("/products/search?min_price=10&max_price=5").status_code == 400
+    assert client.get("/products/search?limit=0").status_code == 400
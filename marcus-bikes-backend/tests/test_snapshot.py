@@ -0,0 +1,164 @@
+import math
+
+import pytest
+
+from app.models import Dependency, PriceRule
+from app.models.enums import DependencyTypeEnum
+from app.services.price_range_service import PriceRangeService
+from app.services.product_service import ProductService
+from app.snapshot import CatalogSnapshotFile, SharedCatalogSnapshot, SnapshotWriter, build_snapshot
+
+def create_rules_product(db_session, create_product, product_id, name):
+    product = create_product(product_id, name, {
+        "Frame": [("Steel", 50.0), ("Carbon", 200.0)],
+        "Wheels": [("Road", 80.0, False), ("Mountain", 90.0)],
+    })
+    frame, wheels = sorted(product.components, key=lambda component: component.id)
+    wheels.description = "Wheel set"
+    steel, carbon, road, mountain = sorted(
+        (option for component in (frame, wheels) for option in component.options), key=lambda option: option.id
+    )
+    db_session.add_all([
+        Dependency(type=DependencyTypeEnum.EXCLUDES, product_id=product_id, source_component_id=frame.id,
+                   source_option_id=carbon.id, target_component_id=wheels.id, target_option_id=mountain.id),
+        Dependency(type=DependencyTypeEnum.REQUIRES, product_id=product_id, source_component_id=frame.id,
+                   source_option_id=steel.id, target_component_id=wheels.id, target_option_id=None),
+        PriceRule(product_id=product_id, component_id=frame.id, option_id=carbon.id,
+                  dependent_component_id=wheels.id, dependent_option_id=road.id, price=150.0),
+        PriceRule(product_id=product_id, component_id=wheels.id, option_id=mountain.id,
+                  dependent_component_id=frame.id, dependent_option_id=steel.id, price=70.0),
+    ])
+    PriceRangeService.refresh(db_session, [product_id])
+    db_session.commit()
+    return steel.id, carbon.id, road.id, mountain.id
+
+def test_snapshot_round_trip(db_session, tmp_path, create_product):
+    steel, carbon, road, mountain = create_rules_product(db_session, create_product, 1, "Trail Bike")
+    create_rules_product(db_session, create_product, 3, "Ümlaut Bike")
+    path = str(tmp_path / "catalog.snapshot")
+
+    assert build_snapshot(db_session, path) == 0
+    snapshot = CatalogSnapshotFile(path)
+    for product_id in (1, 3):
+        expected = ProductService.product_to_frontend_dict(ProductService.get_product(db_session, product_id))
+        assert snapshot.get_product(product_id) == expected
+    assert snapshot.get_product(2) is None
+    assert snapshot.product_ids() == [1, 3]
+
+    # Price rules by option, and dependencies as bitmasks over option positions
+    assert snapshot.get_price_overrides(1, carbon) == [(road, 150.0)]
+    assert snapshot.get_price_overrides(1, mountain) == [(steel, 70.0)]
+    assert snapshot.get_price_overrides(1, road) == []
+    # Steel requires the whole Wheels component, which any complete configuration has
+    assert snapshot.get_dependency_masks(1) == [(0, 0), (0, 0b1000), (0, 0), (0, 0)]
+
+def test_snapshot_swap(tmp_path):
+    path = str(tmp_path / "catalog.snapshot")
+    product = {"id": 1, "name": "Bike", "description": "", "category": "bicycle", "components": [],
+               "dependencies": [], "priceRules": [], "basePrice": 10.0,
+               "minPrice": 10.0, "maxPrice": 25.0}
+    writer = SnapshotWriter()
+    writer.add(product)
+    writer.write(path, version=1)
+    old = CatalogSnapshotFile(path)
+
+    writer = SnapshotWriter()
+    writer.add({**product, "name": "Renamed"})
+    writer.write(path, version=2)
+    new = CatalogSnapshotFile(path)
+
+    # The old mapping stays readable after the rename
+    assert (old.version, old.get_product(1)) == (1, product)
+    assert (new.version, new.get_product(1)["name"]) == (2, "Renamed")
+    assert new.identity != old.identity
+    assert list(tmp_path.iterdir()) == [tmp_path / "catalog.snapshot"]
+
+    with pytest.raises(ValueError):
+        writer.add(product)
+    (tmp_path / "broken.snapshot").write_bytes(b"not a snapshot" * 4)
+    with pytest.raises(ValueError):
+        CatalogSnapshotFile(str(tmp_path / "broken.snapshot"))
+
+def test_shared_snapshot_reads(client, db_session, tmp_path, monkeypatch, create_product):
+    from app.controllers import product_controller
+
+    create_rules_product(db_session, create_product, 1, "Trail Bike")
+    create_rules_product(db_session, create_product, 2, "City Bike")
+    # The file is not looked at again, but every read checks the catalog version
+    shared = SharedCatalogSnapshot(str(tmp_path / "catalog.snapshot"), check_interval=3600, rebuild_interval=3600)
+    assert shared.rebuild(db_session.get_bind())
+    monkeypatch.setattr(product_controller, "catalog_snapshot", shared)
+
+    from app.middleware.query_timing import parse_query_count
+    response = client.get("/products/?ids=1,2")
+    assert [product["name"] for product in response.json()] == ["Trail Bike", "City Bike"]
+    # Only the catalog version is read from the database
+    assert parse_query_count(response.headers["server-timing"]) == 1
+
+    # Products changed since the snapshot come from the database until it is rebuilt
+    assert client.put("/products/2", json={"id": 2, "name": "Town Bike", "category": "bicycle"}).status_code == 200
+    assert [product["name"] for product in client.get("/products/?ids=1,2").json()] == ["Trail Bike", "Town Bike"]
+    assert shared.stale == {2}
+
+    assert shared.rebuild(db_session.get_bind())
+    assert client.get("/products/1").json()["name"] == "Trail Bike"
+    assert shared.snapshot.version == 1
+    assert shared.stale == frozenset()
+    assert shared.snapshot.get_product(2)["name"] == "Town Bike"
+
+def test_check_configuration(client, db_session, tmp_path, monkeypatch, create_product):
+    from app.controllers import product_controller
+    from app.middleware.query_timing import parse_query_count
+
+    steel, carbon, road, mountain = create_rules_product(db_session, create_product, 1, "Trail Bike")
+    frame_id, wheels_id = sorted(component.id for component in ProductService.get_product(db_session, 1).components)
+    configurations = [
+        ([steel, mountain], {"price": 220.0, "valid": True, "problems": []}),
+        ([carbon, road], {"price": 330.0, "valid": False, "problems": [f"Option {road} is out of stock"]}),
+        ([carbon, mountain], {"price": 390.0, "valid": False, "problems": [f"Option {carbon} excludes option {mountain}"]}),
+        ([steel], {"price": 150.0, "valid": False, "problems": [f"No option selected for component {wheels_id}"]}),
+        ([steel, carbon, mountain, 999], {"price": 420.0, "valid": False, "problems": [
+            "Option 999 is not an option of this product",
+            f"Several options selected for component {frame_id}",
+            f"Option {carbon} excludes option {mountain}"
+        ]}),
+    ]
+
+    # Compiled from the product read from the database
+    for option_ids, expected in configurations:
+        assert client.post("/products/1/configuration", json={"optionIds": option_ids}).json() == expected
+    assert client.post("/products/2/configuration", json={"optionIds": []}).status_code == 404
+
+    # From the masks and rule index of the snapshot, with the same results
+    shared = SharedCatalogSnapshot(str(tmp_path / "catalog.snapshot"), check_interval=3600, rebuild_interval=3600)
+    assert shared.rebuild(db_session.get_bind())
+    monkeypatch.setattr(product_controller, "catalog_snapshot", shared)
+    for option_ids, expected in configurations:
+        response = client.post("/products/1/configuration", json={"optionIds": option_ids})
+        assert response.json() == expected
+        # Only the catalog version is read from the database
+        assert parse_query_count(response.headers["server-timing"]) == 1
+
+def test_snapshot_reads_skip_the_worker_caches(client, db_session, tmp_path, monkeypatch, create_product):
+    from app.cache import product_key, response_cache
+    from app.controllers import product_controller
+    from app.models import Product
+    from app.models.enums import CatalogEntityEnum, ChangeOperationEnum
+    from app.responses import ENCODED_BODY_CODEC
+    from app.services.catalog_change_service import CatalogChangeService
+
+    create_product(1, "Trail Bike")
+    shared = SharedCatalogSnapshot(str(tmp_path / "catalog.snapshot"), check_interval=3600, rebuild_interval=3600)
+    assert shared.rebuild(db_session.get_bind())
+    monkeypatch.setattr(product_controller, "catalog_snapshot", shared)
+    assert client.get("/products/1").json()["name"] == "Trail Bike"
+
+    # Writes made through another worker do not invalidate this worker's caches,
+    # but they move the catalog version every snapshot read checks
+    for name in ("Town Bike", "City Bike"):
+        db_session.get(Product, 1).name = name
+        CatalogChangeService.record(db_session, [(CatalogEntityEnum.PRODUCT, 1, 1, ChangeOperationEnum.UPDATED)])
+        db_session.commit()
+        assert client.get("/products/1").json()["name"] == name
+        assert client.get("/products/?ids=1").json()[0]["name"] == name
+    assert response_cache.get(product_key(1), codec=ENCODED_BODY_CODEC) is None
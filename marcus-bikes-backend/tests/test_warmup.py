@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app import warmup
+from app.cache import catalog_cache, product_key, CATEGORY_SUMMARIES_KEY
+from app.models import Order
+from app.services.product_service import ProductService
+from app.warmup import CacheWarmer
+from tests.conftest import TestingSessionLocal
+
+def create_order(db_session, created_at, *items):
+    db_session.add(Order(
+        customer_name="John Doe",
+        customer_email="john@example.com",
+        shipping_address="123 Test St",
+        total_amount=100.0,
+        created_at=created_at,
+        order_details={"products": [{"id": str(product_id), "quantity": quantity} for product_id, quantity in items]}
+    ))
+    db_session.commit()
+
+def cached_product_ids(count):
+    values = catalog_cache.get_many([product_key(product_id) for product_id in range(1, count + 1)])
+    return [product_id for product_id, value in zip(range(1, count + 1), values) if value is not None]
+
+def test_warm_all_products(db_session, create_product):
+    for product_id in range(1, 251):
+        create_product(product_id, f"Bike {product_id}")
+    warmer = CacheWarmer(TestingSessionLocal, concurrency=2)
+    assert warmer.state == warmup.COLD
+
+    asyncio.run(warmer.warm())
+    assert warmer.ready
+    assert warmer.warmed == 250
+    assert warmer.failed_batches == 0
+    assert cached_product_ids(250) == list(range(1, 251))
+    assert catalog_cache.get(CATEGORY_SUMMARIES_KEY) is not None
+
+def test_warm_most_ordered_products(db_session, create_product):
+    for product_id in range(1, 6):
+        create_product(product_id, f"Bike {product_id}")
+    now = datetime.utcnow()
+    create_order(db_session, now, (2, 1), (4, 3))
+    create_order(db_session, now, (2, 1), ("not a product", 1))
+    create_order(db_session, now - timedelta(days=3), (5, 1))
+    # Too old to count
+    create_order(db_session, now - timedelta(days=60), (1, 10))
+
+    warmer = CacheWarmer(TestingSessionLocal, top=2, order_days=30)
+    with TestingSessionLocal() as db:
+        assert warmer.select_product_ids(db) == [4, 2]
+
+    asyncio.run(warmer.warm())
+    assert cached_product_ids(5) == [2, 4]
+
+def test_rewarm_after_product_write(db_session, monkeypatch, create_product):
+    for product_id in range(1, 3):
+        create_product(product_id, f"Bike {product_id}")
+    warmer = CacheWarmer(TestingSessionLocal)
+    monkeypatch.setattr(warmup, "cache_warmer", warmer)
+
+    ProductService.update_product(db_session, 1, {"name": "Renamed Bike"})
+    # Wait for the background load
+    warmer._executor.shutdown(wait=True)
+    assert catalog_cache.get(product_key(1)).name == "Renamed Bike"
+    assert cached_product_ids(2) == [1]
+
+def test_readiness(client, monkeypatch):
+    assert client.get("/ready").json() == {"status": "ready", "cache": "disabled"}
+
+    warmer = CacheWarmer(TestingSessionLocal)
+    monkeypatch.setattr(warmup, "cache_warmer", warmer)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "not ready", "cache": "cold"}
+
+    asyncio.run(warmer.warm())
+    assert client.get("/ready").json() == {"status": "ready", "cache": "warm"}
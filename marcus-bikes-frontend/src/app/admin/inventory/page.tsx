@@ -6,93 +6,98 @@ import { useRouter } from 'next/navigation';
 interface InventoryItem {
   id: number;
   option_id: number;
+  option_name: string;
+  component_id: number;
+  component_name: string;
+  product_id: number;
+  product_name: string;
+  product_category: string;
   quantity: number;
   low_stock_threshold: number;
   stock_status: string;
-  // The option field doesn't appear to be in the API response
 }
 
-// To properly display inventory information, we need to fetch option data separately
-interface Option {
-  id: number;
-  option_id: string;
-  name: string;
-  component_id: number;
+interface InventoryPage {
+  items: InventoryItem[];
+  next_cursor: string | null;
 }
 
-interface Component {
-  id: number;
-  component_id: string;
-  name: string;
-  product_id: string;
-}
+const PAGE_SIZE = 100;
 
-interface Product {
-  id: string;
-  name: string;
-  category: string;
-}
+// Milliseconds of typing pause before the search term is sent
+const SEARCH_DEBOUNCE_MS = 300;
 
 export default function AdminInventory() {
   const router = useRouter();
   const [inventory, setInventory] = useState<InventoryItem[]>([]);
-  const [options, setOptions] = useState<Record<number, Option>>({});
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [categoryFilter, setCategoryFilter] = useState<string>('all');
   const [stockFilter, setStockFilter] = useState<string>('all');
   const [searchTerm, setSearchTerm] = useState<string>('');
+  const [debouncedSearchTerm, setDebouncedSearchTerm] = useState<string>('');
   const [editItem, setEditItem] = useState<number | null>(null);
   const [editValues, setEditValues] = useState<{ quantity: number; threshold: number }>({ quantity: 0, threshold: 5 });
 
+  // Filtering, joining and paging are done by the server
+  const fetchInventoryPage = async (cursor: string | null): Promise<InventoryPage> => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (categoryFilter !== 'all') params.set('category', categoryFilter);
+    if (stockFilter !== 'all') params.set('stock_status', stockFilter);
+    if (debouncedSearchTerm !== '') params.set('name', debouncedSearchTerm);
+    if (cursor) params.set('cursor', cursor);
+
+    const token = localStorage.getItem('adminToken');
+    const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/inventory/listing?${params}`, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    });
+    if (!response.ok) throw new Error('Failed to fetch inventory');
+    return response.json();
+  };
+
+  useEffect(() => {
+    const timeout = setTimeout(() => setDebouncedSearchTerm(searchTerm), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timeout);
+  }, [searchTerm]);
+
   useEffect(() => {
+    // Responses to filters changed since are dropped
+    let cancelled = false;
     const fetchInventory = async () => {
       setLoading(true);
       try {
-        const token = localStorage.getItem('adminToken');
-        
-        // Fetch inventory data
-        const inventoryResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/inventory`, {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        });
-        if (!inventoryResponse.ok) throw new Error('Failed to fetch inventory');
-        const inventoryData = await inventoryResponse.json();
-        
-        setInventory(inventoryData);
-        
-        // Fetch options data to display names
-        try {
-          const optionsResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/options`, {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          });
-          if (optionsResponse.ok) {
-            const optionsData = await optionsResponse.json();
-            // Create a lookup object by option ID
-            const optionsMap: Record<number, Option> = {};
-            optionsData.forEach((option: Option) => {
-              optionsMap[option.id] = option;
-            });
-            setOptions(optionsMap);
-          }
-        } catch (optionsError) {
-          console.error('Error fetching options:', optionsError);
-          // Continue with inventory data even if options fetch fails
-        }
-        
+        const page = await fetchInventoryPage(null);
+        if (cancelled) return;
+        setInventory(page.items);
+        setNextCursor(page.next_cursor);
       } catch (error) {
+        if (cancelled) return;
         console.error('Error fetching inventory:', error);
         setError('Failed to load inventory data');
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     fetchInventory();
-  }, []);
+    return () => {
+      cancelled = true;
+    };
+  }, [categoryFilter, stockFilter, debouncedSearchTerm]);
+
+  const handleLoadMore = async () => {
+    try {
+      const page = await fetchInventoryPage(nextCursor);
+      setInventory(prev => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error fetching inventory:', error);
+      setError('Failed to load inventory data');
+    }
+  };
 
   const handleUpdateInventory = async (id: number) => {
     try {
@@ -127,26 +132,6 @@ export default function AdminInventory() {
     }
   };
 
-  // Filter the inventory data
-  const filteredInventory = inventory
-    .filter(item => 
-      searchTerm === '' || 
-      // If we have option data, search by name
-      (options[item.option_id]?.name?.toLowerCase().includes(searchTerm.toLowerCase()))
-    )
-    .filter(item => categoryFilter === 'all') // Simplified since we might not have category data
-    .filter(item => {
-      if (stockFilter === 'all') return true;
-      if (stockFilter === 'in_stock') return item.stock_status === 'in_stock';
-      if (stockFilter === 'limited_stock') return item.stock_status === 'limited_stock';
-      if (stockFilter === 'out_of_stock') return item.stock_status === 'out_of_stock';
-      return true;
-    });
-
-  if (loading) {
-    return <div className="text-center py-10">Loading inventory data...</div>;
-  }
-
   if (error) {
     return (
       <div className="bg-red-100 border border-red-400 text-red-700 px-4 py-3 rounded mb-4" role="alert">
@@ -162,14 +147,20 @@ export default function AdminInventory() {
 
       <div className="bg-white rounded-lg shadow overflow-hidden mb-6">
         <div className="p-4 border-b flex flex-col md:flex-row gap-4">
-          <div className="flex-1">
+          <div className="flex-1 relative">
             <input
               type="text"
-              placeholder="Search by name..."
+              placeholder="Search by option name..."
               value={searchTerm}
               onChange={(e) => setSearchTerm(e.target.value)}
               className="w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-indigo-500 focus:border-indigo-500"
             />
+            {loading && (
+              <div
+                className="absolute right-3 top-1/2 -mt-2 animate-spin rounded-full h-4 w-4 border-b-2 border-indigo-500"
+                aria-label="Loading inventory data"
+              ></div>
+            )}
           </div>
           <div className="flex space-x-2">
             <select
@@ -215,19 +206,18 @@ export default function AdminInventory() {
               </tr>
             </thead>
             <tbody className="bg-white divide-y divide-gray-200">
-              {filteredInventory.length === 0 ? (
+              {inventory.length === 0 ? (
                 <tr>
                   <td colSpan={6} className="px-6 py-4 text-center text-gray-500">
-                    No inventory items found.
+                    {loading ? 'Loading inventory data...' : 'No inventory items found.'}
                   </td>
                 </tr>
               ) : (
-                filteredInventory.map((item) => (
+                inventory.map((item) => (
                   <tr key={item.id}>
                     <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm text-gray-900">
-                        {options[item.option_id]?.name || `Option ID: ${item.option_id}`}
-                      </div>
+                      <div className="text-sm text-gray-900">{item.option_name}</div>
+                      <div className="text-xs text-gray-500">{item.product_name} / {item.component_name}</div>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
                       {editItem === item.option_id ? (
@@ -300,6 +290,13 @@ export default function AdminInventory() {
             </tbody>
           </table>
         </div>
+        {nextCursor && (
+          <div className="p-4 border-t text-center">
+            <button onClick={handleLoadMore} className="text-indigo-600 hover:text-indigo-900">
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -30,7 +30,7 @@ export default function AdminDashboard() {
         const token = localStorage.getItem('adminToken');
         
         // Fetch products count
-        const productsResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/products`);
+        const productsResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/products/count`);
         const productsData = await productsResponse.json();
         
         // Fetch inventory with low stock
@@ -53,7 +53,7 @@ export default function AdminDashboard() {
         const pendingOrders = ordersData.filter((order: any) => order.status === 'pending');
         
         setStats({
-          totalProducts: productsData.length,
+          totalProducts: productsData.count,
           lowStockItems: inventoryData.length,
           totalOrders: ordersData.length,
           pendingOrders: pendingOrders.length,
@@ -3,7 +3,6 @@
 import Link from 'next/link';
 import { useEffect, useState } from 'react';
 import { useCustomization } from '../lib/context/CustomizationContext';
-import { getProductById } from '../lib/api';
 import { Product } from '../lib/data/types';
 
 export default function ShoppingCart() {
@@ -18,20 +17,19 @@ export default function ShoppingCart() {
     async function fetchProducts() {
       setLoading(true);
       try {
+        // Fetch all cart products in a single request
+        const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/products/?ids=${productIds.join(',')}`);
+        if (!response.ok) {
+          throw new Error(`Failed to fetch products: ${response.status}`);
+        }
+        const data: Product[] = await response.json();
+
         const productsMap: Record<string, Product> = {};
-        
-        // Fetch each product in parallel
-        await Promise.all(productIds.map(async (id) => {
-          try {
-            // Convert to string for API call
-            const product = await getProductById(String(id));
-            // Use numeric ID as key for consistency
-            productsMap[id] = product;
-          } catch (error) {
-            console.error(`Error fetching product ${id}:`, error);
-          }
-        }));
-        
+        data.forEach(product => {
+          // Use numeric ID as key for consistency
+          productsMap[product.id] = product;
+        });
+
         setProducts(productsMap);
       } catch (error) {
         console.error('Error fetching products:', error);